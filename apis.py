@@ -1,7 +1,11 @@
 from flask import Blueprint
 
 from app_logic.database_routes import (
+    export_scores,
     fetch_leaderboard,
+    fetch_leaderboard_page,
+    player_rank,
+    pool_stats,
     submit_score,
     check_player,
 )
@@ -9,43 +13,63 @@ from app_logic.game_routes import (
     create_game,
     create_default_game,
     flip,
+    flip_and_status,
+    flip_pair,
     get_time,
     get_flip_count,
     reset_game,
     delete_game,
     detect_game_finish,
     submit_game,
+    game_event_stream,
 )
-from app_logic.page_routes import game, index, leaderboard
-from app_logic.fetch_image_routes import get_random_images
+from app_logic.metrics import get_metrics
+from app_logic.page_routes import game, index, leaderboard, serve_asset
+from app_logic.fetch_image_routes import get_random_images, proxy_image
 
 
 frontend_apis = {
     "/": (index, ["GET"]),
     "/game": (game, ["GET"]),
     "/leaderboard": (leaderboard, ["GET"]),
+    "/assets/<path:filename>": (serve_asset, ["GET"]),
 }
 
 database_apis = {
     "/fetch_leaderboard": (fetch_leaderboard, ["GET"]),
+    "/fetch_leaderboard_page": (fetch_leaderboard_page, ["GET"]),
+    "/player_rank": (player_rank, ["GET"]),
     "/submit_score": (submit_score, ["POST"]),
     "/check_player": (check_player, ["GET"]),
+    "/export_scores": (export_scores, ["GET"]),
+    "/pool_stats": (pool_stats, ["GET"]),
 }
 
 fetch_image_apis = {
     "/get_random_images": (get_random_images, ["GET"]),
+    "/image_proxy": (proxy_image, ["GET"]),
+}
+
+metrics_apis = {
+    "/metrics": (get_metrics, ["GET"]),
 }
 
 game_apis = {
     "/create_game/<num_pairs>": (create_game, ["POST"]),
     "/create_default_game": (create_default_game, ["POST"]),
     "/flip/<game_id>/<card_index>": (flip, ["POST"]),
+    "/flip_and_status/<game_id>/<card_index>": (flip_and_status, ["POST"]),
+    "/flip_pair/<game_id>/<first_index>/<second_index>": (
+        flip_pair,
+        ["POST"],
+    ),
     "/get_time/<game_id>": (get_time, ["GET"]),
     "/get_flip_count/<game_id>": (get_flip_count, ["GET"]),
     "/reset_game/<game_id>": (reset_game, ["POST"]),
     "/delete_game/<game_id>": (delete_game, ["POST"]),
     "/detect_game_finish/<game_id>": (detect_game_finish, ["GET"]),
     "/submit_game/<game_id>/<player_name>": (submit_game, ["POST"]),
+    "/game_events/<game_id>": (game_event_stream, ["GET"]),
 }
 
 
@@ -57,6 +81,7 @@ def register_apis(app, name: str):
         database_apis,
         fetch_image_apis,
         game_apis,
+        metrics_apis,
     ):
         for route, (func, method) in api_set.items():
             apis.route(route, methods=method)(func)
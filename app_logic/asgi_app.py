@@ -0,0 +1,333 @@
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.parse import parse_qs
+import asyncio
+import json
+import logging
+import os
+
+from a2wsgi import WSGIMiddleware
+from flask import Flask
+import requests
+
+from app_logic import fetch_image_routes
+from app_logic.database_routes import load_leaderboard
+from app_logic.game_routes import (
+    EVENT_TICK_INTERVAL,
+    format_event,
+    read_stream_status,
+    tick_event,
+)
+from app_logic.image_cache import SIZES
+from app_logic.leaderboard_cache import leaderboard_cache
+from app_logic.metrics import request_latency
+from game_logic.game_events import game_events
+
+
+logger = logging.getLogger(__name__)
+
+# called with the Flask app, scope, receive and send, sends the response
+# and returns its status, or returns None to leave the request to the
+# Flask app
+NativeRoute = Callable[
+    [Flask, dict, Callable, Callable], Awaitable[int | None]
+]
+
+
+async def send_response(
+    send: Callable, status: int, body: bytes, headers: dict | None = None
+) -> int:
+    headers = {
+        "content-type": "application/json",
+        "content-length": str(len(body)),
+        **(headers or {}),
+    }
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (name.encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+    return status
+
+
+async def send_json(send: Callable, status: int, data) -> int:
+    # the same compact JSON with a trailing newline as jsonify
+    body = json.dumps(data, separators=(",", ":")).encode() + b"\n"
+    return await send_response(send, status, body)
+
+
+def query_arg(scope: dict, name: str) -> str | None:
+    """A query parameter, like request.args.get(name)."""
+    values = parse_qs(scope["query_string"].decode("latin-1")).get(name)
+    return values[0] if values else None
+
+
+def query_int(scope: dict, name: str, default: int) -> int:
+    """An int query parameter, like request.args.get(name, default, int)."""
+    value = query_arg(scope, name)
+    try:
+        return default if value is None else int(value)
+    except ValueError:
+        return default
+
+
+async def get_random_images(
+    app: Flask, scope: dict, receive: Callable, send: Callable
+) -> int:
+    """
+    get_random_images of fetch_image_routes, awaiting the Duck API.
+    - A request waiting on upstream holds no thread, only a coroutine.
+    """
+    num_images = query_int(scope, "count", 8)
+    if num_images <= 0:
+        return await send_json(
+            send, 400, {"error": "The number of images must be greater than 0"}
+        )
+
+    try:
+        images, missing, exclude = fetch_image_routes.take_pooled_images(
+            num_images
+        )
+        if missing:
+            client = fetch_image_routes.image_client
+            images += await client.fetch_unique_images_async(missing, exclude)
+        return await send_json(send, 200, images)
+    except Exception as e:
+        return await send_json(send, 500, {"error": str(e)})
+
+
+def create_image_proxy_threads() -> ThreadPoolExecutor:
+    """
+    Threads downloading and downscaling images for the proxy.
+    - IMAGE_PROXY_THREADS: the most images fetched at once, 8 by default.
+    """
+    return ThreadPoolExecutor(
+        int(os.getenv("IMAGE_PROXY_THREADS", 8)),
+        thread_name_prefix="image-proxy",
+    )
+
+
+image_proxy_threads = create_image_proxy_threads()
+
+
+async def proxy_image(
+    app: Flask, scope: dict, receive: Callable, send: Callable
+) -> int | None:
+    """
+    proxy_image of fetch_image_routes, fetching on threads of its own.
+    - An image missing from the cache is downloaded on
+      image_proxy_threads, not on one of the threads serving the Flask
+      routes, however slow the download.
+    - The cached image is then left to the Flask route to send, with its
+      ETag and caching headers, as is a request it rejects.
+    """
+    url = query_arg(scope, "url")
+    size = query_arg(scope, "size") or "full"
+    if not url or size not in SIZES:
+        return None
+
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            image_proxy_threads,
+            fetch_image_routes.image_proxy.get,
+            url,
+            size,
+        )
+    except (ValueError, requests.RequestException) as e:
+        error, status = fetch_image_routes.image_error(e)
+        return await send_json(send, status, error)
+    return None
+
+
+def reload_leaderboard(app: Flask) -> bytes:
+    with app.app_context():
+        return leaderboard_cache.get_json(load_leaderboard)
+
+
+async def fetch_leaderboard(
+    app: Flask, scope: dict, receive: Callable, send: Callable
+) -> int:
+    """
+    fetch_leaderboard of database_routes.
+    - A fresh cached copy is sent straight from the loop.
+    - Reloading a stale one runs on a thread of its own, not on one of the
+      threads serving the Flask routes.
+    """
+    body = leaderboard_cache.get_cached_json()
+    if body is None:
+        try:
+            body = await asyncio.to_thread(reload_leaderboard, app)
+        except Exception as e:
+            return await send_json(
+                send, 500, {"error": f"Failed to fetch leaderboard: {str(e)}"}
+            )
+    return await send_response(send, 200, body)
+
+
+async def game_event_stream(
+    app: Flask, scope: dict, receive: Callable, send: Callable
+) -> int:
+    """
+    game_event_stream of game_routes, awaiting the game's events.
+    - An open stream holds no thread for as long as the game lasts, only
+      reading the game's state at the start and on ticks borrows one.
+    - The stream is dropped as soon as the client disconnects.
+    """
+    try:
+        game_id = int(scope["path"].removeprefix("/game_events/"))
+    except ValueError:
+        return await send_json(send, 400, {"error": "The game id is invalid"})
+
+    # subscribe before reading the status so no flip slips in between
+    subscriber = game_events.subscribe_async(game_id)
+    try:
+        try:
+            status = await asyncio.to_thread(read_stream_status, game_id)
+        except KeyError:
+            return await send_json(
+                send, 400, {"error": "The game doesn't exist"}
+            )
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+
+        async def send_event(event: str, data) -> None:
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": format_event(event, data).encode(),
+                    "more_body": True,
+                }
+            )
+
+        async def stream() -> None:
+            await send_event("status", status)
+            if status["finished"]:
+                return
+            while True:
+                try:
+                    event, data = await subscriber.get(EVENT_TICK_INTERVAL)
+                except asyncio.TimeoutError:
+                    event, data = await asyncio.to_thread(tick_event, game_id)
+
+                await send_event(event, data)
+                if event in ("finished", "closed"):
+                    return
+
+        async def until_disconnected() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        streaming = asyncio.ensure_future(stream())
+        disconnected = asyncio.ensure_future(until_disconnected())
+        await asyncio.wait(
+            {streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED
+        )
+        disconnected.cancel()
+        if not streaming.done():
+            streaming.cancel()
+            return 200
+        streaming.result()  # raise what ended it early
+        await send({"type": "http.response.body", "body": b""})
+        return 200
+    finally:
+        game_events.unsubscribe(game_id, subscriber)
+
+
+native_routes: dict[tuple[str, str], NativeRoute] = {
+    ("GET", "/get_random_images"): get_random_images,
+    ("GET", "/fetch_leaderboard"): fetch_leaderboard,
+    ("GET", "/image_proxy"): proxy_image,
+}
+
+# routes ending in a path parameter: (method, path prefix) -> (the rule
+# the latency is recorded under, route)
+native_prefix_routes: dict[tuple[str, str], tuple[str, NativeRoute]] = {
+    ("GET", "/game_events/"): ("/game_events/<game_id>", game_event_stream),
+}
+
+
+def find_native_route(method: str, path: str) -> tuple[str, NativeRoute]:
+    """The rule and route serving a request natively, (path, None) if none."""
+    route = native_routes.get((method, path))
+    if route is not None:
+        return path, route
+    for (route_method, prefix), (rule, route) in native_prefix_routes.items():
+        if method == route_method and path.startswith(prefix):
+            return rule, route
+    return path, None
+
+
+class AsgiApp:
+    """
+    The app served over ASGI.
+    - Routes in native_routes and native_prefix_routes run as coroutines
+      on the server's event loop, so neither slow image fetches nor open
+      event streams tie up threads.
+    - Every other request, and any native route that declines one, goes
+      to the Flask app and its Blueprint routes. They run on a bounded
+      pool of threads, database work included.
+    """
+
+    def __init__(self, flask_app: Flask, threads: int = 16) -> None:
+        self._flask_app = flask_app
+        self._wsgi_app = WSGIMiddleware(flask_app, workers=threads)
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+
+        if scope["type"] == "http":
+            rule, route = find_native_route(scope["method"], scope["path"])
+            if route is not None:
+                start = perf_counter()
+                status = await route(self._flask_app, scope, receive, send)
+                if status is not None:
+                    request_latency.observe(
+                        perf_counter() - start, scope["method"], rule, status
+                    )
+                    return
+
+        await self._wsgi_app(scope, receive, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    # waits for the client's loop, keep this loop running
+                    await asyncio.to_thread(
+                        fetch_image_routes.image_client.close
+                    )
+                except Exception:
+                    logger.exception("Error closing the image client")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(flask_app: Flask) -> AsgiApp:
+    """
+    Wrap the Flask app for an ASGI server.
+    - ASGI_WSGI_THREADS: threads running the Flask routes, 16 by default.
+    """
+    return AsgiApp(
+        flask_app, threads=int(os.getenv("ASGI_WSGI_THREADS", 16))
+    )
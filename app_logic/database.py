@@ -1,7 +1,12 @@
+from time import perf_counter
 import configparser
-from adbc_driver_postgresql.dbapi import connect
+import os
+import threading
+
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
 
 
 # Initialize Flask extensions
@@ -9,12 +14,120 @@ db = SQLAlchemy()
 migrate = Migrate()
 
 
+def is_connection_error(error: Exception) -> bool:
+    """
+    Whether error means the database couldn't be reached, rather than that
+    it refused the statement. Only the first may succeed on a retry.
+    """
+    if isinstance(error, exc.DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(
+        error,
+        (
+            exc.OperationalError,
+            exc.InterfaceError,
+            exc.DisconnectionError,
+            exc.TimeoutError,
+        ),
+    )
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that also records how long checkouts take.
+    - A checkout's time covers waiting for a connection to be returned as
+      well as opening a new one.
+    - Checkouts that give up after pool_timeout are counted separately.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        # _do_get retries by calling itself, only the outermost call counts
+        self._local = threading.local()
+
+    def _do_get(self):
+        if getattr(self._local, "timing", False):
+            return super()._do_get()
+
+        self._local.timing = True
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            self._local.timing = False
+            waited = perf_counter() - start
+            with self._stats_lock:
+                self._checkouts += 1
+                self._wait_time += waited
+                self._max_wait = max(self._max_wait, waited)
+
+    def get_stats(self) -> dict:
+        """
+        Snapshot of the pool.
+
+        Returns:
+            size, checked_out and overflow connections now, and since the
+            pool was created the number of checkouts, their total and
+            longest wait in seconds and how many timed out.
+        """
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "checked_out": self.checkedout(),
+                "overflow": max(self.overflow(), 0),
+                "checkouts": self._checkouts,
+                "wait_seconds_total": self._wait_time,
+                "wait_seconds_max": self._max_wait,
+                "timeouts": self._timeouts,
+            }
+
+
+def get_engine_options():
+    """
+    SQLAlchemy engine options, read from the environment.
+    - DB_POOL_SIZE: connections kept open (default 5).
+    - DB_MAX_OVERFLOW: extra connections opened under load (default 10).
+    - DB_POOL_TIMEOUT: seconds to wait for a free connection (default 30).
+    - DB_POOL_RECYCLE: seconds after which connections are replaced,
+      -1 to keep them (default).
+    - DB_POOL_PRE_PING: test connections before use when set to 1.
+    - DB_STATEMENT_TIMEOUT_MS: server-side statement timeout, unset for
+      none.
+    """
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", -1)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "0") == "1",
+    }
+    statement_timeout = os.getenv("DB_STATEMENT_TIMEOUT_MS")
+    if statement_timeout:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={int(statement_timeout)}"
+        }
+    return options
+
+
 def init_db_connection(db_url):
     """
     Initialize a database connection using a given URL.
     :param db_url: The database connection URL.
     :return: A connection and cursor object.
     """
+    # imported on first use, it pulls in pyarrow and slows down start-up
+    from adbc_driver_postgresql.dbapi import connect
+
     conn = connect(db_url)
     cur = conn.cursor()
     return conn, cur
@@ -1,9 +1,107 @@
 from datetime import datetime, timezone
-from flask import jsonify, request
+import logging
+import math
+
+from flask import Response, current_app, jsonify, request
+from sqlalchemy import exists, func, insert, select, tuple_
 
 
 from app_logic.models import PlayerScore
 from app_logic.database import db
+from app_logic.leaderboard_cache import leaderboard_cache
+from app_logic.metrics import metrics
+from app_logic.player_names import player_names
+from app_logic.score_export import EXPORT_FORMATS, iter_export, parse_timestamp
+from app_logic.score_writes import expected_score_write
+
+
+logger = logging.getLogger(__name__)
+
+
+# fastest first, then fewest moves, then oldest
+LEADERBOARD_ORDER = (
+    PlayerScore.completion_time.asc(),
+    PlayerScore.moves.asc(),
+    PlayerScore.id.asc(),
+)
+
+
+LEADERBOARD_KEY = tuple_(
+    PlayerScore.completion_time, PlayerScore.moves, PlayerScore.id
+)
+
+
+def read_pool_stat(stat):
+    return lambda: db.engine.pool.get_stats()[stat]
+
+
+metrics.gauge(
+    "db_pool_checked_out", "Connections in use.", read_pool_stat("checked_out")
+)
+metrics.gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size.",
+    read_pool_stat("overflow"),
+)
+metrics.counter(
+    "db_pool_checkouts_total",
+    "Connections checked out of the pool.",
+    read_pool_stat("checkouts"),
+)
+metrics.counter(
+    "db_pool_wait_seconds_total",
+    "Time spent checking connections out of the pool.",
+    read_pool_stat("wait_seconds_total"),
+)
+metrics.counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a connection.",
+    read_pool_stat("timeouts"),
+)
+
+
+def load_leaderboard(limit, after=None):
+    """
+    Read entries of the leaderboard from the database.
+    :param limit: How many entries to return.
+    :param after: (completion_time, moves, id) of the entry to continue
+        after, None to start from the top.
+    """
+    query = PlayerScore.query
+    if after is not None:
+        # keyset pagination, walks ix_player_scores_leaderboard
+        query = query.filter(LEADERBOARD_KEY > tuple_(*after))
+    scores = query.order_by(*LEADERBOARD_ORDER).limit(limit).all()
+    return [score.to_dict() for score in scores]
+
+
+def find_player_rank(player_name):
+    """
+    Rank of a player's best score on the whole leaderboard.
+    - Counts the entries ahead of it on ix_player_scores_leaderboard
+      instead of scanning with OFFSET.
+
+    Returns:
+        (rank, best score) or None if the player has no score.
+    """
+    best = (
+        PlayerScore.query.filter_by(player_name=player_name)
+        .order_by(*LEADERBOARD_ORDER)
+        .first()
+    )
+    if best is None:
+        return None
+
+    ahead = (
+        db.session.query(func.count())
+        .select_from(PlayerScore)
+        .filter(
+            LEADERBOARD_KEY
+            < tuple_(best.completion_time, best.moves, best.id)
+        )
+        .scalar()
+    )
+    return ahead + 1, best
 
 
 # ==============================
@@ -17,23 +115,174 @@ def fetch_leaderboard():
     Retrieve the leaderboard
     - Fetches the top 10 players based on the shortest completion time.
     - Players are ranked in ascending order of their completion time.
+    - Served from the in-process leaderboard cache, the database is only
+      read when the cache is empty or stale.
 
     Returns:
         JSON list of player scores (top 10)
     """
     try:
-        scores = (
-            PlayerScore.query.order_by(PlayerScore.completion_time.asc())
-            .limit(10)
-            .all()
+        return Response(
+            leaderboard_cache.get_json(load_leaderboard),
+            status=200,
+            mimetype="application/json",
         )
-        return jsonify([score.to_dict() for score in scores]), 200
     except Exception as e:
         return jsonify(
             {"error": f"Failed to fetch leaderboard: {str(e)}"}
         ), 500
 
 
+# @api.route("/fetch_leaderboard_page", methods=["GET"])
+def fetch_leaderboard_page():
+    """
+    Retrieve one page of the full leaderboard
+    - Pages are keyset paginated: pass the "next" cursor of a page to get
+      the one after it.
+
+    Query Parameters:
+        limit (int, optional): Entries per page, 1 to 100 (default 10).
+        after_time (float), after_moves (int), after_id (int), optional:
+            The cursor of the previous page, all three or none.
+
+    Returns:
+        {
+            "scores": [...],
+            "next": {"after_time": 45.5, "after_moves": 20, "after_id": 7}
+        }
+        with "next" null on the last page.
+    """
+    limit = request.args.get("limit", default=10, type=int)
+    cursor = (
+        request.args.get("after_time", type=float),
+        request.args.get("after_moves", type=int),
+        request.args.get("after_id", type=int),
+    )
+    if not 1 <= limit <= 100:
+        return jsonify({"error": "limit must be between 1 and 100"}), 400
+    if any(value is None for value in cursor) and any(
+        value is not None for value in cursor
+    ):
+        return jsonify(
+            {
+                "error": "after_time, after_moves and after_id must be"
+                " given together"
+            }
+        ), 400
+
+    after = None if cursor[0] is None else cursor
+    try:
+        scores = load_leaderboard(limit, after)
+    except Exception as e:
+        return jsonify(
+            {"error": f"Failed to fetch leaderboard: {str(e)}"}
+        ), 500
+
+    next_cursor = None
+    if len(scores) == limit:
+        last = scores[-1]
+        next_cursor = {
+            "after_time": last["completion_time"],
+            "after_moves": last["moves"],
+            "after_id": last["id"],
+        }
+    return jsonify({"scores": scores, "next": next_cursor}), 200
+
+
+# @api.route("/player_rank", methods=["GET"])
+def player_rank():
+    """
+    Find where a player's best score ranks on the leaderboard.
+
+    Query Parameters:
+        player_name (str): The name of the player.
+
+    Returns:
+        {"player_name": "John", "rank": 42, "score": {...}}
+    """
+    player_name = request.args.get("player_name", default=None, type=str)
+    if not player_name:
+        return jsonify({"error": "player_name is required"}), 400
+
+    try:
+        result = find_player_rank(player_name)
+    except Exception as e:
+        return jsonify({"error": f"Failed to rank player: {str(e)}"}), 500
+
+    if result is None:
+        return jsonify({"error": "The player has no score"}), 404
+    rank, best = result
+    return jsonify(
+        {"player_name": player_name, "rank": rank, "score": best.to_dict()}
+    ), 200
+
+
+def export_scores():
+    """
+    Export the score history for analytics.
+    - Streams player_scores straight from the database, so memory use
+      doesn't grow with the size of the table.
+
+    Query Parameters:
+        format (str): "arrow" for an Arrow IPC stream (default) or
+            "parquet".
+        since (str): ISO 8601 timestamp, only scores created at or after it.
+        until (str): ISO 8601 timestamp, only scores created before it.
+
+    Returns:
+        The scores, oldest first, in the requested format.
+    """
+    export_format = request.args.get("format", default="arrow", type=str)
+    if export_format not in EXPORT_FORMATS:
+        return jsonify(
+            {"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}
+        ), 400
+    try:
+        since = parse_timestamp(request.args.get("since"))
+        until = parse_timestamp(request.args.get("until"))
+    except ValueError:
+        return jsonify(
+            {"error": "since and until must be ISO 8601 timestamps"}
+        ), 400
+
+    chunks = iter_export(
+        current_app.config["TARGET_DB_URL"], export_format, since, until
+    )
+    extension = "arrows" if export_format == "arrow" else "parquet"
+    return Response(
+        chunks,
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={
+            "Content-Disposition": (
+                f"attachment; filename=player_scores.{extension}"
+            )
+        },
+    )
+
+
+def pool_stats():
+    """
+    Statistics of the database connection pool.
+    - Use them to size DB_POOL_SIZE and DB_MAX_OVERFLOW: a growing wait
+      time or any timeouts mean requests are queueing for connections.
+
+    Returns:
+        {
+            "size": 5,
+            "checked_out": 2,
+            "overflow": 0,
+            "checkouts": 1200,
+            "wait_seconds_total": 0.8,
+            "wait_seconds_max": 0.05,
+            "timeouts": 0
+        }
+    """
+    pool = db.engine.pool
+    if not hasattr(pool, "get_stats"):
+        return jsonify({"error": "Pool statistics are not available"}), 500
+    return jsonify(pool.get_stats()), 200
+
+
 # @api.route("/submit_score", methods=["POST"])
 def submit_score():
     """
@@ -70,7 +319,87 @@ def submit_score():
             }
         ), 400
 
-    return internal_submit_score(player_name, completion_time, moves)
+    return submit_or_queue_score(player_name, completion_time, moves)
+
+
+# moves is a 4-byte integer column
+MIN_MOVES, MAX_MOVES = -(2**31), 2**31 - 1
+
+
+def invalid_score_reason(player_name, completion_time, moves):
+    """
+    Why the database would refuse a score, None if it takes it.
+    - Checked before a score is queued: a queued score only reaches the
+      database long after the player got a 202.
+    """
+    max_length = PlayerScore.player_name.type.length
+    if not isinstance(player_name, str) or not player_name:
+        return "player_name must be a non-empty string"
+    if len(player_name) > max_length:
+        return f"player_name must be at most {max_length} characters"
+    if not isinstance(
+        completion_time, (int, float)
+    ) or not math.isfinite(completion_time):
+        return "completion_time must be a finite number"
+    if not isinstance(moves, int) or not MIN_MOVES <= moves <= MAX_MOVES:
+        return "moves must be a 32-bit integer"
+    return None
+
+
+def submit_or_queue_score(player_name, completion_time, moves):
+    """
+    Save a score, through the write-behind queue when it is enabled.
+    - Scores the database would refuse are rejected with 400 up front.
+    - Queued scores are acknowledged with 202 before they reach the
+      database.
+    - A full queue answers 503 so the client retries later.
+    """
+    reason = invalid_score_reason(player_name, completion_time, moves)
+    if reason is not None:
+        return jsonify({"error": f"Invalid score: {reason}"}), 400
+
+    score_queue = current_app.extensions.get("score_ingest")
+    if score_queue is None:
+        return internal_submit_score(player_name, completion_time, moves)
+
+    score = {
+        "player_name": player_name,
+        "completion_time": float(completion_time),
+        "moves": moves,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if not score_queue.submit(score):
+        response = jsonify(
+            {"error": "Too many scores waiting to be saved, try again later"}
+        )
+        response.headers["Retry-After"] = "1"
+        return response, 503
+    return jsonify({"status": "queued", **score}), 202
+
+
+def insert_scores(scores):
+    """
+    Insert a batch of queued scores with a single executemany.
+    - The new rows are merged into the cached leaderboard.
+    """
+    rows = [
+        {**score, "created_at": datetime.fromisoformat(score["created_at"])}
+        for score in scores
+    ]
+    try:
+        with expected_score_write():
+            inserted = db.session.scalars(
+                insert(PlayerScore).returning(PlayerScore), rows
+            ).all()
+            entries = [score.to_dict() for score in inserted]
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for entry in entries:
+        leaderboard_cache.add(entry)
+        player_names.add(entry["player_name"])
 
 
 def internal_submit_score(player_name, completion_time, moves):
@@ -82,20 +411,52 @@ def internal_submit_score(player_name, completion_time, moves):
             moves=moves,
             created_at=datetime.now(timezone.utc),
         )
-        db.session.add(score)
-        db.session.commit()
+        # merged into the cached leaderboard below instead of invalidating it
+        with expected_score_write():
+            db.session.add(score)
+            db.session.commit()
 
-        return jsonify(score.to_dict()), 201
+        entry = score.to_dict()
+        leaderboard_cache.add(entry)
+        player_names.add(player_name)
+        return jsonify(entry), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Failed to submit score: {str(e)}"}), 500
 
 
+def load_player_names():
+    """Every distinct player name, read off ix_player_scores_player_name."""
+    return db.session.scalars(select(PlayerScore.player_name).distinct())
+
+
+def player_name_exists(player_name):
+    """
+    Whether any score was saved under the name.
+    - Names missing from the in-process name filter are free without a
+      query.
+    - Otherwise a single EXISTS probe on the player_name index decides.
+    """
+    app = current_app._get_current_object()
+
+    def load():
+        # runs on the filter's reload thread, outside this request
+        with app.app_context():
+            yield from load_player_names()
+
+    if not player_names.might_exist(player_name, load):
+        return False
+    return db.session.scalar(
+        select(exists().where(PlayerScore.player_name == player_name))
+    )
+
+
 def check_player():
     """
     Check if a player is already registered.
     - Accepts a player_name as a query parameter.
-    - Queries the database to check if the player exists.
+    - Looks the name up in the in-process name filter, and only queries the
+      database when the name may be taken.
 
     Query Parameters:
         player_name (str): The name of the player to check.
@@ -112,15 +473,10 @@ def check_player():
         )  # Return False with HTTP 400 status for missing parameter
 
     try:
-        # Query the database to check if the player exists
-        exists = (
-            PlayerScore.query.filter_by(player_name=player_name).first()
-            is not None
-        )
-        return str(exists), 200
-    except Exception as e:
-        # Log the exception if needed
-        print(f"Error checking player: {e}")
+        # Check the name filter, then the database, if the player exists
+        return str(player_name_exists(player_name)), 200
+    except Exception:
+        logger.exception("Error checking player")
         return (
             "False",
             500,
@@ -138,13 +494,8 @@ def check_player_existence(player_name):
 
     try:
         # Check if the player exists in the database
-        exists = (
-            PlayerScore.query.filter_by(player_name=player_name).first()
-            is not None
-        )
-        return exists
-    except Exception as e:
+        return player_name_exists(player_name)
+    except Exception:
         # In case of any database error, log the error and assume not found.
-        # You can customize error handling as needed.
-        print(f"Error checking player internally: {e}")
+        logger.exception("Error checking player internally")
         return False
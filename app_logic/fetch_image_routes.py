@@ -1,63 +1,76 @@
-import aiohttp
-from flask import jsonify, request
+from flask import jsonify, request, send_file
 
-import asyncio
+import os
+
+import requests
+
+from app_logic.image_cache import SIZES, create_image_proxy
+from app_logic.image_client import ImageClient
+from app_logic.image_pool import ImagePool
 
 
 # ==============================
 # FETCH RANDOM IMAGES FROM EXTERNAL API
 # ==============================
 
-DUCK_API_BASE_URL = "https://random-d.uk/api"
+DUCK_API_BASE_URL = os.getenv("DUCK_API_BASE_URL", "https://random-d.uk/api")
 
 
-async def fetch_image(session):
+def create_image_client(base_url=DUCK_API_BASE_URL):
     """
-    Fetch a single image from the Duck API.
-    - Makes an HTTP GET request to the API to retrieve a random image.
-
-    Returns:
-        A dictionary containing the URL of the fetched image.
+    Build the shared Duck API client, tuned from the environment.
+    - IMAGE_FETCH_CONCURRENCY: the most requests in flight at once.
+    - IMAGE_FETCH_TIMEOUT: seconds before a single request is abandoned.
+    - IMAGE_FETCH_HEDGE_AFTER: seconds before a slow request is hedged.
     """
-    async with session.get(DUCK_API_BASE_URL + "/random") as response:
-        data = await response.json()
-        return {"url": data["url"]}
+    return ImageClient(
+        base_url,
+        max_concurrency=int(os.getenv("IMAGE_FETCH_CONCURRENCY", 16)),
+        request_timeout=float(os.getenv("IMAGE_FETCH_TIMEOUT", 5)),
+        hedge_after=float(os.getenv("IMAGE_FETCH_HEDGE_AFTER", 1)),
+    )
 
 
-async def fetch_unique_images_concurrently(num_images):
+def create_image_pool(client):
     """
-    Fetch multiple unique images concurrently from the Duck API.
-    - Ensures the fetched image URLs are unique.
+    Build the pool of pre-fetched images, sized from the environment.
+    - IMAGE_POOL_SIZE: the most URLs kept, 0 disables the pool.
+    - IMAGE_POOL_LOW_WATERMARK: refill once fewer URLs than this are left.
+    - IMAGE_POOL_TTL: seconds after which a pooled URL is discarded.
+    - IMAGE_POOL_PREWARM: "0" keeps create_app from starting the pool,
+      it is only started outside of tests unless set.
+    """
+    return ImagePool(
+        client.fetch_images,
+        max_size=int(os.getenv("IMAGE_POOL_SIZE", 100)),
+        low_watermark=int(os.getenv("IMAGE_POOL_LOW_WATERMARK", 40)),
+        ttl=float(os.getenv("IMAGE_POOL_TTL", 3600)),
+    )
 
-    Args:
-        num_images (int): The number of unique images to fetch.
 
-    Returns:
-        A list of dictionaries containing unique image URLs.
-    """
-    unique_urls = set()
-    images = []
+image_client = create_image_client()
+image_pool = create_image_pool(image_client)
 
-    async with aiohttp.ClientSession() as session:
-        while len(images) < num_images:
-            # Calculate remaining images to fetch
-            remaining = num_images - len(images)
-            tasks = [fetch_image(session) for _ in range(remaining)]
-            results = await asyncio.gather(*tasks)
 
-            for image in results:
-                if image["url"] not in unique_urls:
-                    unique_urls.add(image["url"])
-                    images.append(image)
+def take_pooled_images(num_images: int) -> tuple[list[dict], int, set[str]]:
+    """
+    Up to num_images images from the pool, create_app has started it.
 
-    return images
+    Returns:
+        The pooled images, how many more the Duck API must supply when
+        the pool ran dry, and the URLs those must not repeat.
+    """
+    images = image_pool.take(num_images)
+    exclude = {image["url"] for image in images}
+    return images, num_images - len(images), exclude
 
 
 # @api.route("/get_random_images", methods=["GET"])
 def get_random_images():
     """
     Fetch a specified number of unique random images from the Duck API.
-    - Makes concurrent requests to fetch the specified number of unique images.
+    - Serves images from the pre-fetched pool when it has enough of them.
+    - Makes concurrent requests to fetch whatever the pool couldn't supply.
 
     Query Parameters:
         count (int, optional): Number of unique images to fetch.
@@ -72,8 +85,83 @@ def get_random_images():
         ), 400
 
     try:
-        # Use asyncio to fetch unique images concurrently
-        images = asyncio.run(fetch_unique_images_concurrently(num_images))
+        images, missing, exclude = take_pooled_images(num_images)
+        if missing:
+            images += image_client.fetch_unique_images(missing, exclude)
         return jsonify(images), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+# ==============================
+# SERVE IMAGES THROUGH THE LOCAL CACHE
+# ==============================
+
+# cached images never change, browsers may keep them for a year
+IMAGE_MAX_AGE = 365 * 24 * 3600
+
+image_proxy = create_image_proxy(DUCK_API_BASE_URL)
+
+
+# @api.route("/image_proxy", methods=["GET"])
+def proxy_image():
+    """
+    Serve a Duck API image from the local image cache
+    - Downloads the image the first time it is asked for, then serves it
+      from disk.
+    - The ETag is the SHA-256 of the image, a browser revalidating its
+      copy gets 304 Not Modified.
+
+    Query Parameters:
+        url (str): The image URL, as returned by get_random_images.
+        size (str, optional): "full" (default) or "card", downscaled for
+            the game board.
+
+    Returns:
+        The image, cacheable for a year.
+    """
+    url = request.args.get("url")
+    size = request.args.get("size", "full")
+    if not url or size not in SIZES:
+        return jsonify({"error": "An image url and a valid size needed"}), 400
+
+    try:
+        response = send_cached_image(url, size)
+    except (ValueError, requests.RequestException) as e:
+        error, status = image_error(e)
+        return jsonify(error), status
+
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def send_cached_image(url: str, size: str, attempts: int = 3):
+    """
+    send_file of an image from the cache, fetching it if need be.
+    - Once send_file has opened the file, evicting it doesn't affect the
+      response. An image evicted between get() and send_file() is fetched
+      again.
+    """
+    cache = image_proxy.get_cache()
+    for attempt in range(attempts):
+        digest = image_proxy.get(url, size)
+        try:
+            return send_file(
+                cache.path(digest),
+                mimetype=cache.mimetype(digest),
+                etag=digest,
+                max_age=IMAGE_MAX_AGE,
+                conditional=True,
+            )
+        except FileNotFoundError:
+            # the next get() misses the digest and fetches the image again
+            if attempt == attempts - 1:
+                raise
+
+
+def image_error(error: Exception) -> tuple[dict, int]:
+    """The JSON error and status answering a failed image_proxy.get()."""
+    if isinstance(error, ValueError):
+        return {"error": str(error)}, 400
+    return {"error": f"Failed to fetch the image: {error}"}, 502
@@ -1,8 +1,66 @@
-from flask import jsonify
+from contextlib import contextmanager
+from time import perf_counter
+import json
+import logging
+import queue
 
+from flask import Response, jsonify, request
 
-from game_logic.game_state import Game, games, games_lock
+
+from game_logic.game_events import game_events
+from game_logic.game_state import Game
+from game_logic.game_store import game_store
+from game_logic.layout_pool import layout_pool
 from app_logic.database import db
+from app_logic.database_routes import submit_or_queue_score
+from app_logic.metrics import lock_hold, lock_wait, metrics
+
+
+logger = logging.getLogger(__name__)
+
+metrics.gauge(
+    "active_games", "Games in the game store.", lambda: len(game_store)
+)
+metrics.counter(
+    "games_evicted_total",
+    "Games evicted after sitting idle for longer than the TTL.",
+    game_store.get_evicted_count,
+)
+
+
+@contextmanager
+def locked_game(game_id: int, name: str, write: bool = True):
+    """
+    Check a game out of the game store for the duration of the block.
+    - Only this game is locked, other games carry on undisturbed.
+    - write=False for blocks that only read the game, the store then
+      doesn't write it back.
+    - Raises KeyError if the game doesn't exist.
+    """
+    logger.debug("Trying to acquire %s lock of game %s", name, game_id)
+    start = perf_counter()
+    acquired = None
+    try:
+        with game_store.checkout(game_id, write) as game:
+            acquired = perf_counter()
+            lock_wait.observe(acquired - start, name)
+            logger.debug("Acquired %s lock of game %s", name, game_id)
+            try:
+                yield game
+            finally:
+                logger.debug("Releasing %s lock of game %s", name, game_id)
+    finally:
+        # blocks that raise, e.g. a rejected flip, held the lock too
+        if acquired is not None:
+            lock_hold.observe(perf_counter() - acquired, name)
+            logger.debug("Released %s lock of game %s", name, game_id)
+
+
+def publish_flip(game_id: int, payload: dict):
+    """Push a flip to everyone watching the game, and the end of it."""
+    game_events.publish(game_id, "flip", payload)
+    if payload["finished"]:
+        game_events.publish(game_id, "finished", payload)
 
 
 # route("/create_game/<num_pairs>", methods=["POST"])
@@ -10,29 +68,39 @@ def create_game(num_pairs: int | str):
     """
     Create a new game card layout
     - Generates a random shuffled card layout (each card appears twice).
+    - Takes a layout shuffled ahead of time from the layout pool.
     - Saves the layout into the database.
 
+    - num_pairs must be between 1 and Game.MAX_PAIRS.
+
+    Query Parameters:
+        seed (int, optional): Deal the layout this seed always deals, for
+            reproducible tournaments and benchmarks.
+
     Returns:
         The created card layout in JSON format.
     """
-    print("Trying to acquire create_game lock")
-    games_lock.acquire()
-    print("Create_game lock acquired")
     try:
         num_pairs = int(num_pairs)
-        game = Game(num_pairs)
-        game_id = id(game)
-
-        games[game_id] = game
+        if not 1 <= num_pairs <= Game.MAX_PAIRS:
+            raise ValueError(f"Can't deal {num_pairs} pairs")
+        seed = request.args.get("seed")
+        if seed is None:
+            layout_pool.start()
+            layout = layout_pool.take(num_pairs)
+        else:
+            layout = layout_pool.seeded(num_pairs, int(seed))
+        game = Game(num_pairs, layout=layout)
+        game_id = game_store.add(game)
 
         return jsonify(game_id), 201
+    except ValueError:
+        return jsonify(
+            {"error": "The number of pairs or the seed is invalid"}
+        ), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Failed to create game: {str(e)}"}), 500
-    finally:
-        print("Trying to release create_game lock")
-        games_lock.release()
-        print("Create_game lock released")
 
 
 # route("/create_default_game", methods=["POST"])
@@ -42,6 +110,9 @@ def create_default_game():
     - Generates a random shuffled card layout (each card appears twice).
     - Saves the layout into the database.
 
+    Query Parameters:
+        seed (int, optional): See create_game.
+
     Returns:
         The created card layout in JSON format.
     """
@@ -50,141 +121,278 @@ def create_default_game():
 
 # route("/flip/<game_id>/<card_index>", methods=["POST"])
 def flip(game_id: int | str, card_index: int | str):
-    print("Trying to acquire flip lock")
-    games_lock.acquire()
-    print("Flip lock acquired")
     try:
         game_id = int(game_id)
         card_index = int(card_index)
 
-        game = games[game_id]
-        secret_index = game.flip(card_index)
+        with locked_game(game_id, "flip") as game:
+            secret_index, matched = game.flip_card(card_index)
+            status = game.get_status()
 
+        publish_flip(
+            game_id,
+            {"secret_index": secret_index, "matched": matched, **status},
+        )
         return jsonify(secret_index), 201
     except KeyError:
         return jsonify({"error": "The game doesn't exist"}), 400
-    except ValueError:
+    except (ValueError, IndexError):
+        return jsonify({"error": "The game id or the card id is invalid"}), 400
+
+
+# route("/flip_and_status/<game_id>/<card_index>", methods=["POST"])
+def flip_and_status(game_id: int | str, card_index: int | str):
+    """
+    Flip a card and report the game state in the same response.
+    - Saves the client a separate detect_game_finish round-trip per move.
+
+    Returns:
+        {
+            "secret_index": 3,      (-1 if the card can't be flipped)
+            "matched": true,        (null unless it was the second card)
+            "flip_count": 12,
+            "time": 20.5,
+            "finished": false,
+            "remaining_pairs": 4,
+            "matches": 6,
+            "progress": 60.0,       (percentage of the cards removed)
+            "accuracy": 0.75        (matched share of the compared pairs,
+                                     null before the first pair)
+        }
+    """
+    try:
+        game_id = int(game_id)
+        card_index = int(card_index)
+
+        with locked_game(game_id, "flip") as game:
+            secret_index, matched = game.flip_card(card_index)
+            status = game.get_status()
+
+        payload = {"secret_index": secret_index, "matched": matched, **status}
+        publish_flip(game_id, payload)
+        return jsonify(payload), 201
+    except KeyError:
+        return jsonify({"error": "The game doesn't exist"}), 400
+    except (ValueError, IndexError):
+        return jsonify({"error": "The game id or the card id is invalid"}), 400
+
+
+# route("/flip_pair/<game_id>/<first_index>/<second_index>", methods=["POST"])
+def flip_pair(
+    game_id: int | str, first_index: int | str, second_index: int | str
+):
+    """
+    Flip two cards in one request and report the game state.
+
+    Returns:
+        {
+            "secret_indices": [3, 5],   (-1 for a card that can't be flipped)
+            "matched": false,           (null unless a pair was compared)
+            "flip_count": 12,
+            "time": 20.5,
+            "finished": false,
+            "remaining_pairs": 4,
+            "matches": 6,
+            "progress": 60.0,       (percentage of the cards removed)
+            "accuracy": 0.75        (matched share of the compared pairs,
+                                     null before the first pair)
+        }
+    """
+    try:
+        game_id = int(game_id)
+        card_indices = (int(first_index), int(second_index))
+
+        with locked_game(game_id, "flip_pair") as game:
+            results = game.flip_pair(*card_indices)
+            status = game.get_status()
+
+        for index, (secret_index, matched) in zip(card_indices, results):
+            game_events.publish(
+                game_id,
+                "flip",
+                {
+                    "card_index": index,
+                    "secret_index": secret_index,
+                    "matched": matched,
+                    **status,
+                },
+            )
+        if status["finished"]:
+            game_events.publish(game_id, "finished", status)
+
+        return jsonify(
+            {
+                "secret_indices": [secret for secret, _ in results],
+                "matched": results[1][1],
+                **status,
+            }
+        ), 201
+    except KeyError:
+        return jsonify({"error": "The game doesn't exist"}), 400
+    except (ValueError, IndexError):
         return jsonify({"error": "The game id or the card id is invalid"}), 400
-    finally:
-        print("Trying to release flip lock")
-        games_lock.release()
-        print("Flip lock released")
 
 
 # route("/get_time/<game_id>")
 def get_time(game_id: int | str):
-    print("Trying to acquire time lock")
-    games_lock.acquire()
-    print("Time lock acquired")
     try:
-        game = games[int(game_id)]
-        return jsonify(game.get_time()), 201
+        with locked_game(int(game_id), "time", write=False) as game:
+            elapsed = game.get_time()
+        return jsonify(elapsed), 201
     except KeyError:
         return jsonify({"error": "The game doesn't exist"}), 400
     except ValueError:
         return jsonify({"error": "The game id is invalid"}), 400
-    finally:
-        print("Trying to release time lock")
-        games_lock.release()
-        print("Time lock released")
 
 
 # route("/get_flip_count/<game_id>")
 def get_flip_count(game_id: int | str):
-    print("Trying to acquire flip_count lock")
-    games_lock.acquire()
-    print("Flip_count lock acquired")
     try:
-        game = games[int(game_id)]
-        return jsonify(game.get_flip_count()), 201
+        with locked_game(int(game_id), "flip_count", write=False) as game:
+            flip_count = game.get_flip_count()
+        return jsonify(flip_count), 201
     except KeyError:
         return jsonify({"error": "The game doesn't exist"}), 400
     except ValueError:
         return jsonify({"error": "The game id is invalid"}), 400
-    finally:
-        print("Trying to release flip_count lock")
-        games_lock.release()
-        print("Flip_count lock released")
 
 
 # route("/reset_game/<game_id>")
 def reset_game(game_id: int | str):
-    print("Trying to acquire reset lock")
-    games_lock.acquire()
-    print("Reset lock acquired")
     try:
         game_id = int(game_id)
-        num_pairs = games[game_id].get_num_pairs()
-        del games[game_id]
-
-        game = Game(num_pairs)
-        game_id = id(game)
+        num_pairs = game_store.remove(game_id).get_num_pairs()
+        game_events.publish(game_id, "closed", {})
 
-        games[game_id] = game
+        game = Game(num_pairs, layout=layout_pool.take(num_pairs))
+        game_id = game_store.add(game)
 
         return jsonify(game_id), 201
     except KeyError:
         return jsonify({"error": "The game doesn't exist"}), 400
     except ValueError:
         return jsonify({"error": "The game id is invalid"}), 400
-    finally:
-        print("Trying to release reset lock")
-        games_lock.release()
-        print("Reset lock released")
 
 
 # route("/detect_game_finish/<game_id>")
 def detect_game_finish(game_id: int | str):
-    print("Trying to acquire detect_game_finish lock")
-    games_lock.acquire()
-    print("Detect_game_finish lock acquired")
     try:
         game_id = int(game_id)
-        game = games[game_id]
-        return jsonify(game.detect_finished()), 201
+        with locked_game(game_id, "detect_game_finish", write=False) as game:
+            finished = game.detect_finished()
+        return jsonify(finished), 201
     except KeyError:
         return jsonify({"error": "The game doesn't exist"}), 400
     except ValueError:
         return jsonify({"error": "The game id is invalid"}), 400
-    finally:
-        print("Trying to release detect_game_finish lock")
-        games_lock.release()
-        print("Detect_game_finish lock released")
 
 
 # route(/delete_game/<game_id>)
 def delete_game(game_id: int | str):
-    print("Trying to acquire delete_game lock")
-    games_lock.acquire()
-    print("Delete_game lock acquired")
     try:
         game_id = int(game_id)
-        del games[game_id]
+        game_store.remove(game_id)
+        game_events.publish(game_id, "closed", {})
         return jsonify(True), 201
     except KeyError:
         return jsonify({"error": "The game doesn't exist"}), 400
     except ValueError:
         return jsonify({"error": "The game id is invalid"}), 400
-    finally:
-        print("Trying to release delete_game lock")
-        games_lock.release()
-        print("Delete_game lock released")
 
 
 # route(/submit_game/<game_id>/<player_name>)
 def submit_game(game_id: int | str, player_name: str):
-    print("Trying to acquire submit lock")
-    games_lock.acquire()
-    print("Submit lock acquired")
     try:
         game_id = int(game_id)
-        game = games[game_id]
-        return game.submit_score(player_name)
+        with locked_game(game_id, "submit", write=False) as game:
+            completion_time, flip_count = game.get_result()
     except KeyError:
         return jsonify({"error": "The game doesn't exist"}), 400
     except ValueError:
         return jsonify({"error": "The game id is invalid"}), 400
-    finally:
-        print("Trying to release submit lock")
-        games_lock.release()
-        print("Submit lock release")
+
+    # the database write happens after the game lock is released, so a slow
+    # commit never stalls flips on this game
+    return submit_or_queue_score(player_name, completion_time, flip_count)
+
+
+# seconds between timer events on a quiet event stream
+EVENT_TICK_INTERVAL = 1.0
+
+
+def format_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def tick_event(game_id: int) -> tuple[str, dict]:
+    """
+    The periodic timer event, or the event that ends the stream.
+    - "finished" once the game is, the "finished" event itself only
+      reaches streams in the process the last flip was made in.
+    - "closed" once the game is gone.
+    """
+    try:
+        with game_store.checkout(game_id, write=False) as game:
+            status = game.get_status()
+            if status["finished"]:
+                return "finished", status
+            return "time", {**status, "time": game.get_time()}
+    except KeyError:
+        return "closed", {}
+
+
+def read_stream_status(game_id: int) -> dict:
+    """
+    The "status" event an event stream starts with.
+    Raises KeyError if the game doesn't exist.
+    """
+    with locked_game(game_id, "events", write=False) as game:
+        return game.get_status()
+
+
+# route("/game_events/<game_id>")
+def game_event_stream(game_id: int | str):
+    """
+    Stream a game's events to the player's page or to spectators (SSE).
+    - "status" first, with the current flip count, time and finished flag.
+    - "flip" after every flip, with the same payload as /flip_and_status.
+    - "time" every EVENT_TICK_INTERVAL seconds without any other event.
+    - "finished" when the last pair is found, "closed" when the game is
+      reset, deleted or expires. The stream ends after either one. A
+      stream served by another process than the one the game was played
+      in gets them on the next tick.
+    """
+    try:
+        game_id = int(game_id)
+        # subscribe before reading the status so no flip slips in between
+        subscriber = game_events.subscribe(game_id)
+        status = read_stream_status(game_id)
+    except KeyError:
+        game_events.unsubscribe(game_id, subscriber)
+        return jsonify({"error": "The game doesn't exist"}), 400
+    except ValueError:
+        return jsonify({"error": "The game id is invalid"}), 400
+
+    def stream():
+        try:
+            yield format_event("status", status)
+            if status["finished"]:
+                return
+
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=EVENT_TICK_INTERVAL)
+                except queue.Empty:
+                    event, data = tick_event(game_id)
+
+                yield format_event(event, data)
+                if event in ("finished", "closed"):
+                    return
+        finally:
+            game_events.unsubscribe(game_id, subscriber)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
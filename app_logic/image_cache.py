@@ -0,0 +1,320 @@
+from collections.abc import Callable
+from pathlib import Path
+from time import time, time_ns
+from urllib.parse import urlsplit
+import hashlib
+import io
+import logging
+import os
+import threading
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+# the variants an image is served in
+SIZES = ("full", "card")
+
+# largest upstream image accepted, in bytes
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+
+def sniff_mimetype(data: bytes) -> str | None:
+    """The image type of data from its magic number, None if not an image."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class ImageCache:
+    """
+    Images on local disk, content-addressed by their SHA-256.
+    - An image reached through several URLs or variants is stored once.
+    - The files are kept under max_bytes in total, the least recently
+      served are deleted first. Recency is the file's mtime and every
+      store rescans the directory, so processes sharing it evict each
+      other's files and the limit holds for all of them together.
+    - Which URL and variant has which digest is only kept in memory. After
+      a restart an image is downloaded once more but its file is reused.
+    """
+
+    # seconds after which a temporary file is a write cut short
+    STALE_TEMPORARY_AGE = 60
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self._directory = Path(directory)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # one eviction scan at a time in this process
+        self._evict_lock = threading.Lock()
+        # (url, size) -> digest
+        self._index: dict[tuple[str, str], str] = {}
+
+    def lookup(self, key: tuple[str, str]) -> str | None:
+        """The digest stored for key, marking it as recently used."""
+        with self._lock:
+            digest = self._index.get(key)
+        if digest is None:
+            return None
+        try:
+            touch(self.path(digest))
+        except FileNotFoundError:
+            # evicted since, maybe by another process
+            with self._lock:
+                if self._index.get(key) == digest:
+                    del self._index[key]
+            return None
+        return digest
+
+    def store(self, key: tuple[str, str], data: bytes) -> str:
+        """Save data for key and return its digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        try:
+            touch(path)
+        except FileNotFoundError:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix(
+                f".{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            temporary.write_bytes(data)
+            os.replace(temporary, path)
+            touch(path)
+
+        with self._lock:
+            self._index[key] = digest
+        self._evict(keep=digest)
+        return digest
+
+    def read(self, digest: str) -> bytes:
+        return self.path(digest).read_bytes()
+
+    def mimetype(self, digest: str) -> str:
+        with open(self.path(digest), "rb") as file:
+            return sniff_mimetype(file.read(12)) or "application/octet-stream"
+
+    def path(self, digest: str) -> Path:
+        return self._directory / digest
+
+    def get_total_bytes(self) -> int:
+        return sum(size for _, _, size in self._scan())
+
+    def __len__(self) -> int:
+        return len(self._scan())
+
+    def _scan(self) -> list[tuple[int, str, int]]:
+        """
+        (mtime in ns, digest, size) of every file, least recently used
+        first. Deletes temporary files left behind by a crash.
+        """
+        files = []
+        stale = time() - self.STALE_TEMPORARY_AGE
+        try:
+            entries = list(os.scandir(self._directory))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # evicted by another process
+            if "." in entry.name:
+                if stat.st_mtime < stale:
+                    Path(entry.path).unlink(missing_ok=True)
+                continue
+            files.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        files.sort()
+        return files
+
+    def _evict(self, keep: str) -> None:
+        # keeps the file just stored at least
+        with self._evict_lock:
+            files = self._scan()
+            total_bytes = sum(size for _, _, size in files)
+            for _, digest, size in files:
+                if total_bytes <= self._max_bytes:
+                    break
+                if digest != keep:
+                    self.path(digest).unlink(missing_ok=True)
+                    total_bytes -= size
+
+
+def touch(path: Path) -> None:
+    """
+    Mark path as just used. The time is set explicitly, the kernel's own
+    file clock ticks too coarsely to order files written in a burst.
+    """
+    now = time_ns()
+    os.utime(path, ns=(now, now))
+
+
+def downscale(data: bytes, max_side: int) -> bytes | None:
+    """
+    A JPEG of data at most max_side pixels wide and high.
+    - None when Pillow isn't installed or the image is animated, those
+      are served at full size.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    with Image.open(io.BytesIO(data)) as image:
+        if getattr(image, "is_animated", False):
+            return None
+        image.thumbnail((max_side, max_side))
+        output = io.BytesIO()
+        image.convert("RGB").save(output, "JPEG", quality=85)
+        return output.getvalue()
+
+
+def download(url: str, timeout: float, session=requests) -> bytes:
+    """
+    The body of url, as long as it is an image below MAX_IMAGE_BYTES.
+    Raises ValueError for anything else.
+    - Redirects aren't followed, they could lead off the allowed hosts.
+    """
+    with session.get(
+        url, timeout=timeout, stream=True, allow_redirects=False
+    ) as response:
+        response.raise_for_status()
+        if response.is_redirect:
+            raise ValueError("The image host redirected the request")
+        data = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            data += chunk
+            if len(data) > MAX_IMAGE_BYTES:
+                raise ValueError("The image is too large")
+    if sniff_mimetype(data) is None:
+        raise ValueError("The upstream file is not an image")
+    return bytes(data)
+
+
+def url_origin(url: str) -> str | None:
+    """
+    The scheme://host[:port] of url, None when it carries a user name or
+    password, as those can make a URL look like it's on another host.
+    """
+    parts = urlsplit(url)
+    if not parts.hostname or "@" in parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class ImageProxy:
+    """
+    Duck API images served from the local ImageCache.
+    - Each image is downloaded once, however many players ask for it at
+      the same time.
+    - Only URLs on allowed_origins are fetched, the proxy can't be used to
+      reach anything else. An origin is a scheme, host and port, so
+      another port or http on an allowed host is refused as well.
+    - The card size is downscaled to card_side pixels when Pillow is
+      installed.
+    """
+
+    def __init__(
+        self,
+        cache: ImageCache,
+        allowed_origins: set[str],
+        fetch: Callable[[str], bytes],
+        card_side: int = 256,
+    ) -> None:
+        self._cache = cache
+        self._allowed_origins = {
+            origin
+            for origin in map(url_origin, allowed_origins)
+            if origin is not None
+        }
+        self._fetch = fetch
+        self._card_side = card_side
+        self._lock = threading.Lock()
+        # one lock per image being downloaded
+        self._downloads: dict[str, threading.Lock] = {}
+
+    def get_cache(self) -> ImageCache:
+        return self._cache
+
+    def get(self, url: str, size: str = "full") -> str:
+        """
+        The digest of url in the given size, fetching it if need be.
+        Raises ValueError for a URL that isn't allowed or isn't an image,
+        and requests.RequestException when the download fails.
+        """
+        if url_origin(url) not in self._allowed_origins:
+            raise ValueError("The image host is not allowed")
+        if size not in SIZES:
+            raise ValueError(f"Unknown image size: {size}")
+
+        digest = self._cache.lookup((url, size))
+        if digest is not None:
+            return digest
+
+        with self._lock:
+            download_lock = self._downloads.setdefault(url, threading.Lock())
+        try:
+            with download_lock:
+                return self._fill(url, size)
+        finally:
+            with self._lock:
+                self._downloads.pop(url, None)
+
+    def _fill(self, url: str, size: str) -> str:
+        # another request may have filled it while this one waited
+        digest = self._cache.lookup((url, size))
+        if digest is not None:
+            return digest
+
+        original = self._cache.lookup((url, "full"))
+        data = None
+        if original is not None:
+            try:
+                data = self._cache.read(original)
+            except FileNotFoundError:
+                pass  # evicted since the lookup, fetched again below
+        if data is None:
+            data = self._fetch(url)
+            original = self._cache.store((url, "full"), data)
+        if size == "full":
+            return original
+
+        try:
+            smaller = downscale(data, self._card_side)
+        except Exception:
+            logger.exception("Error downscaling %s", url)
+            smaller = None
+        if smaller is None or len(smaller) >= len(data):
+            smaller = data
+        return self._cache.store((url, size), smaller)
+
+
+def create_image_proxy(api_base_url: str) -> ImageProxy:
+    """
+    Build the image proxy from the environment.
+    - IMAGE_CACHE_DIR: directory of the cached images.
+    - IMAGE_CACHE_MAX_BYTES: the most bytes of images kept in
+      IMAGE_CACHE_DIR by all the processes sharing it, 512 MiB unless set.
+    - IMAGE_PROXY_ORIGINS: comma-separated scheme://host[:port] origins
+      images may come from, the Duck API's origin unless set.
+    - IMAGE_PROXY_CARD_SIZE: longest side of a card-sized image in pixels.
+    - IMAGE_FETCH_TIMEOUT: seconds before a download is abandoned.
+    """
+    origins = os.getenv("IMAGE_PROXY_ORIGINS") or api_base_url
+    session = requests.Session()
+    timeout = float(os.getenv("IMAGE_FETCH_TIMEOUT", 5))
+    return ImageProxy(
+        ImageCache(
+            os.getenv("IMAGE_CACHE_DIR", "image_cache"),
+            max_bytes=int(os.getenv("IMAGE_CACHE_MAX_BYTES", 512 << 20)),
+        ),
+        allowed_origins={origin.strip() for origin in origins.split(",")},
+        fetch=lambda url: download(url, timeout, session),
+        card_side=int(os.getenv("IMAGE_PROXY_CARD_SIZE", 256)),
+    )
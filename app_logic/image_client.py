@@ -0,0 +1,238 @@
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from math import ceil
+from time import perf_counter
+from typing import TYPE_CHECKING
+import asyncio
+import threading
+
+from app_logic.metrics import image_fetch_latency
+
+# imported with the first session, it is slow to import and most app
+# processes start long before they fetch an image
+if TYPE_CHECKING:
+    import aiohttp
+
+
+async def fetch_image(session, base_url):
+    """
+    Fetch a single image from the Duck API.
+    - Makes an HTTP GET request to the API to retrieve a random image.
+
+    Returns:
+        A dictionary containing the URL of the fetched image.
+    """
+    async with session.get(base_url + "/random") as response:
+        response.raise_for_status()
+        data = await response.json()
+        return {"url": data["url"]}
+
+
+class RequestBudget:
+    """Upstream requests a fetch may still send, hedges included."""
+
+    def __init__(self, limit: int) -> None:
+        self.remaining = limit
+
+    def take(self) -> bool:
+        """Spend one request, False when none are left."""
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class ImageClient:
+    """
+    A long-lived client for the Duck API shared by every request.
+    - Runs its own event loop on a daemon thread, so a single pooled
+      aiohttp session keeps its TCP/TLS connections across requests.
+    - A semaphore bounds the number of requests in flight.
+    - Each request has a timeout, and is hedged with a second request when
+      the first one is slow.
+    - Unique fetches over-fetch to make up for duplicates and give up after
+      a hard number of attempts.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_concurrency: int = 16,
+        request_timeout: float = 5.0,
+        hedge_after: float = 1.0,
+        max_attempts_factor: int = 4,
+    ) -> None:
+        """
+        :param max_attempts_factor: A unique fetch of n images gives up
+            after n * max_attempts_factor upstream requests, hedges
+            included.
+        """
+        self._base_url = base_url
+        self._max_concurrency = max_concurrency
+        self._request_timeout = request_timeout
+        self._hedge_after = hedge_after
+        self._max_attempts_factor = max_attempts_factor
+
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # only touched from the loop thread
+        self._session: "aiohttp.ClientSession | None" = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def fetch_images(self, num_images: int) -> list[dict]:
+        """Fetch images, duplicates allowed and failed requests skipped."""
+        return self._run(self._fetch_many(num_images), num_images)
+
+    def fetch_unique_images(
+        self, num_images: int, exclude=()
+    ) -> list[dict]:
+        """
+        Fetch exactly num_images unique images, none of them in exclude.
+        Raises RuntimeError when the attempt cap is hit first.
+        """
+        return self._run(self._fetch_unique(num_images, exclude), num_images)
+
+    async def fetch_unique_images_async(
+        self, num_images: int, exclude=()
+    ) -> list[dict]:
+        """
+        fetch_unique_images for callers running an event loop of their own.
+        - The requests still run on the client's loop, where its session
+          lives, the caller's loop only awaits the result and no thread
+          waits for it.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._fetch_unique(num_images, exclude), self._get_loop()
+        )
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), self._result_timeout(num_images)
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        """Close the session and stop the event loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_session(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _result_timeout(self, num_images: int) -> float:
+        # enough time for every attempt to time out once, in waves of
+        # max_concurrency requests
+        waves = ceil(
+            num_images * self._max_attempts_factor / self._max_concurrency
+        )
+        return (waves + 1) * self._request_timeout
+
+    def _run(self, coroutine, num_images: int):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+        try:
+            return future.result(self._result_timeout(num_images))
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, daemon=True
+                ).start()
+            return self._loop
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self._request_timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._session
+
+    async def _close_session(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _fetch_once(self) -> dict:
+        session = self._get_session()
+        async with self._semaphore:
+            start = perf_counter()
+            outcome = "error"
+            try:
+                image = await fetch_image(session, self._base_url)
+                outcome = "ok"
+                return image
+            finally:
+                image_fetch_latency.observe(perf_counter() - start, outcome)
+
+    async def _fetch_hedged(self, budget: RequestBudget | None = None) -> dict:
+        # the caller has accounted for the first request, the hedge is
+        # only sent while the budget allows it
+        first = asyncio.ensure_future(self._fetch_once())
+        done, _ = await asyncio.wait({first}, timeout=self._hedge_after)
+        if done or (budget is not None and not budget.take()):
+            return await first
+
+        # the first request is slow, race a second one against it
+        pending = {first, asyncio.ensure_future(self._fetch_once())}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def _fetch_many(
+        self, num_images: int, budget: RequestBudget | None = None
+    ) -> list[dict]:
+        results = await asyncio.gather(
+            *(self._fetch_hedged(budget) for _ in range(num_images)),
+            return_exceptions=True,
+        )
+        return [image for image in results if isinstance(image, dict)]
+
+    async def _fetch_unique(self, num_images: int, exclude) -> list[dict]:
+        seen = set(exclude)
+        images = []
+        max_attempts = num_images * self._max_attempts_factor
+        budget = RequestBudget(max_attempts)
+        fetched = 0
+        duplicates = 0
+
+        while len(images) < num_images:
+            remaining = num_images - len(images)
+            # over-fetch by the duplicate rate seen so far, capped at 4x
+            duplicate_rate = min(duplicates / fetched, 0.75) if fetched else 0
+            batch = min(
+                ceil(remaining / (1 - duplicate_rate)), budget.remaining
+            )
+            if batch <= 0:
+                raise RuntimeError(
+                    f"Only got {len(images)} of {num_images} unique images "
+                    f"after {max_attempts} requests to the Duck API"
+                )
+            budget.remaining -= batch
+
+            for image in await self._fetch_many(batch, budget):
+                fetched += 1
+                if image["url"] in seen:
+                    duplicates += 1
+                elif len(images) < num_images:
+                    seen.add(image["url"])
+                    images.append(image)
+
+        return images
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+from collections.abc import Callable
+from time import time
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePool:
+    """
+    A background-refilled pool of unique image URLs.
+    - take() serves URLs from memory and removes them from the pool.
+    - A daemon thread tops the pool back up to max_size whenever it drops
+      below low_watermark.
+    - URLs older than ttl seconds are thrown away instead of served.
+    """
+
+    def __init__(
+        self,
+        fetch_batch: Callable[[int], list[dict]],
+        max_size: int = 100,
+        low_watermark: int = 40,
+        ttl: float = 3600,
+        refill_interval: float = 5.0,
+    ) -> None:
+        """
+        :param fetch_batch: Fetches the given number of images from
+            upstream, duplicates are allowed.
+        """
+        self._fetch_batch = fetch_batch
+        self._max_size = max_size
+        self._low_watermark = low_watermark
+        self._ttl = ttl
+        self._refill_interval = refill_interval
+
+        self._urls: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the refill thread, does nothing if it already runs."""
+        with self._lock:
+            if self._thread is not None or self._max_size <= 0:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def take(self, count: int) -> list[dict]:
+        """
+        Remove up to count unique images from the pool.
+        Returns fewer than count when the pool runs dry.
+        """
+        images = []
+        with self._lock:
+            self._drop_expired()
+            while self._urls and len(images) < count:
+                url, _ = self._urls.popitem(last=False)
+                images.append({"url": url})
+            below_watermark = len(self._urls) < self._low_watermark
+
+        if below_watermark:
+            self._wakeup.set()
+        return images
+
+    def refill(self) -> int:
+        """Top the pool up to max_size once, return how many were added."""
+        with self._lock:
+            self._drop_expired()
+            missing = self._max_size - len(self._urls)
+        if missing <= 0:
+            return 0
+
+        fetched = self._fetch_batch(missing)
+        now = time()
+        added = 0
+        with self._lock:
+            for image in fetched:
+                if len(self._urls) >= self._max_size:
+                    break
+                if image["url"] not in self._urls:
+                    self._urls[image["url"]] = now
+                    added += 1
+        return added
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def _drop_expired(self) -> None:
+        # entries are in insertion order, so the oldest are at the front
+        cutoff = time() - self._ttl
+        while self._urls:
+            url, fetched_at = next(iter(self._urls.items()))
+            if fetched_at > cutoff:
+                break
+            del self._urls[url]
+
+    def _run(self) -> None:
+        while True:
+            if len(self) < self._low_watermark:
+                try:
+                    self.refill()
+                except Exception:
+                    logger.exception("Error refilling the image pool")
+            self._wakeup.wait(self._refill_interval)
+            self._wakeup.clear()
@@ -1,13 +1,37 @@
 from flask import Flask
+from sqlalchemy import text
+import logging
 import os
+import threading
 
 
+from app_logic import fetch_image_routes
 from app_logic.database import (
+    get_engine_options,
     init_db_connection,
+    is_connection_error,
     load_sql_queries,
     db,
     migrate,
 )
+from app_logic.database_routes import insert_scores, load_player_names
+from app_logic.logging_config import configure_logging
+from app_logic.metrics import init_metrics
+from app_logic.player_names import player_names
+from app_logic.score_ingest import ScoreIngestQueue
+from app_logic.static_assets import init_static_assets
+
+
+logger = logging.getLogger(__name__)
+
+# what each bootstrap query in sql_queries.ini creates, in the order they
+# run
+SCHEMA_OBJECTS = {
+    "create_player_scores": "player_scores",
+    "create_leaderboard_index": "ix_player_scores_leaderboard",
+    "create_player_name_index": "ix_player_scores_player_name",
+    "create_created_at_index": "ix_player_scores_created_at",
+}
 
 
 def create_app(
@@ -20,6 +44,7 @@ def create_app(
     :param isTest: Whether to use testing or production database URL.
     :return: Configured Flask app instance.
     """
+    configure_logging()
     app = Flask(app_name, template_folder=template_folder)
 
     # Choose the appropriate database URL based on isTest
@@ -39,23 +64,115 @@ def create_app(
             f"{'TEST_FLASK_DB_URL' if isTest else 'FLASK_DB_URL'}"
         )
 
+    # Flask SQLAlchemy and Migrate configuration
+    app.config["SQLALCHEMY_DATABASE_URI"] = flask_db_url
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = get_engine_options()
+    # the score export reads through ADBC instead of SQLAlchemy
+    app.config["TARGET_DB_URL"] = target_db_url
+    db.init_app(app)
+    migrate.init_app(app, db)
+
+    # Create tables and indexes in the target database, unless they exist
+    with app.app_context():
+        if not schema_is_current(db.engine):
+            bootstrap_schema(target_db_url)
+
+    init_metrics(app)
+    init_static_assets(app)
+
+    # fill the image pool now, so not even the first game waits on the
+    # Duck API. Off in tests, which would otherwise fetch in the background
+    if os.getenv("IMAGE_POOL_PREWARM", "0" if isTest else "1") == "1":
+        fetch_image_routes.image_pool.start()
+
+    if os.getenv("SCORE_WRITE_BEHIND"):
+        init_score_ingest(app)
+
+    threading.Thread(
+        target=warm_player_names, args=(app,), daemon=True
+    ).start()
+
+    return app
+
+
+def schema_is_current(engine) -> bool:
+    """
+    Whether the database already has the schema, checked with a single
+    catalog query over the app's own connection pool.
+    - Once Flask-Migrate manages the database (alembic_version exists),
+      the migrations own the schema and the bootstrap never runs.
+    - Otherwise every table and index the bootstrap creates must exist.
+    """
+    names = ["alembic_version", *SCHEMA_OBJECTS.values()]
+    with engine.connect() as conn:
+        found = {
+            name
+            for name, exists in conn.execute(
+                text(
+                    "SELECT name, to_regclass(name) IS NOT NULL"
+                    " FROM unnest(CAST(:names AS text[])) AS name"
+                ),
+                {"names": names},
+            )
+            if exists
+        }
+    return "alembic_version" in found or found >= set(SCHEMA_OBJECTS.values())
+
+
+def bootstrap_schema(target_db_url: str):
+    """
+    Create the tables and indexes of sql_queries.ini in the target
+    database.
+    :param target_db_url: ADBC connection URL of the target database.
+    """
     # Load SQL queries from the configuration file
     sql_queries = load_sql_queries("app_logic/sql_queries.ini")
 
     # Initialize target database connections
     target_conn, target_cur = init_db_connection(target_db_url)
 
-    # Create tables in the target database
-    target_cur.execute(sql_queries["table_creation"]["create_player_scores"])
+    for query_name in SCHEMA_OBJECTS:
+        target_cur.execute(sql_queries["table_creation"][query_name])
+    target_conn.commit()
 
     # Close database connections
     target_cur.close()
     target_conn.close()
 
-    # Flask SQLAlchemy and Migrate configuration
-    app.config["SQLALCHEMY_DATABASE_URI"] = flask_db_url
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    db.init_app(app)
-    migrate.init_app(app, db)
 
-    return app
+def warm_player_names(app: Flask):
+    """Load the player name filter so the first name checks need no query."""
+    try:
+        with app.app_context():
+            player_names.refresh(load_player_names)
+    except Exception:
+        logger.exception("Error warming the player name filter")
+
+
+def init_score_ingest(app: Flask):
+    """
+    Save submitted scores through the write-behind queue.
+    - SCORE_SPOOL_PATH: local file queued scores are spooled to, each
+      worker process adds its pid to the name. Scores the database refuses
+      end up in a .dead file next to it.
+    - SCORE_QUEUE_SIZE: queued scores before submissions are refused.
+    - SCORE_BATCH_SIZE: the most scores written per insert.
+    - SCORE_FLUSH_INTERVAL: seconds between flushes of a partial batch.
+    """
+
+    def flush(scores):
+        with app.app_context():
+            insert_scores(scores)
+
+    score_queue = ScoreIngestQueue(
+        flush,
+        spool_path=os.getenv("SCORE_SPOOL_PATH", "score_spool.jsonl"),
+        max_queued=int(os.getenv("SCORE_QUEUE_SIZE", 10_000)),
+        batch_size=int(os.getenv("SCORE_BATCH_SIZE", 500)),
+        flush_interval=float(os.getenv("SCORE_FLUSH_INTERVAL", 1.0)),
+        is_retryable=is_connection_error,
+    )
+    score_queue.start()
+    app.extensions["score_ingest"] = score_queue
+    return score_queue
@@ -0,0 +1,99 @@
+from bisect import bisect_right
+from collections.abc import Callable
+from time import time
+import json
+import os
+import threading
+
+from app_logic.score_writes import on_external_score_write
+
+
+def leaderboard_key(entry: dict) -> tuple:
+    """Leaderboard order: fastest first, then fewest moves, then oldest."""
+    return entry["completion_time"], entry["moves"], entry["id"]
+
+
+class LeaderboardCache:
+    """
+    In-process cache of the top entries of the leaderboard.
+    - Keeps the entries sorted and their JSON serialized, so a read is a
+      single attribute access.
+    - Scores submitted by this process are merged in with add().
+    - Any other write to player_scores made through SQLAlchemy (a bulk
+      insert, a delete) invalidates the cache once its transaction ends.
+      Writes from other processes are picked up by reloading at least
+      every ttl seconds.
+    """
+
+    def __init__(self, size: int = 10, ttl: float = 10.0) -> None:
+        self._size = size
+        self._ttl = ttl
+        self._keys: list[tuple] = []
+        self._entries: list[dict] = []
+        self._json: bytes | None = None
+        self._loaded_at = 0.0
+        # bumped on every change so a slow reload can't store stale rows
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_json(self, load: Callable[[int], list[dict]]) -> bytes:
+        """
+        The leaderboard as JSON bytes.
+        :param load: Reads the top n entries, in leaderboard order, from
+            the database. Only called when the cache is empty or stale.
+        """
+        with self._lock:
+            if self._is_fresh():
+                return self._json
+            generation = self._generation
+
+        entries = load(self._size)
+        serialized = json.dumps(entries).encode()
+
+        with self._lock:
+            if generation == self._generation:
+                self._keys = [leaderboard_key(entry) for entry in entries]
+                self._entries = list(entries)
+                self._json = serialized
+                self._loaded_at = time()
+        return serialized
+
+    def get_cached_json(self) -> bytes | None:
+        """The leaderboard as JSON bytes, None unless it is fresh."""
+        with self._lock:
+            return self._json if self._is_fresh() else None
+
+    def add(self, entry: dict) -> None:
+        """Merge a newly committed score into the cached leaderboard."""
+        with self._lock:
+            self._generation += 1
+            if self._json is None:
+                return  # nothing cached, the next read loads it
+
+            key = leaderboard_key(entry)
+            if len(self._keys) >= self._size and key >= self._keys[-1]:
+                return  # doesn't make the cut
+
+            position = bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._entries.insert(position, entry)
+            del self._keys[self._size:]
+            del self._entries[self._size:]
+            self._json = json.dumps(self._entries).encode()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._json = None
+            self._keys = []
+            self._entries = []
+
+    def _is_fresh(self) -> bool:
+        # called with self._lock held
+        return self._json is not None and time() - self._loaded_at < self._ttl
+
+
+leaderboard_cache = LeaderboardCache(
+    ttl=float(os.getenv("LEADERBOARD_CACHE_TTL", 10))
+)
+on_external_score_write(leaderboard_cache.invalidate)
@@ -0,0 +1,165 @@
+from logging.handlers import QueueHandler
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+
+
+# attributes every LogRecord has, anything else was passed with extra=
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_writer: "LogWriter | None" = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including the fields passed with extra=."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the writer thread.
+    - The logging thread only creates the record and queues it, the
+      message, timestamp and traceback are formatted off the request path.
+    - Arguments are formatted later, so they must not be changed after the
+      call; the app only logs ids, names and numbers.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class LogWriter:
+    """
+    Background thread writing queued log records through a handler.
+    - Drains whatever is queued and writes it with a single write() and
+      flush(), so a burst of records costs one system call instead of one
+      each.
+    """
+
+    def __init__(
+        self, records: queue.SimpleQueue, handler: logging.Handler
+    ) -> None:
+        self._records = records
+        self._handler = handler
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Wait until everything queued so far is written."""
+        written = threading.Event()
+        self._records.put(written)
+        written.wait(timeout)
+
+    def stop(self) -> None:
+        self._records.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._records.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._records.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            for item in batch:
+                if isinstance(item, logging.LogRecord):
+                    if item.levelno >= self._handler.level:
+                        lines.append(self._handler.format(item) + "\n")
+            if lines:
+                self._write("".join(lines))
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if None in batch:
+                return
+
+    def _write(self, text: str) -> None:
+        try:
+            stream = self._handler.stream
+            stream.write(text)
+            stream.flush()
+        except Exception:
+            # never let a broken stdout take the writer thread down
+            pass
+
+
+def create_log_handler(log_format: str = "text") -> logging.Handler:
+    """Handler writing to stdout, as text or as JSON lines."""
+    handler = logging.StreamHandler(sys.stdout)
+    if log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+        )
+    return handler
+
+
+def configure_logging(
+    level: str | None = None, log_format: str | None = None
+) -> None:
+    """
+    Route the app's log records through a queue to a background thread.
+    - Logging call sites only format the record and put it on the queue,
+      stdout is written by the writer thread, so no request blocks on
+      I/O while it holds a game lock.
+    - LOG_LEVEL: DEBUG traces every game lock, INFO (default) leaves the
+      tracing out.
+    - LOG_FORMAT: text (default) or json.
+    - Configures the app_logic and game_logic loggers once per process,
+      later calls only change the level.
+    """
+    global _writer
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    loggers = [logging.getLogger(name) for name in ("app_logic", "game_logic")]
+    for logger in loggers:
+        logger.setLevel(level)
+    if _writer is not None:
+        return
+
+    records = queue.SimpleQueue()
+    handler = create_log_handler(log_format or os.getenv("LOG_FORMAT", "text"))
+    _writer = LogWriter(records, handler)
+    _writer.start()
+    # write what is still queued on exit
+    atexit.register(_writer.stop)
+
+    for logger in loggers:
+        logger.addHandler(DeferredQueueHandler(records))
+        logger.propagate = False
+
+
+def flush_logging() -> None:
+    """Wait until every record logged so far has been written."""
+    if _writer is not None:
+        _writer.flush()
@@ -0,0 +1,232 @@
+from bisect import bisect_left
+from collections.abc import Callable
+from time import perf_counter
+import logging
+import threading
+
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+# seconds, from a cached flip to a slow upstream request
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def escape_label(value) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def format_labels(names: tuple[str, ...], values: tuple) -> str:
+    pairs = ",".join(
+        f'{name}="{escape_label(value)}"' for name, value in zip(names, values)
+    )
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class Histogram:
+    """
+    Prometheus histogram, one series per combination of label values.
+    - observe() is a bisect and three additions under a lock, cheap enough
+      for the flip path.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0]
+                self._series[label_values] = series
+            series[0][position] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = [
+                (labels, list(counts), total)
+                for labels, (counts, total) in self._series.items()
+            ]
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, counts, total in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = format_labels(
+                    (*self.label_names, "le"), (*labels, bound)
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            series_labels = format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{series_labels} {total}")
+            lines.append(f"{self.name}_count{series_labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Gauge, or counter kept elsewhere, read from a callback when the metrics
+    are scraped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        read: Callable[[], float],
+        metric_type: str = "gauge",
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self._read = read
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+            f"{self.name} {self._read()}",
+        ]
+
+
+class MetricsRegistry:
+    """All metrics of the process, rendered in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Histogram | Gauge] = {}
+
+    def histogram(self, name: str, documentation: str, *args) -> Histogram:
+        return self._register(Histogram(name, documentation, *args))
+
+    def gauge(self, name, documentation, read) -> Gauge:
+        return self._register(Gauge(name, documentation, read))
+
+    def counter(self, name, documentation, read) -> Gauge:
+        return self._register(Gauge(name, documentation, read, "counter"))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logger.exception("Error rendering metric %s", metric.name)
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+metrics = MetricsRegistry()
+
+request_latency = metrics.histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route.",
+    ("method", "route", "status"),
+)
+lock_wait = metrics.histogram(
+    "game_lock_wait_seconds",
+    "Time to check a game out of the game store, by operation.",
+    ("operation",),
+)
+lock_hold = metrics.histogram(
+    "game_lock_hold_seconds",
+    "Time a game stays checked out, by operation.",
+    ("operation",),
+)
+image_fetch_latency = metrics.histogram(
+    "image_fetch_duration_seconds",
+    "Time of a single Duck API request, by outcome.",
+    ("outcome",),
+)
+db_query_latency = metrics.histogram(
+    "db_query_duration_seconds",
+    "Time to execute a database statement, by statement type.",
+    ("statement",),
+)
+
+
+def init_metrics(app: Flask):
+    """Time every request handled by the app."""
+
+    @app.before_request
+    def start_timer():
+        g.request_start = perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop("request_start", None)
+        if start is not None:
+            rule = request.url_rule
+            request_latency.observe(
+                perf_counter() - start,
+                request.method,
+                rule.rule if rule is not None else "unmatched",
+                response.status_code,
+            )
+        return response
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, many):
+    conn.info["query_start"] = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def observe_query(conn, cursor, statement, parameters, context, many):
+    start = conn.info.pop("query_start", None)
+    if start is not None:
+        db_query_latency.observe(
+            perf_counter() - start, statement.split(None, 1)[0].upper()
+        )
+
+
+# route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Metrics of this process
+    - Prometheus text exposition format, for scraping.
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -7,6 +7,12 @@ class PlayerScore(db.Model):
     """Model for storing player scores and performance metrics."""
 
     __tablename__ = "player_scores"
+    __table_args__ = (
+        # backs leaderboard ordering, keyset pagination and rank lookups
+        db.Index(
+            "ix_player_scores_leaderboard", "completion_time", "moves", "id"
+        ),
+    )
     id = db.Column(db.Integer, primary_key=True)  # Unique identifier
     player_name = db.Column(
         db.String(50), nullable=False, index=True
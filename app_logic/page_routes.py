@@ -1,4 +1,15 @@
-from flask import render_template
+from mimetypes import guess_type
+from pathlib import Path
+
+from flask import abort, render_template, request, send_file
+from werkzeug.security import safe_join
+
+from app_logic import static_assets
+
+# fingerprinted names change with their content, so they never go stale
+ASSET_MAX_AGE = 365 * 24 * 3600
+# preferred first
+ASSET_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
 
 
 # @api.route("/")
@@ -14,3 +25,36 @@ def game():
 # @api.route("/leaderboard")
 def leaderboard():
     return render_template("leaderboard.html")
+
+
+# @api.route("/assets/<path:filename>")
+def serve_asset(filename):
+    """
+    Serve a fingerprinted static asset, see app_logic.static_assets
+    - Picks the brotli or gzip copy made by the build when the browser
+      accepts it.
+    - Cacheable for a year without revalidation, a changed file gets a new
+      name.
+    """
+    path = safe_join(str(static_assets.DIST_DIR), filename)
+    if path is None or not Path(path).is_file():
+        abort(404)
+
+    encoding = None
+    for name, suffix in ASSET_ENCODINGS:
+        if request.accept_encodings[name] and Path(path + suffix).is_file():
+            encoding, path = name, path + suffix
+            break
+
+    response = send_file(
+        path,
+        mimetype=guess_type(filename)[0] or "application/octet-stream",
+        max_age=ASSET_MAX_AGE,
+        conditional=True,
+    )
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
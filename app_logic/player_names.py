@@ -0,0 +1,165 @@
+from collections.abc import Callable, Iterable
+from math import ceil, log
+from time import time
+import hashlib
+import logging
+import os
+import threading
+
+from app_logic.score_writes import on_external_score_write
+
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    A set of strings that only answers membership, in fixed memory.
+    - No false negatives: a string that was added is always found.
+    - A string that wasn't added is found with about error_rate chance
+      while no more than capacity strings were added, more often after.
+    - About 1.2 bytes per string at a 1% error rate, however long they are.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self._size = max(64, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self._hashes = max(1, round(self._size / capacity * log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+        self._count = 0
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] >> (position & 7) & 1
+            for position in self._positions(item)
+        )
+
+    def __len__(self) -> int:
+        """How many strings were added, counting repeats."""
+        return self._count
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # double hashing, two 64-bit halves of one digest give every hash
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + i * step) % self._size for i in range(self._hashes)
+        )
+
+
+class PlayerNameIndex:
+    """
+    In-process Bloom filter of the player names that have a score.
+    - A name missing from the filter is free, so the common answer to "is
+      this name taken?" needs no query at all.
+    - A name in the filter is only a hint, the caller confirms it against
+      the database.
+    - Names saved by this process are added with add(). Any other write to
+      player_scores made through SQLAlchemy drops the filter, and it is
+      reloaded at least every ttl seconds to pick up other processes.
+    - While the filter is missing or stale every name is a hint, so callers
+      fall back to their single query, and one reload runs in the
+      background however many requests ask.
+    """
+
+    # the least names a filter is sized for
+    MIN_CAPACITY = 1024
+
+    def __init__(self, ttl: float = 60.0, error_rate: float = 0.01) -> None:
+        self._ttl = ttl
+        self._error_rate = error_rate
+        self._names: BloomFilter | None = None
+        self._loaded_at = 0.0
+        # names in the last load, to size the next filter
+        self._loaded_count = 0
+        # bumped on invalidation so a slow reload can't store stale names
+        self._generation = 0
+        # names added since the last reload started
+        self._added: set[str] = set()
+        self._reloading = False
+        self._lock = threading.Lock()
+        # one refresh at a time, each owns _added while it loads
+        self._refresh_lock = threading.Lock()
+
+    def might_exist(
+        self, player_name: str, load: Callable[[], Iterable[str]]
+    ) -> bool:
+        """
+        False if no score was saved under the name, True if one may have.
+        :param load: Reads every player name from the database. Called on
+            a background thread when the filter is missing or stale.
+        """
+        with self._lock:
+            names = self._names
+            if names is not None and time() - self._loaded_at < self._ttl:
+                return player_name in names
+            start_reload = not self._reloading
+            self._reloading = True
+
+        if start_reload:
+            threading.Thread(
+                target=self._reload, args=(load,), daemon=True
+            ).start()
+        return True
+
+    def refresh(self, load: Callable[[], Iterable[str]]) -> None:
+        """
+        Reload the filter from the database, e.g. to warm it at start-up.
+        - Refreshes run one at a time. Another one starting mid-load would
+          reset the names added since this one started, and the filter it
+          stores would miss them.
+        """
+        with self._refresh_lock:
+            with self._lock:
+                generation = self._generation
+                self._added = set()
+                # room for the names to double before the next reload
+                capacity = max(2 * self._loaded_count, self.MIN_CAPACITY)
+
+            names = BloomFilter(capacity, self._error_rate)
+            for player_name in load():
+                names.add(player_name)
+
+            with self._lock:
+                for player_name in self._added:
+                    names.add(player_name)
+                self._loaded_count = len(names)
+                if generation == self._generation:
+                    self._names = names
+                    self._loaded_at = time()
+
+    def add(self, player_name: str) -> None:
+        """Record a name a score was just committed under."""
+        with self._lock:
+            self._added.add(player_name)
+            if self._names is not None:
+                self._names.add(player_name)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._names = None
+
+    def __len__(self) -> int:
+        return len(self._names or ())
+
+    def _reload(self, load: Callable[[], Iterable[str]]) -> None:
+        try:
+            self.refresh(load)
+        except Exception:
+            logger.exception("Error reloading the player names")
+        finally:
+            with self._lock:
+                self._reloading = False
+
+
+player_names = PlayerNameIndex(
+    ttl=float(os.getenv("PLAYER_NAMES_TTL", 60)),
+    error_rate=float(os.getenv("PLAYER_NAMES_ERROR_RATE", 0.01)),
+)
+on_external_score_write(player_names.invalidate)
@@ -0,0 +1,183 @@
+"""
+Streaming export of player_scores as Arrow IPC or Parquet.
+
+Usage:
+    python -m app_logic.score_export [--since ISO] [--until ISO]
+        [--format arrow|parquet] output
+
+Reads the database URL from TARGET_DB_URL.
+"""
+
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+import argparse
+import io
+import os
+
+# the ADBC driver and pyarrow are imported where they are used, importing
+# them here would slow down the start-up of every app process
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+EXPORT_FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# size of the record batches the driver hands over, and so of the chunks
+# (and Parquet row groups) written out
+EXPORT_BATCH_BYTES = int(os.getenv("EXPORT_BATCH_BYTES", 4 << 20))
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """
+    Parse an ISO 8601 filter bound into the naive UTC created_at is stored
+    in. Raises ValueError on malformed input.
+    """
+    if not value:
+        return None
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def build_export_query(since: datetime | None, until: datetime | None) -> str:
+    """
+    SELECT for the scores created in [since, until), oldest first, walking
+    ix_player_scores_created_at.
+    - The bounds are inlined: the driver only streams through COPY for
+      queries without bound parameters, and otherwise materializes the
+      whole result as one batch. They are datetimes formatted by
+      isoformat, never raw client input.
+    """
+    conditions = [
+        f"created_at {operator} TIMESTAMP '{bound.isoformat()}'"
+        for bound, operator in ((since, ">="), (until, "<"))
+        if bound is not None
+    ]
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return (
+        "SELECT id, player_name, completion_time, moves, created_at"
+        f" FROM player_scores{where} ORDER BY created_at, id"
+    )
+
+
+def iter_score_batches(
+    db_url: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> Iterator["pa.RecordBatch"]:
+    """
+    Stream the matching scores as record batches.
+    - The driver reads the result with COPY and decodes it batch by batch,
+      so memory stays bounded by EXPORT_BATCH_BYTES whatever the table
+      size.
+    - The first item yielded is the schema, every later one a batch.
+    """
+    from adbc_driver_postgresql.dbapi import connect
+
+    query = build_export_query(since, until)
+    with connect(db_url) as conn, conn.cursor() as cur:
+        cur.adbc_statement.set_options(
+            **{
+                "adbc.postgresql.batch_size_hint_bytes": str(
+                    EXPORT_BATCH_BYTES
+                )
+            }
+        )
+        cur.execute(query)
+        reader = cur.fetch_record_batch()
+        yield reader.schema
+        yield from reader
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since last asked."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_export(
+    db_url: str,
+    export_format: str = "arrow",
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> Iterator[bytes]:
+    """
+    Encode the matching scores in export_format, one chunk per batch.
+    :param export_format: "arrow" for an Arrow IPC stream, "parquet" for a
+        Parquet file with one row group per batch.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    batches = iter_score_batches(db_url, since, until)
+    schema = next(batches)
+    sink = ChunkSink()
+    if export_format == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+    else:
+        writer = pq.ParquetWriter(sink, schema)
+
+    with writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("output", help="file to write, - for stdout")
+    parser.add_argument("--since", help="oldest created_at, inclusive")
+    parser.add_argument("--until", help="newest created_at, exclusive")
+    parser.add_argument(
+        "--format", choices=EXPORT_FORMATS, default="parquet"
+    )
+    args = parser.parse_args(argv)
+
+    db_url = os.getenv("TARGET_DB_URL")
+    if not db_url:
+        parser.error("Missing required environment variable: TARGET_DB_URL")
+
+    chunks = iter_export(
+        db_url,
+        args.format,
+        parse_timestamp(args.since),
+        parse_timestamp(args.until),
+    )
+    if args.output == "-":
+        output = os.fdopen(os.dup(1), "wb")
+    else:
+        output = open(args.output, "wb")
+    with output:
+        for chunk in chunks:
+            output.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
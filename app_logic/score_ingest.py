@@ -0,0 +1,307 @@
+from collections import deque
+from collections.abc import Callable
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreIngestQueue:
+    """
+    Write-behind queue for submitted scores.
+    - submit() acknowledges a score as soon as it is appended to a local
+      spool file and synced, so it survives a crash of the process. The
+      sync runs outside the queue's lock, and one fsync covers every score
+      submitted while the previous one ran (group commit).
+    - A daemon thread flushes queued scores to the database in batches of
+      up to batch_size, at least every flush_interval seconds.
+    - The spool is only appended to. After a flush, the number of scores
+      dealt with is appended as a marker, and a replay skips those scores.
+      The spool is emptied whenever the queue is, and compacted once it
+      holds max_queued scores that are dealt with. A crash between the
+      insert and its marker can insert a batch twice (at-least-once
+      delivery).
+    - Each process spools to a file of its own, spool_path with the pid in
+      its name, and holds an flock on it while the queue runs. On start-up
+      a queue takes over the spools nobody holds a lock on, those of
+      processes that are gone, and replays them. Several workers sharing
+      spool_path never replay the same scores or overwrite each other.
+    - Once max_queued scores are waiting, submit() refuses new ones so the
+      caller can push back on the client.
+    - A batch that fails for any reason but a retryable one is written
+      again score by score. The scores that still fail go to a dead-letter
+      file next to the spool instead of blocking the queue.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[dict]], None],
+        spool_path: str,
+        max_queued: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        is_retryable: Callable[[Exception], bool] = lambda error: True,
+    ) -> None:
+        """
+        :param flush: Inserts a batch of scores, raises on failure.
+        :param is_retryable: Whether a failed flush may succeed later as
+            it is, e.g. after a lost database connection. Every failure is
+            unless given.
+        """
+        self._flush = flush
+        self._spool_path = spool_path
+        self._max_queued = max_queued
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._is_retryable = is_retryable
+        stem, suffix = os.path.splitext(spool_path)
+        self._own_path = f"{stem}.{os.getpid()}{suffix}"
+        self._dead_letter_path = f"{stem}.dead{suffix}"
+
+        self._pending: deque[dict] = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        # only one flush at a time, whether from the thread or flush_now
+        self._flush_lock = threading.Lock()
+        # held while syncing or replacing the spool, taken before _lock
+        self._sync_lock = threading.Lock()
+        # scores appended to the spool, and how many of them are synced
+        self._written = 0
+        self._synced = 0
+        # scores dealt with since the spool was last emptied or compacted
+        self._dropped = 0
+        self._thread: threading.Thread | None = None
+        self._spool = None
+
+        orphans = self._take_over_spools()
+        if os.path.exists(self._own_path) and not any(
+            path == self._own_path for path, _ in orphans
+        ):
+            raise RuntimeError(
+                f"{self._own_path} is in use by another queue of this process"
+            )
+        with self._sync_lock, self._lock:
+            # the scores taken over are in our spool before theirs go
+            self._rewrite_spool()
+        for path, spool in orphans:
+            if path != self._own_path:
+                os.unlink(path)
+            spool.close()
+
+    def submit(self, score: dict) -> bool:
+        """Queue a score, False when the queue is full."""
+        line = json.dumps(score) + "\n"
+        with self._lock:
+            if len(self._pending) >= self._max_queued:
+                return False
+            self._spool.write(line)
+            self._spool.flush()
+            self._written += 1
+            written = self._written
+            self._pending.append(score)
+            if len(self._pending) >= self._batch_size:
+                self._ready.notify()
+        self._sync(written)
+        return True
+
+    def start(self) -> None:
+        """Start the flush thread, does nothing if it already runs."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def flush_now(self) -> int:
+        """Flush everything queued so far, return how many were written."""
+        written = 0
+        while True:
+            flushed = self._flush_batch()
+            if not flushed:
+                return written
+            written += flushed
+
+    def close(self) -> None:
+        """
+        Give up the spool without flushing it, the next queue to start
+        takes over what is left in it.
+        """
+        with self._sync_lock, self._lock:
+            self._spool.close()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _flush_batch(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch = [
+                    self._pending[i]
+                    for i in range(min(self._batch_size, len(self._pending)))
+                ]
+            if not batch:
+                return 0
+
+            try:
+                self._flush(batch)
+            except Exception as error:
+                if self._is_retryable(error):
+                    raise
+                # one score the database refuses fails the whole batch
+                self._flush_one_by_one(batch)
+
+            self._drop(len(batch))
+            return len(batch)
+
+    def _flush_one_by_one(self, batch: list[dict]) -> None:
+        for done, score in enumerate(batch):
+            try:
+                self._flush([score])
+            except Exception as error:
+                if self._is_retryable(error):
+                    # keep what is written, retry the rest later
+                    self._drop(done)
+                    raise
+                self._dead_letter(score, error)
+
+    def _dead_letter(self, score: dict, error: Exception) -> None:
+        logger.error(
+            "Moving a score the database refuses to %s: %s (%s)",
+            self._dead_letter_path,
+            score,
+            error,
+        )
+        with open(self._dead_letter_path, "a", encoding="utf-8") as dead:
+            dead.write(json.dumps({**score, "error": str(error)}) + "\n")
+            dead.flush()
+            os.fsync(dead.fileno())
+
+    def _sync(self, written: int) -> None:
+        """Make sure the first written scores are on disk."""
+        with self._sync_lock:
+            if self._synced >= written:
+                return  # synced by a submission that came after it
+            with self._lock:
+                spool, writing = self._spool, self._written
+            os.fsync(spool.fileno())
+            self._synced = writing
+
+    def _drop(self, count: int) -> None:
+        # forget the first count pending scores, they are dealt with
+        if not count:
+            return
+        with self._sync_lock, self._lock:
+            for _ in range(count):
+                self._pending.popleft()
+            self._dropped += count
+            if not self._pending:
+                # a truncation doesn't need a sync: the spool either still
+                # has everything, markers included, or nothing
+                self._spool.seek(0)
+                self._spool.truncate()
+                self._dropped = 0
+            elif self._dropped >= self._max_queued:
+                self._rewrite_spool()
+            else:
+                self._spool.write(f"{count}\n")
+                self._spool.flush()
+
+    def _rewrite_spool(self) -> None:
+        # called with self._sync_lock and self._lock held. The new file is
+        # locked before it replaces the old one, no other process can take
+        # it over between.
+        temp_path = self._own_path + ".tmp"
+        spool = open(temp_path, "w", encoding="utf-8")
+        fcntl.flock(spool, fcntl.LOCK_EX)
+        for score in self._pending:
+            spool.write(json.dumps(score) + "\n")
+        spool.flush()
+        os.fsync(spool.fileno())
+        os.replace(temp_path, self._own_path)
+        if self._spool is not None:
+            self._spool.close()
+        self._spool = spool
+        self._synced = self._written
+        self._dropped = 0
+
+    def _take_over_spools(self) -> list:
+        """
+        Lock and replay the spools of processes that are gone.
+
+        Returns:
+            (path, locked file) of each spool taken over.
+        """
+        directory, name = os.path.split(self._spool_path)
+        stem, suffix = os.path.splitext(name)
+        pattern = re.compile(
+            rf"{re.escape(stem)}\.\d+{re.escape(suffix)}", re.ASCII
+        )
+        # spool_path itself was written before spools were per process
+        paths = [self._spool_path] + [
+            os.path.join(directory, entry)
+            for entry in sorted(os.listdir(directory or "."))
+            if pattern.fullmatch(entry)
+        ]
+
+        orphans = []
+        for path in paths:
+            spool = self._lock_orphan(path)
+            if spool is not None:
+                self._pending.extend(self._replay_spool(spool))
+                orphans.append((path, spool))
+        return orphans
+
+    @staticmethod
+    def _lock_orphan(path: str):
+        """The spool at path, opened and locked, None if it is in use."""
+        try:
+            spool = open(path, encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(spool, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # taken over and deleted, or rewritten, while we waited
+            if os.fstat(spool.fileno()).st_ino != os.stat(path).st_ino:
+                raise FileNotFoundError(path)
+        except OSError:
+            spool.close()
+            return None
+        return spool
+
+    @staticmethod
+    def _replay_spool(spool) -> deque[dict]:
+        """The scores in a spool that were never dealt with."""
+        scores: deque[dict] = deque()
+        for line in spool:
+            try:
+                if not line.endswith("\n"):
+                    raise ValueError("torn line")
+                record = json.loads(line)
+            except ValueError:
+                # a line torn by a crash mid-write was never acknowledged
+                logger.warning("Skipping unreadable spooled score: %r", line)
+                continue
+            if isinstance(record, int):
+                # a marker, that many of the scores before it are done
+                for _ in range(min(record, len(scores))):
+                    scores.popleft()
+            else:
+                scores.append(record)
+        return scores
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._pending) < self._batch_size:
+                    self._ready.wait(self._flush_interval)
+            try:
+                self.flush_now()
+            except Exception:
+                logger.exception("Error flushing queued scores")
+                with self._lock:
+                    self._ready.wait(self._flush_interval)
@@ -0,0 +1,69 @@
+from collections.abc import Callable
+from contextlib import contextmanager
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# called once a transaction that changed player_scores behind the back of
+# the in-process caches has ended
+_invalidation_callbacks: list[Callable[[], None]] = []
+_local = threading.local()
+
+
+def on_external_score_write(callback: Callable[[], None]) -> None:
+    """Register a cache invalidation callback."""
+    _invalidation_callbacks.append(callback)
+
+
+@contextmanager
+def expected_score_write():
+    """
+    Mark writes to player_scores made by this thread as ones the caller
+    merges into the caches itself, so committing them invalidates nothing.
+    Rolling them back still does.
+    """
+    _local.expected = True
+    try:
+        yield
+    finally:
+        _local.expected = False
+
+
+def is_score_write(statement: str) -> bool:
+    return (
+        statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE")
+        and "player_scores" in statement
+    )
+
+
+def invalidate_caches() -> None:
+    for callback in _invalidation_callbacks:
+        callback()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def track_score_writes(conn, cursor, statement, parameters, context, many):
+    if not is_score_write(statement):
+        return
+    if getattr(_local, "expected", False):
+        # only matters if the transaction gets rolled back
+        conn.info["expected_score_write"] = True
+    else:
+        conn.info["external_score_write"] = True
+
+
+@event.listens_for(Engine, "commit")
+def invalidate_after_commit(conn):
+    conn.info.pop("expected_score_write", None)
+    if conn.info.pop("external_score_write", False):
+        invalidate_caches()
+
+
+@event.listens_for(Engine, "rollback")
+def invalidate_after_rollback(conn):
+    expected = conn.info.pop("expected_score_write", False)
+    external = conn.info.pop("external_score_write", False)
+    if expected or external:
+        invalidate_caches()
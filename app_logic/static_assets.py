@@ -0,0 +1,171 @@
+"""
+Fingerprinted, precompressed static assets.
+
+Copies every file under static/ to static/dist/ with a hash of its content
+in its name, rewrites the url(...) references of the stylesheets to the
+new names, writes a .gz copy of every text asset (and a .br one when the
+brotli package is installed) and a manifest.json mapping the original
+names to the fingerprinted ones. Templates link assets with asset_url().
+
+Usage:
+    python -m app_logic.static_assets [--source static] [--output DIR]
+"""
+
+from pathlib import Path
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+from flask import Flask
+
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+DIST_DIR = Path(os.getenv("STATIC_DIST_DIR", STATIC_DIR / "dist"))
+MANIFEST_NAME = "manifest.json"
+# URL path the fingerprinted assets are served under
+ASSETS_URL = "/assets/"
+
+# hex digits of the content hash in a fingerprinted name
+HASH_LENGTH = 12
+# images and fonts are compressed already
+COMPRESSIBLE = {".css", ".js", ".map", ".json", ".svg", ".html", ".txt"}
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+_manifest: dict[str, str] = {}
+
+
+def fingerprint(name: str, data: bytes) -> str:
+    """name with a hash of data before its extension, e.g. a.0123abcd.css"""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, extension = posixpath.splitext(name)
+    return f"{stem}.{digest}{extension}"
+
+
+def rewrite_css_urls(name: str, css: str, manifest: dict[str, str]) -> str:
+    """Point the relative url(...) references of css at fingerprinted names."""
+    directory = posixpath.dirname(name)
+
+    def replace(match: re.Match) -> str:
+        quote, reference = match.groups()
+        # keep a query string or fragment as it is
+        path, query = re.fullmatch(r"([^?#]*)(.*)", reference).groups()
+        if "://" in path or path.startswith(("/", "data:")):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(directory, path))
+        if target not in manifest:
+            return match.group(0)
+        relative = posixpath.relpath(manifest[target], directory or ".")
+        return f"url({quote}{relative}{query}{quote})"
+
+    return CSS_URL.sub(replace, css)
+
+
+def compress(data: bytes) -> dict[str, bytes]:
+    """Compressed copies of data by file suffix, the ones that pay off."""
+    variants = {".gz": gzip.compress(data, 9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return {
+        suffix: compressed
+        for suffix, compressed in variants.items()
+        if len(compressed) < len(data) * 0.95
+    }
+
+
+def write_atomically(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+def build(source: Path = STATIC_DIR, output: Path = DIST_DIR) -> dict:
+    """
+    Fingerprint and compress every asset under source into output.
+    - Files of earlier builds are kept, pages rendered before a deploy
+      still find the assets they link to.
+    - Stylesheets are handled last, so the names they refer to are known.
+
+    Returns:
+        The manifest, original name -> fingerprinted name.
+    """
+    source, output = source.resolve(), output.resolve()
+    names = sorted(
+        path.relative_to(source).as_posix()
+        for path in source.rglob("*")
+        if path.is_file() and output not in path.parents
+    )
+    manifest: dict[str, str] = {}
+    for name in sorted(names, key=lambda name: name.endswith(".css")):
+        data = (source / name).read_bytes()
+        if name.endswith(".css"):
+            css = rewrite_css_urls(name, data.decode("utf-8"), manifest)
+            data = css.encode("utf-8")
+
+        fingerprinted = fingerprint(name, data)
+        manifest[name] = fingerprinted
+        target = output / fingerprinted
+        if target.exists():
+            continue  # same content, same name
+        if target.suffix in COMPRESSIBLE:
+            for suffix, compressed in compress(data).items():
+                write_atomically(
+                    target.with_name(target.name + suffix), compressed
+                )
+        write_atomically(target, data)
+
+    write_atomically(
+        output / MANIFEST_NAME,
+        json.dumps(manifest, indent=2, sort_keys=True).encode(),
+    )
+    return manifest
+
+
+def load_manifest(output: Path = DIST_DIR) -> dict[str, str]:
+    """The manifest of the last build, empty if there was none."""
+    try:
+        return json.loads((output / MANIFEST_NAME).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(name: str) -> str:
+    """
+    URL of a static asset for templates.
+    - The fingerprinted, precompressed copy once the assets are built,
+      the plain file under /static/ otherwise, e.g. in development.
+    """
+    fingerprinted = _manifest.get(name)
+    if fingerprinted is None:
+        return f"/static/{name}"
+    return ASSETS_URL + fingerprinted
+
+
+def init_static_assets(app: Flask):
+    """Load the asset manifest and make asset_url available to templates."""
+    _manifest.clear()
+    _manifest.update(load_manifest(DIST_DIR))
+    app.jinja_env.globals["asset_url"] = asset_url
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", type=Path, default=STATIC_DIR)
+    parser.add_argument("--output", type=Path, default=DIST_DIR)
+    args = parser.parse_args(argv)
+
+    manifest = build(args.source, args.output)
+    print(f"Built {len(manifest)} assets into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
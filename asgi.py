@@ -0,0 +1,15 @@
+"""
+ASGI entry point, for running the app under an ASGI server:
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 2
+
+Image fetching and proxying, game event streams and leaderboard reads are
+awaited on the event loop, every other route is served by the same Flask
+app as app.py, see app_logic.asgi_app.
+"""
+
+from app import app as flask_app
+from app_logic.asgi_app import create_asgi_app
+
+
+app = create_asgi_app(flask_app)
@@ -0,0 +1,153 @@
+"""
+Concurrent slow image requests under ASGI, awaited natively or on threads.
+
+Starts a Duck API stub that answers every request after a delay, and the
+ASGI app under uvicorn with a small pool of Flask threads, twice:
+- native: get_random_images is awaited on the event loop.
+- threads: every route, get_random_images included, runs on the Flask
+  threads, as any WSGI deployment does.
+Then fires concurrent get_random_images requests at each and reports the
+throughput and latency percentiles. The image pool is disabled so every
+request waits on the stub.
+
+Usage:
+    python -m benchmarks.asgi_images [requests] [threads] [delay]
+"""
+
+from statistics import quantiles
+from time import perf_counter, sleep
+import asyncio
+import os
+import subprocess
+import sys
+
+import aiohttp
+
+from benchmarks.load_test import (
+    DuckAPIStub,
+    StubServer,
+    free_port,
+    wait_until_up,
+)
+
+
+class SlowDuckAPIStub(DuckAPIStub):
+    delay = 0.5
+
+    def do_GET(self):
+        sleep(self.delay)
+        super().do_GET()
+
+
+def serve_stub(port: int, delay: float) -> None:
+    SlowDuckAPIStub.delay = delay
+    StubServer(("127.0.0.1", port), SlowDuckAPIStub).serve_forever()
+
+
+def serve_app(port: int, mode: str) -> None:
+    import logging
+
+    import uvicorn
+
+    from apis import register_apis
+    from app_logic import asgi_app
+    from app_logic.init_app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app = create_app(__name__, isTest=True)
+    register_apis(app, __name__)
+    if mode == "threads":
+        asgi_app.native_routes.clear()
+    uvicorn.run(
+        asgi_app.create_asgi_app(app),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    )
+
+
+async def fire(url: str, num_requests: int) -> tuple[float, list[float]]:
+    latencies = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def one():
+            start = perf_counter()
+            async with session.get(url, params={"count": 1}) as response:
+                await response.read()
+                response.raise_for_status()
+            latencies.append(perf_counter() - start)
+
+        start = perf_counter()
+        await asyncio.gather(*(one() for _ in range(num_requests)))
+        return perf_counter() - start, latencies
+
+
+def main(num_requests: int = 200, threads: int = 4, delay: float = 0.5):
+    stub_port = free_port()
+    stub = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            __spec__.name,
+            "--serve-stub",
+            str(stub_port),
+            str(delay),
+        ]
+    )
+    env = {
+        **os.environ,
+        "DUCK_API_BASE_URL": f"http://127.0.0.1:{stub_port}",
+        "ASGI_WSGI_THREADS": str(threads),
+        "IMAGE_POOL_SIZE": "0",
+        # let the stub, not the client's own limit, be the bottleneck
+        "IMAGE_FETCH_CONCURRENCY": str(num_requests),
+        "IMAGE_FETCH_HEDGE_AFTER": str(delay * 4),
+        "LOG_LEVEL": "WARNING",
+    }
+    print(
+        f"{num_requests} concurrent requests, {threads} Flask threads,"
+        f" {delay * 1000:.0f} ms upstream"
+    )
+    print(f"{'mode':<8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    try:
+        for mode in ("native", "threads"):
+            port = free_port()
+            server = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    __spec__.name,
+                    "--serve-app",
+                    str(port),
+                    mode,
+                ],
+                env=env,
+            )
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                wait_until_up(base_url + "/fetch_leaderboard")
+                elapsed, latencies = asyncio.run(
+                    fire(base_url + "/get_random_images", num_requests)
+                )
+            finally:
+                server.terminate()
+                server.wait()
+            cuts = quantiles(latencies, n=100)
+            print(
+                f"{mode:<8} {num_requests / elapsed:8.1f}"
+                f" {cuts[49] * 1000:8.0f} {cuts[98] * 1000:8.0f}"
+            )
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve-stub"]:
+        serve_stub(int(sys.argv[2]), float(sys.argv[3]))
+    elif sys.argv[1:2] == ["--serve-app"]:
+        serve_app(int(sys.argv[2]), sys.argv[3])
+    else:
+        types = (int, int, float)
+        main(*(type_(arg) for type_, arg in zip(types, sys.argv[1:])))
@@ -0,0 +1,65 @@
+"""
+Bytes per game of the board representation.
+
+Compares the current array-backed Game with the layout it replaced (a list
+of Card objects, each with its own __dict__).
+
+Usage:
+    python -m benchmarks.board_memory [num_games] [num_pairs]
+"""
+
+from random import shuffle
+from time import time
+import sys
+import threading
+import tracemalloc
+
+from game_logic.game_state import Game
+
+
+class LegacyCard:
+    """Card as it was before it got __slots__."""
+
+    def __init__(self, secret_index: int) -> None:
+        self._revealed = False
+        self._secret_index = secret_index
+
+
+class LegacyGame:
+    """The attributes the old Game kept for its board."""
+
+    def __init__(self, num_pairs: int) -> None:
+        self._num_pairs = num_pairs
+        self._cards = [LegacyCard(i) for i in range(num_pairs)] + [
+            LegacyCard(i) for i in range(num_pairs)
+        ]
+        shuffle(self._cards)
+        self._revealed_card_index = None
+        self._time = 0.0
+        self._start_time = None
+        self._flip_count = 0
+        self._last_operation_time = time()
+        self._lock = threading.Lock()
+
+
+def bytes_per_game(factory, num_games: int, num_pairs: int) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    games = [factory(num_pairs) for _ in range(num_games)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del games
+    return (after - before) / num_games
+
+
+def main(num_games: int = 10_000, num_pairs: int = 10) -> None:
+    legacy = bytes_per_game(LegacyGame, num_games, num_pairs)
+    compact = bytes_per_game(Game, num_games, num_pairs)
+    print(f"{num_games} games of {num_pairs} pairs")
+    print(f"list of Card objects: {legacy:8.0f} bytes/game")
+    print(f"array-backed board:   {compact:8.0f} bytes/game")
+    print(f"saving:               {1 - compact / legacy:8.1%}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
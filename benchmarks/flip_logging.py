@@ -0,0 +1,110 @@
+"""
+Flip latency with lock tracing written inline, queued, or switched off.
+
+Runs threads that each check their own game out with locked_game and flip
+a card, the critical section of the flip route, and reports the latency
+percentiles for three set-ups:
+- inline: DEBUG tracing written to stdout by the flipping thread, as the
+  print() calls used to.
+- queued: DEBUG tracing through the queue-based handler.
+- off: INFO, the production default.
+
+Stdout is redirected to a pipe read by a `cat > /dev/null` process, the
+way a container's stdout is read by its log driver.
+
+Usage:
+    python -m benchmarks.flip_logging [threads] [flips_per_thread]
+"""
+
+from statistics import quantiles
+from time import perf_counter
+import logging
+import os
+import subprocess
+import sys
+import threading
+
+from app_logic.game_routes import locked_game
+from app_logic.logging_config import (
+    configure_logging,
+    create_log_handler,
+    flush_logging,
+)
+from game_logic.game_state import Game
+from game_logic.game_store import game_store
+
+
+def run_flips(num_threads: int, flips: int) -> list[float]:
+    timings: list[float] = []
+    lock = threading.Lock()
+    game_ids = [game_store.add(Game(8)) for _ in range(num_threads)]
+
+    def player(game_id):
+        own = []
+        for i in range(flips):
+            start = perf_counter()
+            with locked_game(game_id, "flip") as game:
+                game.flip_card(i % 16)
+            own.append(perf_counter() - start)
+        with lock:
+            timings.extend(own)
+
+    threads = [
+        threading.Thread(target=player, args=(game_id,))
+        for game_id in game_ids
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for game_id in game_ids:
+        game_store.remove(game_id)
+    return timings
+
+
+def main(num_threads: int = 8, flips: int = 5_000) -> None:
+    results = sys.stdout
+    reader = subprocess.Popen(
+        "cat > /dev/null", shell=True, stdin=subprocess.PIPE
+    )
+    output = open(reader.stdin.fileno(), "w", buffering=1, closefd=False)
+    sys.stdout = output
+
+    logger = logging.getLogger("app_logic")
+    configure_logging("INFO")
+    queue_handlers = logger.handlers[:]
+    inline_handler = create_log_handler()
+
+    setups = {
+        "inline": ("DEBUG", [inline_handler]),
+        "queued": ("DEBUG", queue_handlers),
+        "off": ("INFO", queue_handlers),
+    }
+    try:
+        print(
+            f"{num_threads} threads x {flips} flips, latency in us",
+            file=results,
+        )
+        for name, (level, handlers) in setups.items():
+            logger.handlers = handlers
+            configure_logging(level)
+            timings = run_flips(num_threads, flips)
+            flush_logging()
+            percentiles = quantiles(timings, n=100)
+            p50, p99 = percentiles[49] * 1e6, percentiles[98] * 1e6
+            print(
+                f"{name:>7}: p50 {p50:8.1f}  p99 {p99:8.1f}"
+                f"  mean {sum(timings) / len(timings) * 1e6:8.1f}",
+                file=results,
+            )
+    finally:
+        logger.handlers = queue_handlers
+        sys.stdout = results
+        output.close()
+        reader.stdin.close()
+        reader.wait()
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("GAME_EVICT_INTERVAL", "3600")
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,240 @@
+"""
+Microbenchmarks of the game engine, checked against stored baselines.
+
+Times Game construction across board sizes, with boards shuffled on the
+spot and dealt from a stocked layout pool, a full game of flips,
+detect_finished, game store add/checkout/remove and expiry sweeps over
+many games. Each case is the best per-operation time of several repeats,
+reported in thousandths of a fixed reference workload timed alongside,
+so the numbers hold up on a busy or throttled machine.
+
+With --check it compares every case with benchmarks/baselines/
+game_engine.json and exits with status 1 if one is slower than its
+baseline by more than --tolerance. Baselines depend on the machine, save
+them again with --save on the one that runs the check.
+
+Usage:
+    python -m benchmarks.game_engine [--save | --check] [--tolerance 0.3]
+"""
+
+from collections.abc import Callable
+from pathlib import Path
+from time import perf_counter
+import argparse
+import gc
+import json
+import sys
+
+from game_logic.game_state import Game
+from game_logic.game_store import InMemoryGameStore
+from game_logic.layout_pool import LayoutPool
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "game_engine.json"
+REPEATS = 15
+
+
+def reference_work() -> None:
+    """Fixed pure-Python work the cases are measured against."""
+    table = {}
+    for i in range(2_000):
+        table[i] = [i, i << 1, i & 0xFF]
+    sum(value[2] for value in table.values())
+
+
+def measure(setup: Callable, run: Callable, number: int) -> float:
+    """
+    Best time per operation of run(setup()), which does number ops, as a
+    multiple of the best time of reference_work.
+    - The reference is timed right next to every repeat, so a machine
+      that is slower or busier for a while slows both down alike.
+    """
+    best = best_reference = float("inf")
+    for _ in range(REPEATS):
+        state = setup()
+        # like timeit, keep collections out of the timings
+        gc.disable()
+        try:
+            start = perf_counter()
+            reference_work()
+            middle = perf_counter()
+            run(state)
+            end = perf_counter()
+        finally:
+            gc.enable()
+        best_reference = min(best_reference, middle - start)
+        best = min(best, (end - middle) / number)
+    return best / best_reference
+
+
+def play_order(game: Game) -> list[int]:
+    """Card positions in an order that matches every pair at once."""
+    positions: dict[int, list[int]] = {}
+    for index, card in enumerate(game.get_cards()):
+        positions.setdefault(card.get_secret_index(), []).append(index)
+    return [index for pair in positions.values() for index in pair]
+
+
+def bench_game_init(num_pairs: int, number: int = 2_000) -> float:
+    def run(_):
+        for _ in range(number):
+            Game(num_pairs)
+
+    return measure(lambda: None, run, number)
+
+
+def bench_game_init_pooled(num_pairs: int, number: int = 2_000) -> float:
+    """Games dealt from a layout pool stocked beforehand."""
+
+    def setup():
+        pool = LayoutPool(sizes=[num_pairs], depth=number)
+        pool.refill()
+        return pool
+
+    def run(pool):
+        for _ in range(number):
+            Game(num_pairs, layout=pool.take(num_pairs))
+
+    return measure(setup, run, number)
+
+
+def bench_full_game(num_pairs: int, number: int = 200) -> float:
+    """A perfect game, per flip."""
+
+    def setup():
+        games = [Game(num_pairs) for _ in range(number)]
+        return [(game, play_order(game)) for game in games]
+
+    def run(games):
+        for game, order in games:
+            for index in order:
+                game.flip_card(index)
+
+    return measure(setup, run, number * 2 * num_pairs)
+
+
+def bench_detect_finished(finished: bool, number: int = 100_000) -> float:
+    def setup():
+        game = Game(10)
+        if finished:
+            for index in play_order(game):
+                game.flip_card(index)
+        return game
+
+    def run(game):
+        detect = game.detect_finished
+        for _ in range(number):
+            detect()
+
+    return measure(setup, run, number)
+
+
+def bench_store(operation: str, number: int = 10_000) -> float:
+    """add, checkout or remove on an in-memory store, per operation."""
+
+    def setup():
+        store = InMemoryGameStore()
+        games = [Game(10) for _ in range(number)]
+        if operation == "add":
+            return store, games
+        return store, [store.add(game) for game in games]
+
+    def run(state):
+        store, items = state
+        if operation == "add":
+            for game in items:
+                store.add(game)
+        elif operation == "checkout":
+            for game_id in items:
+                with store.checkout(game_id) as game:
+                    game.get_flip_count()
+        else:
+            for game_id in items:
+                store.remove(game_id)
+
+    return measure(setup, run, number)
+
+
+def bench_evict_sweep(expired: bool, num_games: int = 10_000) -> float:
+    """
+    Sweeps over num_games games: per evicted game when all of them expired,
+    per sweep when none did.
+    """
+
+    def setup():
+        store = InMemoryGameStore(ttl=0 if expired else 3600)
+        for _ in range(num_games):
+            store.add(Game(10))
+        return store
+
+    if expired:
+        return measure(setup, lambda store: store.evict_expired(), num_games)
+
+    def run(store):
+        for _ in range(1_000):
+            store.evict_expired()
+
+    return measure(setup, run, 1_000)
+
+
+def run_suite() -> dict[str, float]:
+    cases = {}
+    for num_pairs in (2, 10, 50, 250):
+        cases[f"game_init[{num_pairs}]"] = bench_game_init(num_pairs)
+    for num_pairs in (10, 250):
+        cases[f"game_init_pooled[{num_pairs}]"] = bench_game_init_pooled(
+            num_pairs
+        )
+    for num_pairs in (10, 50):
+        cases[f"full_game_per_flip[{num_pairs}]"] = bench_full_game(num_pairs)
+    for finished in (False, True):
+        name = "finished" if finished else "fresh"
+        cases[f"detect_finished[{name}]"] = bench_detect_finished(finished)
+    for operation in ("add", "checkout", "remove"):
+        cases[f"store_{operation}"] = bench_store(operation)
+    cases["evict_sweep[none_expired]"] = bench_evict_sweep(False)
+    cases["evict_sweep_per_game[all_expired]"] = bench_evict_sweep(True)
+    return cases
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--save", action="store_true", help="store baselines")
+    mode.add_argument("--check", action="store_true", help="fail on slowdown")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    results = run_suite()
+    baselines = (
+        json.loads(BASELINE_PATH.read_text())
+        if BASELINE_PATH.exists()
+        else {}
+    )
+
+    regressions = []
+    print(f"{'case':<36} {'cost':>10} {'baseline':>10} {'change':>8}")
+    for name, cost in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name:<36} {cost * 1000:10.3f}")
+            continue
+        change = cost / baseline - 1
+        print(
+            f"{name:<36} {cost * 1000:10.3f} {baseline * 1000:10.3f}"
+            f" {change:+8.1%}"
+        )
+        if change > args.tolerance:
+            regressions.append(name)
+
+    if args.save:
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"saved baselines to {BASELINE_PATH}")
+    elif args.check and regressions:
+        print(f"slower than baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
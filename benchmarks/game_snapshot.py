@@ -0,0 +1,103 @@
+"""
+Snapshot and restore throughput of games.
+
+Compares the binary snapshot of a Game (to_bytes/from_bytes) with the
+pickle it replaced, then checkpoints an in-memory store of many games to
+a temporary directory: a full checkpoint, an incremental one after some
+of the games were played, one with nothing to write, and the restore a
+restarted process does.
+
+Usage:
+    python -m benchmarks.game_snapshot [num_games] [played_percent]
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import os
+import pickle
+import sys
+
+from game_logic.game_state import Game
+from game_logic.game_store import GameCheckpointer, InMemoryGameStore
+
+
+def played_game(num_pairs: int) -> Game:
+    game = Game(num_pairs)
+    for target in range(num_pairs):
+        game.flip(target)
+    return game
+
+
+def rate(function, items) -> float:
+    """Items per second of function over items."""
+    start = perf_counter()
+    for item in items:
+        function(item)
+    return len(items) / (perf_counter() - start)
+
+
+def compare_formats(num_games: int) -> None:
+    print(f"{'format':<16} {'bytes':>7} {'dump/s':>10} {'load/s':>10}")
+    for num_pairs in (10, 250):
+        games = [played_game(num_pairs) for _ in range(num_games)]
+        for name, dump, load in (
+            ("snapshot", Game.to_bytes, Game.from_bytes),
+            ("pickle", pickle.dumps, pickle.loads),
+        ):
+            states = [dump(game) for game in games]
+            print(
+                f"{f'{name}[{num_pairs}]':<16} {len(states[0]):7d}"
+                f" {rate(dump, games):10.0f} {rate(load, states):10.0f}"
+            )
+
+
+def time_checkpoints(num_games: int, played_percent: int) -> None:
+    store = InMemoryGameStore()
+    games = [played_game(10) for _ in range(num_games)]
+    for game in games:
+        store.add(game)
+    num_played = num_games * played_percent // 100
+
+    with TemporaryDirectory() as directory:
+        checkpointer = GameCheckpointer(store, directory)
+        for name, prepare in (
+            ("full", lambda: None),
+            (f"{played_percent}% played", lambda: play(games[:num_played])),
+            ("unchanged", lambda: None),
+        ):
+            prepare()
+            start = perf_counter()
+            written = checkpointer.checkpoint()
+            elapsed = perf_counter() - start
+            print(
+                f"checkpoint {name:<12} {written:7d} games"
+                f" {elapsed * 1000:9.1f} ms"
+            )
+
+        size = sum(path.stat().st_size for path in Path(directory).iterdir())
+        print(f"on disk: {size / num_games:.0f} bytes per game")
+
+        start = perf_counter()
+        restored = GameCheckpointer(InMemoryGameStore(), directory).restore()
+        elapsed = perf_counter() - start
+        print(
+            f"restore {restored} games {elapsed * 1000:9.1f} ms"
+            f" ({restored / elapsed:.0f} games/s)"
+        )
+
+
+def play(games: list[Game]) -> None:
+    for game in games:
+        game.flip(game.get_flip_count() % 20)
+
+
+def main(num_games: int = 10_000, played_percent: int = 10) -> None:
+    compare_formats(num_games)
+    print()
+    time_checkpoints(num_games, played_percent)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("GAME_EVICT_INTERVAL", "3600")
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,102 @@
+"""
+Deep leaderboard pages and rank lookups on a large player_scores table.
+
+Fills the test database (TEST_TARGET_DB_URL / TEST_FLASK_DB_URL) with
+generated scores, compares an OFFSET page with the keyset page at the same
+depth, times find_player_rank, then deletes the generated rows.
+
+Usage:
+    python -m benchmarks.leaderboard_queries [num_rows] [repeats]
+"""
+
+from time import perf_counter
+import sys
+
+from sqlalchemy import text
+
+from app_logic.database import db
+from app_logic.database_routes import (
+    LEADERBOARD_ORDER,
+    find_player_rank,
+    load_leaderboard,
+)
+from app_logic.init_app import create_app
+from app_logic.models import PlayerScore
+
+PREFIX = "bench-"
+PAGE_SIZE = 10
+
+
+def best_of(repeats, function, *args):
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        function(*args)
+        timings.append(perf_counter() - start)
+    return min(timings) * 1000
+
+
+def offset_page(offset):
+    return (
+        PlayerScore.query.order_by(*LEADERBOARD_ORDER)
+        .offset(offset)
+        .limit(PAGE_SIZE)
+        .all()
+    )
+
+
+def main(num_rows: int = 1_000_000, repeats: int = 5) -> None:
+    app = create_app(__name__, isTest=True)
+    with app.app_context():
+        db.session.execute(
+            text(
+                "INSERT INTO player_scores"
+                " (player_name, completion_time, moves, created_at)"
+                " SELECT :prefix || g, random() * 600,"
+                " 10 + (random() * 90)::int, now()"
+                " FROM generate_series(1, :n) AS g"
+            ),
+            {"prefix": PREFIX, "n": num_rows},
+        )
+        db.session.commit()
+        # index-only scans need an up to date visibility map
+        with db.engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+                text("VACUUM ANALYZE player_scores")
+            )
+
+        try:
+            print(f"{num_rows} generated rows, best of {repeats}")
+            for depth in (0, num_rows // 100, num_rows // 2, num_rows - 20):
+                cursor = offset_page(depth - 1)[0] if depth else None
+                after = (
+                    None
+                    if cursor is None
+                    else (cursor.completion_time, cursor.moves, cursor.id)
+                )
+                offset_ms = best_of(repeats, offset_page, depth)
+                keyset_ms = best_of(
+                    repeats, load_leaderboard, PAGE_SIZE, after
+                )
+                print(
+                    f"page at {depth:>9}: OFFSET {offset_ms:8.2f} ms,"
+                    f" keyset {keyset_ms:6.2f} ms"
+                )
+
+            for position in ("top", "middle", "bottom"):
+                name = {
+                    "top": offset_page(0)[0].player_name,
+                    "middle": offset_page(num_rows // 2)[0].player_name,
+                    "bottom": offset_page(num_rows - 1)[0].player_name,
+                }[position]
+                rank_ms = best_of(repeats, find_player_rank, name)
+                print(f"rank of {position:>6} player: {rank_ms:8.2f} ms")
+        finally:
+            PlayerScore.query.filter(
+                PlayerScore.player_name.startswith(PREFIX)
+            ).delete(synchronize_session=False)
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
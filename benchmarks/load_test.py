@@ -0,0 +1,326 @@
+"""
+End-to-end load test driving full game sessions against the app.
+
+Starts a stub Duck API and the app (against the test database,
+TEST_TARGET_DB_URL / TEST_FLASK_DB_URL) in their own processes, then runs
+virtual players at growing concurrency. Each player loops over sessions:
+check_player, create_default_game, get_random_images, flips until every
+pair is found (remembering the cards it has seen), detect_game_finish,
+submit_game and fetch_leaderboard.
+
+For every concurrency level it reports sessions/s and requests/s, and
+per endpoint the throughput, p50/p95/p99 latency and errors, then a
+scaling summary. Scores submitted by the players are deleted afterwards.
+
+Pass --url to drive an app that is already running instead, e.g. one
+served the way it is deployed, with `uvicorn asgi:app --workers N` or
+`flask run` as in the Procfile; its DUCK_API_BASE_URL should then point
+at a stub started with --serve-stub PORT.
+
+Usage:
+    python -m benchmarks.load_test [--levels 1,4,16,64] [--duration 10]
+        [--url http://host:port]
+"""
+
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from statistics import quantiles
+from time import perf_counter, sleep
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import requests
+
+PLAYER_PREFIX = "load-"
+NUM_PAIRS = 10
+
+
+class DuckAPIStub(BaseHTTPRequestHandler):
+    """Serves /random like the Duck API, from a catalog of 1000 images."""
+
+    protocol_version = "HTTP/1.1"
+    served = count()
+
+    def do_GET(self):
+        image_id = next(self.served) % 1000
+        body = json.dumps({"url": f"http://duck.stub/{image_id}.jpg"})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve_stub(port: int) -> None:
+    StubServer(("127.0.0.1", port), DuckAPIStub).serve_forever()
+
+
+def serve_app(port: int) -> None:
+    from werkzeug.serving import make_server
+    import logging
+
+    # the per-request access log would dominate the measurements
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    from apis import register_apis
+    from app_logic.init_app import create_app
+
+    app = create_app(__name__, isTest=True)
+    register_apis(app, __name__)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = perf_counter() + timeout
+    while True:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            if perf_counter() > deadline:
+                raise
+            sleep(0.1)
+
+
+class Recorder:
+    """Latencies and errors per endpoint, shared by the players."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def call(self, http: requests.Session, endpoint, method, url, **kwargs):
+        start = perf_counter()
+        try:
+            response = http.request(method, url, timeout=30, **kwargs)
+            ok = response.ok
+        except requests.RequestException:
+            response, ok = None, False
+        elapsed = perf_counter() - start
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+        if not ok:
+            raise RuntimeError(f"{endpoint} failed")
+        return response
+
+    def session_done(self) -> None:
+        with self._lock:
+            self.sessions += 1
+
+
+def play_session(http, recorder: Recorder, base_url: str, name: str):
+    call = recorder.call
+    call(
+        http,
+        "check_player",
+        "GET",
+        f"{base_url}/check_player",
+        params={"player_name": name},
+    )
+    game_id = call(
+        http, "create_default_game", "POST", f"{base_url}/create_default_game"
+    ).json()
+    call(
+        http,
+        "get_random_images",
+        "GET",
+        f"{base_url}/get_random_images",
+        params={"count": NUM_PAIRS},
+    )
+
+    def flip(index):
+        return call(
+            http,
+            "flip_and_status",
+            "POST",
+            f"{base_url}/flip_and_status/{game_id}/{index}",
+        ).json()
+
+    # a player with perfect memory: flip an unseen card, then its partner
+    # if it was seen before, otherwise another unseen card
+    seen: dict[int, int] = {}  # secret -> index of a card seen once
+    known_pairs: list[tuple[int, int]] = []
+    unseen = list(range(2 * NUM_PAIRS - 1, -1, -1))
+    finished = False
+    while not finished:
+        if known_pairs:
+            first, second = known_pairs.pop()
+            flip(first)
+            result = flip(second)
+        else:
+            first = unseen.pop()
+            secret = flip(first)["secret_index"]
+            if secret in seen:
+                result = flip(seen.pop(secret))
+            else:
+                second = unseen.pop()
+                result = flip(second)
+                if not result["matched"]:
+                    seen[secret] = first
+                    other = result["secret_index"]
+                    if other in seen:
+                        known_pairs.append((seen.pop(other), second))
+                    else:
+                        seen[other] = second
+        finished = result["finished"]
+
+    call(
+        http,
+        "detect_game_finish",
+        "GET",
+        f"{base_url}/detect_game_finish/{game_id}",
+    )
+    call(
+        http, "submit_game", "POST", f"{base_url}/submit_game/{game_id}/{name}"
+    )
+    call(http, "fetch_leaderboard", "GET", f"{base_url}/fetch_leaderboard")
+
+
+def run_level(base_url: str, concurrency: int, duration: float):
+    """Run concurrency players for duration seconds."""
+    recorder = Recorder()
+    stop = threading.Event()
+    names = count()
+
+    def player(player_id):
+        http = requests.Session()
+        while not stop.is_set():
+            name = f"{PLAYER_PREFIX}{player_id}-{next(names)}"
+            try:
+                play_session(http, recorder, base_url, name)
+            except RuntimeError:
+                continue
+            recorder.session_done()
+
+    threads = [
+        threading.Thread(target=player, args=(i,), daemon=True)
+        for i in range(concurrency)
+    ]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return recorder, perf_counter() - start
+
+
+def report(recorder: Recorder, elapsed: float) -> tuple[float, float]:
+    total = sum(len(latencies) for latencies in recorder.latencies.values())
+    print(
+        f"  {recorder.sessions / elapsed:8.1f} sessions/s"
+        f"  {total / elapsed:8.1f} requests/s"
+    )
+    print(
+        f"  {'endpoint':<20} {'req/s':>8} {'p50 ms':>8}"
+        f" {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    )
+    for endpoint, latencies in recorder.latencies.items():
+        if len(latencies) > 1:
+            cuts = quantiles(latencies, n=100, method="inclusive")
+            p50, p95, p99 = (cuts[i] * 1000 for i in (49, 94, 98))
+        else:
+            p50 = p95 = p99 = latencies[0] * 1000
+        print(
+            f"  {endpoint:<20} {len(latencies) / elapsed:8.1f}"
+            f" {p50:8.2f} {p95:8.2f} {p99:8.2f}"
+            f" {recorder.errors[endpoint]:7d}"
+        )
+    return recorder.sessions / elapsed, total / elapsed
+
+
+def delete_load_scores() -> None:
+    from app_logic.database import db
+    from app_logic.init_app import create_app
+    from app_logic.models import PlayerScore
+
+    app = create_app(__name__, isTest=True)
+    with app.app_context():
+        PlayerScore.query.filter(
+            PlayerScore.player_name.startswith(PLAYER_PREFIX)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", default="1,4,16,64")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--url", help="app to drive instead of starting one")
+    parser.add_argument("--serve-stub", type=int, metavar="PORT")
+    parser.add_argument("--serve-app", type=int, metavar="PORT")
+    args = parser.parse_args(argv)
+
+    if args.serve_stub:
+        return serve_stub(args.serve_stub)
+    if args.serve_app:
+        return serve_app(args.serve_app)
+
+    servers = []
+    base_url = args.url
+    if base_url is None:
+        stub_port, app_port = free_port(), free_port()
+        env = {
+            **os.environ,
+            "DUCK_API_BASE_URL": f"http://127.0.0.1:{stub_port}",
+            "LOG_LEVEL": "WARNING",
+        }
+        for flag, port in (
+            ("--serve-stub", stub_port),
+            ("--serve-app", app_port),
+        ):
+            servers.append(
+                subprocess.Popen(
+                    [sys.executable, "-m", __spec__.name, flag, str(port)],
+                    env=env,
+                )
+            )
+        base_url = f"http://127.0.0.1:{app_port}"
+    try:
+        wait_until_up(base_url + "/fetch_leaderboard")
+        summary = []
+        for concurrency in map(int, args.levels.split(",")):
+            print(f"{concurrency} concurrent players, {args.duration:g} s")
+            recorder, elapsed = run_level(
+                base_url, concurrency, args.duration
+            )
+            summary.append((concurrency, *report(recorder, elapsed)))
+
+        print("scaling")
+        print(f"  {'players':>7} {'sessions/s':>11} {'requests/s':>11}")
+        for concurrency, sessions, total in summary:
+            print(f"  {concurrency:>7} {sessions:11.1f} {total:11.1f}")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+        delete_load_scores()
+
+
+if __name__ == "__main__":
+    main()
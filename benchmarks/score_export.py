@@ -0,0 +1,83 @@
+"""
+Throughput and memory of the streaming score export.
+
+Fills the test database (TEST_TARGET_DB_URL / TEST_FLASK_DB_URL) with
+generated scores, exports growing slices of them as Arrow and Parquet,
+and reports rows/s, MB/s, the largest chunk written and the peak memory
+of the Arrow pool (used by the Parquet writer, the driver allocates its
+batches elsewhere), then deletes the generated rows. Both should stay
+flat as the slices grow.
+
+Usage:
+    python -m benchmarks.score_export [num_rows]
+"""
+
+from datetime import datetime, timedelta
+from time import perf_counter
+import os
+import sys
+
+import pyarrow as pa
+from sqlalchemy import text
+
+from app_logic.database import db
+from app_logic.init_app import create_app
+from app_logic.models import PlayerScore
+from app_logic.score_export import iter_export
+
+PREFIX = "bench-"
+START = datetime(1990, 1, 1)
+
+
+def main(num_rows: int = 1_000_000) -> None:
+    app = create_app(__name__, isTest=True)
+    db_url = os.getenv("TEST_TARGET_DB_URL")
+    with app.app_context():
+        # one generated score per second from START on
+        db.session.execute(
+            text(
+                "INSERT INTO player_scores"
+                " (player_name, completion_time, moves, created_at)"
+                " SELECT :prefix || g, random() * 600,"
+                " 10 + (random() * 90)::int,"
+                " :start + g * interval '1 second'"
+                " FROM generate_series(1, :n) AS g"
+            ),
+            {"prefix": PREFIX, "start": START, "n": num_rows},
+        )
+        db.session.commit()
+
+        try:
+            print(f"{num_rows} generated rows")
+            for export_format in ("arrow", "parquet"):
+                for rows in (num_rows // 100, num_rows // 10, num_rows):
+                    until = START + timedelta(seconds=rows + 1)
+                    pool = pa.default_memory_pool()
+                    pool.release_unused()
+                    baseline = pool.bytes_allocated()
+
+                    start = perf_counter()
+                    written = largest = 0
+                    for chunk in iter_export(
+                        db_url, export_format, START, until
+                    ):
+                        written += len(chunk)
+                        largest = max(largest, len(chunk))
+                    elapsed = perf_counter() - start
+                    peak = (pool.max_memory() - baseline) / 2**20
+                    print(
+                        f"{export_format:>7} {rows:>9} rows:"
+                        f" {rows / elapsed:>10,.0f} rows/s,"
+                        f" {written / elapsed / 2**20:6.1f} MB/s,"
+                        f" largest chunk {largest / 2**20:5.1f} MB,"
+                        f" peak Arrow memory {peak:5.1f} MB"
+                    )
+        finally:
+            PlayerScore.query.filter(
+                PlayerScore.player_name.startswith(PREFIX)
+            ).delete(synchronize_session=False)
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,63 @@
+"""
+Cold start time of an app process.
+
+Starts fresh interpreters that build the app against the test database
+(TEST_TARGET_DB_URL / TEST_FLASK_DB_URL) with the schema already in
+place, and reports how long importing and create_app took, whether
+ADBC, pyarrow or aiohttp got loaded, and what the raw bootstrap the app
+now skips would have added on top.
+
+Usage:
+    python -m benchmarks.startup [repeats]
+"""
+
+from statistics import median
+import json
+import subprocess
+import sys
+
+CHILD = """
+from time import perf_counter
+import json
+import os
+import sys
+
+start = perf_counter()
+from apis import register_apis
+from app_logic.init_app import bootstrap_schema, create_app
+
+app = create_app(__name__, isTest=True)
+register_apis(app, __name__)
+startup = perf_counter() - start
+heavy = {"pyarrow", "adbc_driver_postgresql", "aiohttp"}
+lazy = not heavy & set(sys.modules)
+
+start = perf_counter()
+bootstrap_schema(os.getenv("TEST_TARGET_DB_URL"))
+bootstrap = perf_counter() - start
+print(json.dumps([startup, bootstrap, lazy]))
+"""
+
+
+def main(repeats: int = 10) -> None:
+    startups, bootstraps, lazy = [], [], True
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        startup, bootstrap, child_lazy = json.loads(output.splitlines()[-1])
+        startups.append(startup * 1000)
+        bootstraps.append(bootstrap * 1000)
+        lazy = lazy and child_lazy
+
+    print(f"median of {repeats} fresh processes")
+    print(f"import + create_app:    {median(startups):7.1f} ms")
+    print(f"skipped ADBC bootstrap: {median(bootstraps):7.1f} ms")
+    print(f"ADBC, pyarrow and aiohttp left unloaded: {lazy}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
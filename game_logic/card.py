@@ -1,4 +1,6 @@
 class Card:
+    __slots__ = ("_revealed", "_secret_index")
+
     def __init__(self, secret_index: int) -> None:
         self._revealed: bool = False
         self._secret_index: int = secret_index
@@ -0,0 +1,96 @@
+from collections import defaultdict
+import asyncio
+import queue
+import threading
+
+
+class AsyncSubscriber:
+    """
+    A subscriber for coroutines, with the put_nowait of a queue.Queue.
+    - Publishing threads hand events over to the event loop the subscriber
+      was created on, and never wait for it.
+    - Like a Queue subscriber, it drops its oldest event when full.
+    """
+
+    def __init__(self, max_queued: int) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(max_queued)
+
+    def put_nowait(self, item) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            pass  # the loop is closed, nobody is listening any more
+
+    async def get(self, timeout: float):
+        """The next event. Raises asyncio.TimeoutError after timeout."""
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def _put(self, item) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()  # drop the oldest event
+        self._queue.put_nowait(item)
+
+
+class GameEvents:
+    """
+    Per-game publish/subscribe channel for live sessions.
+    - Every subscriber (the player's page, spectators) gets its own bounded
+      queue.
+    - A subscriber that falls behind loses its oldest events rather than
+      holding up the publisher.
+    - Events only reach subscribers in the same process.
+    """
+
+    def __init__(self, max_queued: int = 100) -> None:
+        self._max_queued = max_queued
+        self._subscribers: defaultdict[
+            int, set[queue.Queue | AsyncSubscriber]
+        ] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, game_id: int) -> queue.Queue:
+        subscriber: queue.Queue = queue.Queue(self._max_queued)
+        with self._lock:
+            self._subscribers[game_id].add(subscriber)
+        return subscriber
+
+    def subscribe_async(self, game_id: int) -> AsyncSubscriber:
+        """Subscribe from a coroutine, on the loop it runs on."""
+        subscriber = AsyncSubscriber(self._max_queued)
+        with self._lock:
+            self._subscribers[game_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(
+        self, game_id: int, subscriber: queue.Queue | AsyncSubscriber
+    ) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(game_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[game_id]
+
+    def publish(self, game_id: int, event: str, data) -> None:
+        with self._lock:
+            subscribers = tuple(self._subscribers.get(game_id, ()))
+
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait((event, data))
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()  # drop the oldest event
+                    except queue.Empty:
+                        pass
+
+    def count_subscribers(self, game_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(game_id, ()))
+
+
+game_events = GameEvents()
@@ -1,33 +1,106 @@
-from collections.abc import MutableSequence
+from array import array
+from collections.abc import Sequence
 from typing import Optional
-from random import shuffle
-from time import sleep, time
+from time import time
+import math
+import random
+import struct
+import sys
 import threading
 
 from app_logic.database_routes import internal_submit_score
 from game_logic.card import Card
 
 
+def board_typecode(max_secret_index: int) -> str:
+    """Smallest array typecode able to hold every secret index."""
+    if max_secret_index < 1 << 8:
+        return "B"
+    if max_secret_index < 1 << 16:
+        return "H"
+    return "I"
+
+
+# version, board typecode, board length, number of pairs, flip count,
+# matches, misses, cards left, revealed card (-1 for none), time, start
+# time (NaN before the first flip) and last operation time; then the board
+# and the revealed and removed bitsets, all little-endian
+SNAPSHOT_HEADER = struct.Struct("<BcIIIIIIiddd")
+SNAPSHOT_VERSION = 1
+
+
+def shuffled_layout(
+    num_pairs: int, rng: Optional[random.Random] = None
+) -> array:
+    """Both cards of every pair in random order, as a board array."""
+    secrets = list(range(num_pairs)) * 2
+    # make the order of the cards random
+    (random.shuffle if rng is None else rng.shuffle)(secrets)
+    return array(board_typecode(num_pairs), secrets)
+
+
 class Game:
+    """
+    A single memory game.
+    - The board is an array of secret indices, one entry per card.
+    - Revealed and removed cards are tracked as bitsets (bit i is card i).
+    - Cards only exist as views, see get_card.
+    - Cards left, matches and misses are counted as cards are flipped, so
+      completion, progress and accuracy never scan the board.
+    """
+
+    __slots__ = (
+        "_num_pairs",
+        "_secrets",
+        "_revealed",
+        "_removed",
+        "_cards_left",
+        "_matches",
+        "_misses",
+        "_revealed_card_index",
+        "_time",
+        "_start_time",
+        "_flip_count",
+        "_last_operation_time",
+        "_lock",
+    )
+
+    # seconds a game may sit idle before it can be destroyed
+    TIME_TO_LIVE: float = 600
+    # the largest board a client may ask for, every pair is an image to load
+    MAX_PAIRS: int = 1000
+
     def __init__(
-        self, num_pairs: int, test_cards: Optional[list[Card]] = None
+        self,
+        num_pairs: int,
+        test_cards: Optional[list[Card]] = None,
+        layout: Optional[array] = None,
     ) -> None:
+        """
+        :param layout: A shuffled board to play on, e.g. from the layout
+            pool, a new one is shuffled when it isn't given.
+        """
         self._num_pairs: int = num_pairs
 
         if test_cards is None:
-            self._cards: MutableSequence[Optional[Card]] = list(
-                [Card(secret_index=i) for i in range(num_pairs)]
-                + [Card(secret_index=i) for i in range(num_pairs)]
-            )  # add a list() to pass type check
-
-            shuffle(self._cards)  # make the order of the cards random
+            if layout is None:
+                layout = shuffled_layout(num_pairs)
+            assert num_pairs * 2 == len(
+                layout
+            ), "The board size doesn't match the layout you gave me!"
+            self._secrets = layout
+            self._revealed: int = 0
+            self._removed: int = 0
+            self._cards_left: int = len(layout)
         else:
             assert num_pairs * 2 == len(
                 test_cards
             ), "The board size doesn't match the board you gave me!"
-            self._cards = list(test_cards)
+            self.set_board(test_cards)
 
         self._revealed_card_index: Optional[int] = None
+        self._matches: int = 0
+        self._misses: int = 0
 
         self._time: float = 0.0
         self._start_time = None
@@ -35,57 +108,109 @@ class Game:
 
         self._last_operation_time = time()
 
+        # guards this game only, the registry has its own lock
+        self._lock = threading.Lock()
+
     def flip(self, target: int) -> int:
+        return self.flip_card(target)[0]
+
+    def flip_card(self, target: int) -> tuple[int, Optional[bool]]:
+        """
+        Flip a card.
+
+        Returns:
+            The secret index of the card (-1 if it can't be flipped) and
+            whether it matched the revealed card, None when it wasn't the
+            second card of a pair.
+        """
+        # before anything changes, a rejected flip doesn't start the clock
+        self._check_index(target)
+
         self._last_operation_time = time()
 
         if self._start_time is None:
             self._start_time = time()
         self._time = time() - self._start_time
 
-        target_card = self._cards[target]
+        target_bit = 1 << target
 
         # you can't flip a non-existent card
-        if target_card is None:
-            return -1
+        if self._removed & target_bit:
+            return -1, None
 
         # you can't flip a revealed card
-        if target_card.is_revealed():
-            return -1
+        if self._revealed & target_bit:
+            return -1, None
 
         self._flip_count += 1
+        secret_index = self._secrets[target]
 
-        if self._revealed_card_index is not None:
-            # currently there is a revealed card
-            if not self._compare_index(target):
-                # if the revealed card doesn't match the card being flipped
-                revealed_card = self._get_revealed_card()
-
-                # flip the revealed card back
-                revealed_card.flip()
-                self._has_revealed_card = False
-                self._revealed_card_index = None
-            else:
-                # they do match
-                assert self._revealed_card_index is not None, "Buggy state"
-
-                # remove both cards
-                self._remove_card(self._revealed_card_index)
-                self._remove_card(target)
-
-            return target_card.get_secret_index()
-        else:
+        if self._revealed_card_index is None:
             # a normal flip
-            self._has_revealed_card = True
             self._revealed_card_index = target
-            target_card.flip()
-
-            return target_card.get_secret_index()
+            self._revealed |= target_bit
+            return secret_index, None
+
+        # currently there is a revealed card
+        if self._secrets[self._revealed_card_index] != secret_index:
+            # if the revealed card doesn't match the card being flipped,
+            # flip the revealed card back
+            self._revealed &= ~(1 << self._revealed_card_index)
+            self._revealed_card_index = None
+            self._misses += 1
+            return secret_index, False
+
+        # they do match, remove both cards
+        self._remove_card(self._revealed_card_index)
+        self._remove_card(target)
+        self._matches += 1
+        return secret_index, True
+
+    def flip_pair(
+        self, first: int, second: int
+    ) -> list[tuple[int, Optional[bool]]]:
+        """
+        Flip two cards as one move, see flip_card.
+        - Both indices are checked before either card is flipped, so an
+          invalid second card never leaves half a move made.
+        """
+        self._check_index(first)
+        self._check_index(second)
+        return [self.flip_card(first), self.flip_card(second)]
+
+    def _check_index(self, target: int) -> None:
+        if not 0 <= target < len(self._secrets):
+            raise IndexError("card index out of range")
+
+    def get_status(self) -> dict:
+        """Everything the client shows after a move."""
+        return {
+            "flip_count": self._flip_count,
+            "time": self._time,
+            "finished": self.detect_finished(),
+            "remaining_pairs": self.get_remaining_pairs(),
+            "matches": self._matches,
+            "progress": self.get_progress(),
+            "accuracy": self.get_accuracy(),
+        }
 
     def __str__(self) -> str:
-        return str([str(card) for card in self._cards])
+        return str([str(card) for card in self.get_cards()])
+
+    def get_card(self, target: int) -> Optional[Card]:
+        """A Card view of one position, None once the card is removed."""
+        if self._removed >> target & 1:
+            return None
+        card = Card(self._secrets[target])
+        card.set_revealed(bool(self._revealed >> target & 1))
+        return card
+
+    def get_cards(self) -> list[Optional[Card]]:
+        return [self.get_card(i) for i in range(len(self._secrets))]
 
     def get_time(self) -> float:
-        return 0.0 if self._time == 0.0 else time() - self._time
+        """Seconds since the first flip, still running."""
+        return 0.0 if self._start_time is None else time() - self._start_time
 
     def get_flip_count(self) -> int:
         return self._flip_count
@@ -94,74 +219,179 @@ class Game:
         return self._num_pairs
 
     def detect_finished(self) -> bool:
-        return all(card is None for card in self._cards)
+        return self._cards_left == 0
+
+    def get_remaining_pairs(self) -> int:
+        # a card cleared on its own still counts as half a pair left
+        return (self._cards_left + 1) // 2
+
+    def get_match_count(self) -> int:
+        return self._matches
+
+    def get_progress(self) -> float:
+        """Percentage of the cards removed from the board."""
+        total = len(self._secrets)
+        if total == 0:
+            return 100.0
+        return round(100 * (total - self._cards_left) / total, 1)
+
+    def get_accuracy(self) -> Optional[float]:
+        """Share of compared pairs that matched, None before the first."""
+        attempts = self._matches + self._misses
+        return self._matches / attempts if attempts else None
+
+    def get_lock(self) -> threading.Lock:
+        return self._lock
+
+    def get_result(self) -> tuple[float, int]:
+        return self._time, self._flip_count
 
     def submit_score(self, player_name="DefaultName"):
-        return internal_submit_score(player_name, self._time, self._flip_count)
+        return internal_submit_score(player_name, *self.get_result())
+
+    def get_last_operation_time(self) -> float:
+        return self._last_operation_time
 
     def can_destroy(self):
-        return time() > self._last_operation_time + 600
+        return time() > self._last_operation_time + self.TIME_TO_LIVE
+
+    def to_bytes(self) -> bytes:
+        """
+        Compact binary snapshot of the game, read back by from_bytes.
+        - A 10-pair game takes 80 bytes, under a quarter of its pickle.
+        """
+        size = len(self._secrets)
+        board = self._secrets
+        if sys.byteorder == "big":
+            board = array(board.typecode, board)
+            board.byteswap()
+        bitset_size = (size + 7) // 8
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_VERSION,
+            board.typecode.encode(),
+            size,
+            self._num_pairs,
+            self._flip_count,
+            self._matches,
+            self._misses,
+            self._cards_left,
+            (
+                -1
+                if self._revealed_card_index is None
+                else self._revealed_card_index
+            ),
+            self._time,
+            math.nan if self._start_time is None else self._start_time,
+            self._last_operation_time,
+        )
+        return b"".join(
+            (
+                header,
+                board.tobytes(),
+                self._revealed.to_bytes(bitset_size, "little"),
+                self._removed.to_bytes(bitset_size, "little"),
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Game":
+        """
+        The game a to_bytes snapshot was taken of.
+        Raises ValueError if data isn't a snapshot of this version.
+        """
+        try:
+            (
+                version,
+                typecode,
+                size,
+                num_pairs,
+                flip_count,
+                matches,
+                misses,
+                cards_left,
+                revealed_card_index,
+                elapsed,
+                start_time,
+                last_operation_time,
+            ) = SNAPSHOT_HEADER.unpack_from(data)
+            board = array(typecode.decode())
+        except (struct.error, UnicodeDecodeError, ValueError):
+            raise ValueError("Not a game snapshot") from None
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unknown game snapshot version {version}")
+
+        header_end = SNAPSHOT_HEADER.size
+        board_end = header_end + size * board.itemsize
+        revealed_end = board_end + (size + 7) // 8
+        if len(data) != 2 * revealed_end - board_end:
+            raise ValueError("Truncated game snapshot")
+        board.frombytes(data[header_end:board_end])
+        if sys.byteorder == "big":
+            board.byteswap()
+
+        game = cls.__new__(cls)
+        game._num_pairs = num_pairs
+        game._secrets = board
+        game._revealed = int.from_bytes(
+            data[board_end:revealed_end], "little"
+        )
+        game._removed = int.from_bytes(data[revealed_end:], "little")
+        game._cards_left = cards_left
+        game._matches = matches
+        game._misses = misses
+        game._revealed_card_index = (
+            None if revealed_card_index < 0 else revealed_card_index
+        )
+        game._time = elapsed
+        game._start_time = None if math.isnan(start_time) else start_time
+        game._flip_count = flip_count
+        game._last_operation_time = last_operation_time
+        game._lock = threading.Lock()
+        return game
+
+    def __getstate__(self) -> dict:
+        # locks can't be pickled, every copy of a game gets a fresh one
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if name != "_lock"
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._lock = threading.Lock()
 
     # This method is only for testing purposes
     def force_reveal(self, target: int):
-        target_card = self._get_card(target)
-        target_card.set_revealed(True)
+        assert not self._removed >> target & 1, "Buggy state"
+        self._revealed |= 1 << target
 
     # This method is only for testing purposes
     def clear_card(self, target: int):
-        self._cards[target] = None
+        self._remove_card(target)
 
     # This method is only for testing purposes
-    def set_board(self, board: MutableSequence[Optional[Card]]):
-        self._cards = board
-
-    def _get_card(self, target: int) -> Card:
-        target_card = self._cards[target]
-        assert target_card is not None, "Buggy state"
-        return target_card
-
-    def _compare_index(self, target: int):
-        assert self._revealed_card_index is not None, "Buggy state"
-        target_card = self._cards[target]
-        assert target_card is not None, "Buggy state"
-        revealed_card = self._cards[self._revealed_card_index]
-        assert revealed_card is not None, "Buggy state"
-
-        return (
-            target_card.get_secret_index() == revealed_card.get_secret_index()
+    def set_board(self, board: Sequence[Optional[Card]]):
+        secrets = [
+            0 if card is None else card.get_secret_index() for card in board
+        ]
+        self._secrets = array(
+            board_typecode(max(secrets, default=0)), secrets
         )
+        self._revealed = 0
+        self._removed = 0
+        for i, card in enumerate(board):
+            if card is None:
+                self._removed |= 1 << i
+            elif card.is_revealed():
+                self._revealed |= 1 << i
+        self._cards_left = len(secrets) - self._removed.bit_count()
 
     def _remove_card(self, target: int):
-        self._cards[target] = None
+        if not self._removed >> target & 1:
+            self._cards_left -= 1
+        self._removed |= 1 << target
+        self._revealed &= ~(1 << target)
         if target == self._revealed_card_index:
             self._revealed_card_index = None
-
-    def _get_revealed_card(self) -> Card:
-        assert self._revealed_card_index is not None, "Buggy state"
-        revealed_card = self._cards[self._revealed_card_index]
-        assert revealed_card is not None, "Buggy state"
-        return revealed_card
-
-
-games: dict[int, Game] = {}
-games_lock = threading.Lock()
-
-
-def clear_game():
-    while True:
-        sleep(60)
-        print("Trying to acquire daemon lock")
-        games_lock.acquire()
-        print("Daemon lock acquired")
-        try:
-            game_ids = tuple(games.keys())
-            for game_id in game_ids:
-                if game_id in games and games[game_id].can_destroy():
-                    del games[game_id]
-        finally:
-            print("Trying to release the daemon lock")
-            games_lock.release()
-            print("Daemon lock released")
-
-
-threading.Thread(target=clear_game, daemon=True).start()
@@ -0,0 +1,427 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from time import sleep, time
+import atexit
+import heapq
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+
+from game_logic.game_state import Game
+
+
+logger = logging.getLogger(__name__)
+
+
+class GameStore(ABC):
+    """
+    Where in-progress games live between requests.
+    - add/remove register and unregister a game.
+    - checkout gives exclusive access to one game and persists any change
+      made to it when the block exits. A checkout with write=False is for
+      reading only, changes made in it may be lost.
+    """
+
+    @abstractmethod
+    def add(self, game: Game) -> int:
+        """Store a new game and return its id."""
+
+    @abstractmethod
+    def checkout(self, game_id: int, write: bool = True) -> Iterator[Game]:
+        """
+        Context manager holding a game exclusively.
+        - write=False skips persisting the game, for routes that only read.
+        Raises KeyError if the game doesn't exist.
+        """
+
+    @abstractmethod
+    def remove(self, game_id: int) -> Game:
+        """
+        Delete a game and return it.
+        Raises KeyError if the game doesn't exist.
+        """
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        """Delete every game idle for longer than the TTL, return how many."""
+
+    @abstractmethod
+    def get_evicted_count(self) -> int:
+        """How many games evict_expired has deleted so far."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class InMemoryGameStore(GameStore):
+    """
+    Games kept in this process's memory.
+    - The registry lock is only held for lookup/insert/delete.
+    - checkout holds the game's own lock, so unrelated games never wait on
+      each other.
+    - Expiry deadlines sit in a min-heap. Flips don't touch the heap, an
+      entry whose game was used since is pushed back with its new deadline
+      when it reaches the top.
+    """
+
+    def __init__(self, ttl: float = Game.TIME_TO_LIVE) -> None:
+        self._games: dict[int, Game] = {}
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._deadlines: list[tuple[float, int]] = []
+        self._evicted_count = 0
+
+    def add(self, game: Game) -> int:
+        game_id = id(game)
+        deadline = game.get_last_operation_time() + self._ttl
+        with self._lock:
+            # a restored game may hold the id of an object of this process
+            while game_id in self._games:
+                game_id += 1
+            self._games[game_id] = game
+            heapq.heappush(self._deadlines, (deadline, game_id))
+        return game_id
+
+    def restore(self, game_id: int, game: Game) -> None:
+        """Put a game back under the id it had before a restart."""
+        deadline = game.get_last_operation_time() + self._ttl
+        with self._lock:
+            self._games[game_id] = game
+            heapq.heappush(self._deadlines, (deadline, game_id))
+
+    def items(self) -> list[tuple[int, Game]]:
+        """The stored games and their ids, at the time of the call."""
+        with self._lock:
+            return list(self._games.items())
+
+    @contextmanager
+    def checkout(self, game_id: int, write: bool = True) -> Iterator[Game]:
+        # the game's lock also keeps a reader from seeing half a flip
+        with self._lock:
+            game = self._games[game_id]
+        with game.get_lock():
+            yield game
+
+    def remove(self, game_id: int) -> Game:
+        with self._lock:
+            return self._games.pop(game_id)
+
+    def evict_expired(self) -> int:
+        now = time()
+        evicted = 0
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, game_id = heapq.heappop(self._deadlines)
+                game = self._games.get(game_id)
+                if game is None:
+                    continue  # removed already
+
+                deadline = game.get_last_operation_time() + self._ttl
+                if deadline <= now:
+                    del self._games[game_id]
+                    evicted += 1
+                else:
+                    heapq.heappush(self._deadlines, (deadline, game_id))
+            self._evicted_count += evicted
+        return evicted
+
+    def get_evicted_count(self) -> int:
+        return self._evicted_count
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+
+class SQLiteGameStore(GameStore):
+    """
+    Games kept in an SQLite file shared by every process on the host.
+    - Each thread gets its own connection to the file.
+    - checkout runs inside a BEGIN IMMEDIATE transaction, which serializes
+      writers across processes, and writes the game back on exit.
+    - A read-only checkout runs in a deferred transaction instead. Under
+      WAL it reads a snapshot without taking the write lock, readers never
+      wait on writers or on each other.
+    - Ids are random so that processes never hand out the same one.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = Game.TIME_TO_LIVE,
+        timeout: float = 30.0,
+    ) -> None:
+        self._path = path
+        self._ttl = ttl
+        self._timeout = timeout
+        self._local = threading.local()
+        self._evicted_count = 0
+
+        # WAL lets readers in other processes run alongside a writer
+        self._get_connection().execute("PRAGMA journal_mode=WAL")
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                " id INTEGER PRIMARY KEY,"
+                " last_operation REAL NOT NULL,"
+                " state BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS games_last_operation"
+                " ON games (last_operation)"
+            )
+
+    def add(self, game: Game) -> int:
+        state = self._dump(game)
+        while True:
+            game_id = secrets.randbits(48)
+            try:
+                with self._connection() as conn:
+                    conn.execute(
+                        "INSERT INTO games (id, last_operation, state)"
+                        " VALUES (?, ?, ?)",
+                        (game_id, game.get_last_operation_time(), state),
+                    )
+                return game_id
+            except sqlite3.IntegrityError:
+                continue  # id collision, draw another one
+
+    @contextmanager
+    def checkout(self, game_id: int, write: bool = True) -> Iterator[Game]:
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE" if write else "BEGIN DEFERRED")
+        try:
+            row = conn.execute(
+                "SELECT state FROM games WHERE id = ?", (game_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(game_id)
+
+            game = self._load(row[0])
+            yield game
+
+            if write:
+                conn.execute(
+                    "UPDATE games SET last_operation = ?, state = ?"
+                    " WHERE id = ?",
+                    (
+                        game.get_last_operation_time(),
+                        self._dump(game),
+                        game_id,
+                    ),
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def remove(self, game_id: int) -> Game:
+        with self._connection() as conn:
+            row = conn.execute(
+                "DELETE FROM games WHERE id = ? RETURNING state", (game_id,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(game_id)
+        return self._load(row[0])
+
+    def evict_expired(self) -> int:
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM games WHERE last_operation < ?",
+                (time() - self._ttl,),
+            )
+        self._evicted_count += cursor.rowcount
+        return cursor.rowcount
+
+    def get_evicted_count(self) -> int:
+        return self._evicted_count
+
+    def __len__(self) -> int:
+        conn = self._get_connection()
+        return conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None leaves transactions to us
+            conn = sqlite3.connect(
+                self._path, timeout=self._timeout, isolation_level=None
+            )
+            # under WAL a commit is still atomic and durable against a
+            # crash of the app, only a power loss may lose the last ones
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _dump(game: Game) -> bytes:
+        return game.to_bytes()
+
+    @staticmethod
+    def _load(state: bytes) -> Game:
+        return Game.from_bytes(state)
+
+
+class GameCheckpointer:
+    """
+    Periodic snapshots of an in-memory store's games on local disk, so a
+    restart or a deploy picks the games back up.
+    - One file per game, named after its id. A checkpoint only writes the
+      games played since the previous one and deletes the files of games
+      that are gone.
+    - Files are written under a temporary name and renamed into place, a
+      process dying mid-write leaves the previous snapshot intact.
+    - The store must be the only one using the directory, i.e. a single
+      process. Several workers share games through SQLiteGameStore, which
+      is on disk already.
+    """
+
+    SUFFIX = ".game"
+
+    def __init__(
+        self, store: InMemoryGameStore, directory: str, interval: float = 10.0
+    ) -> None:
+        self._store = store
+        self._directory = Path(directory)
+        self._interval = interval
+        # game id -> last operation time of the game in its file
+        self._saved: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def start(self) -> None:
+        """Checkpoint every interval seconds and once more on exit."""
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.checkpoint)
+
+    def checkpoint(self) -> int:
+        """Write the games changed since the last checkpoint, count them."""
+        with self._lock:
+            games = self._store.items()
+            written = 0
+            for game_id, game in games:
+                # the float is replaced as a whole, reading it needs no lock
+                if self._saved.get(game_id) == game.get_last_operation_time():
+                    continue
+                with game.get_lock():
+                    state = game.to_bytes()
+                    saved = game.get_last_operation_time()
+                self._write(game_id, state)
+                self._saved[game_id] = saved
+                written += 1
+
+            gone = self._saved.keys() - {game_id for game_id, _ in games}
+            for game_id in gone:
+                self._path(game_id).unlink(missing_ok=True)
+                del self._saved[game_id]
+            return written
+
+    def restore(self) -> int:
+        """Load the snapshots into the store, return how many games."""
+        with self._lock:
+            for path in self._directory.glob("*.tmp"):
+                path.unlink(missing_ok=True)
+
+            restored = 0
+            for path in self._directory.glob("*" + self.SUFFIX):
+                try:
+                    game_id = int(path.stem)
+                    game = Game.from_bytes(path.read_bytes())
+                except (OSError, ValueError):
+                    logger.warning("Skipping broken game snapshot %s", path)
+                    path.unlink(missing_ok=True)
+                    continue
+                self._store.restore(game_id, game)
+                self._saved[game_id] = game.get_last_operation_time()
+                restored += 1
+
+        # games that expired while the app was down go right away, their
+        # files with the next checkpoint
+        self._store.evict_expired()
+        logger.info("Restored %d games from %s", restored, self._directory)
+        return restored
+
+    def _path(self, game_id: int) -> Path:
+        return self._directory / f"{game_id}{self.SUFFIX}"
+
+    def _write(self, game_id: int, state: bytes) -> None:
+        path = self._path(game_id)
+        temporary = path.with_suffix(".tmp")
+        temporary.write_bytes(state)
+        os.replace(temporary, path)
+
+    def _run(self) -> None:
+        while True:
+            sleep(self._interval)
+            try:
+                self.checkpoint()
+            except Exception:
+                logger.exception("Error checkpointing games")
+
+
+def create_game_store(
+    path: str | None = None, ttl: float = Game.TIME_TO_LIVE
+) -> GameStore:
+    """
+    Pick the game store backend.
+    - With a path, games are shared through an SQLite file so the app can
+      run under several worker processes.
+    - Without one, games stay in this process's memory.
+    - Games idle for longer than ttl seconds get evicted.
+    """
+    if path:
+        return SQLiteGameStore(path, ttl=ttl)
+    return InMemoryGameStore(ttl=ttl)
+
+
+game_store = create_game_store(
+    os.getenv("GAME_STORE_PATH"),
+    ttl=float(os.getenv("GAME_TTL", Game.TIME_TO_LIVE)),
+)
+EVICT_INTERVAL = float(os.getenv("GAME_EVICT_INTERVAL", 60))
+
+
+def create_checkpointer(store: GameStore) -> GameCheckpointer | None:
+    """
+    Checkpoint the in-memory game store when configured to.
+    - GAME_CHECKPOINT_DIR: directory of the snapshots, unset disables
+      checkpointing. The SQLite store keeps its games on disk anyway.
+    - GAME_CHECKPOINT_INTERVAL: seconds between checkpoints.
+    """
+    directory = os.getenv("GAME_CHECKPOINT_DIR")
+    if not directory or not isinstance(store, InMemoryGameStore):
+        return None
+    return GameCheckpointer(
+        store,
+        directory,
+        interval=float(os.getenv("GAME_CHECKPOINT_INTERVAL", 10)),
+    )
+
+
+def clear_game():
+    while True:
+        sleep(EVICT_INTERVAL)
+        game_store.evict_expired()
+
+
+threading.Thread(target=clear_game, daemon=True).start()
+
+checkpointer = create_checkpointer(game_store)
+if checkpointer is not None:
+    checkpointer.restore()
+    checkpointer.start()
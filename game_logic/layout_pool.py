@@ -0,0 +1,166 @@
+from array import array
+from collections import deque
+from collections.abc import Callable, Iterable
+import logging
+import os
+import random
+import threading
+
+from game_logic.game_state import board_typecode, shuffled_layout
+
+
+logger = logging.getLogger(__name__)
+
+# shuffles a board of the given number of pairs
+Shuffler = Callable[[int], array]
+
+
+def stdlib_shuffler(seed: int | None = None) -> Shuffler:
+    """Boards shuffled by the random module's Mersenne Twister."""
+    rng = random.Random(seed)
+    return lambda num_pairs: shuffled_layout(num_pairs, rng)
+
+
+def numpy_shuffler(seed: int | None = None) -> Shuffler:
+    """
+    Boards shuffled by numpy's PCG64 generator.
+    - The shuffle runs in C, which pays off on boards of thousands of cards
+      where random.shuffle spends most of its time drawing numbers.
+    - numpy isn't a requirement, it is only imported when asked for.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    dtypes = {"B": np.uint8, "H": np.uint16, "I": np.uint32}
+
+    def shuffle(num_pairs: int) -> array:
+        typecode = board_typecode(num_pairs)
+        secrets = np.tile(np.arange(num_pairs, dtype=dtypes[typecode]), 2)
+        rng.shuffle(secrets)
+        return array(typecode, secrets.tobytes())
+
+    return shuffle
+
+
+SHUFFLERS: dict[str, Callable[[int | None], Shuffler]] = {
+    "random": stdlib_shuffler,
+    "numpy": numpy_shuffler,
+}
+
+
+def create_shuffler(name: str = "random", seed: int | None = None):
+    """
+    Shuffler by name, see SHUFFLERS.
+    - The same name and seed always deal the same boards.
+    - Raises ValueError for an unknown name.
+    """
+    try:
+        factory = SHUFFLERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown layout RNG: {name}") from None
+    return factory(seed)
+
+
+class LayoutPool:
+    """
+    A background-refilled stock of shuffled boards per board size.
+    - take() pops a ready board, so creating a game doesn't shuffle on the
+      request path. Sizes that aren't pooled, or a stock running dry, are
+      shuffled on the spot.
+    - A daemon thread tops every stock back up to depth whenever one drops
+      below half of it.
+    - seeded() deals a reproducible board, e.g. for tournaments, and never
+      touches the stock.
+    """
+
+    def __init__(
+        self,
+        sizes: Iterable[int] = (),
+        depth: int = 32,
+        rng: str = "random",
+        refill_interval: float = 5.0,
+    ) -> None:
+        self._rng = rng
+        self._shuffler = create_shuffler(rng)
+        self._depth = depth
+        self._refill_interval = refill_interval
+
+        # deque appends and pops are atomic, the stocks need no lock
+        self._layouts: dict[int, deque[array]] = {
+            num_pairs: deque() for num_pairs in sizes if depth > 0
+        }
+        # one shuffler is shared by every thread
+        self._rng_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the refill thread, does nothing if it already runs."""
+        with self._start_lock:
+            if self._thread is not None or not self._layouts:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def take(self, num_pairs: int) -> array:
+        """A shuffled board, from the stock when there is one."""
+        layouts = self._layouts.get(num_pairs)
+        if layouts is not None:
+            if len(layouts) <= self._depth // 2:
+                self._wakeup.set()
+            try:
+                return layouts.popleft()
+            except IndexError:
+                pass  # ran dry, shuffle one now
+        return self.shuffle(num_pairs)
+
+    def shuffle(self, num_pairs: int) -> array:
+        with self._rng_lock:
+            return self._shuffler(num_pairs)
+
+    def seeded(self, num_pairs: int, seed: int) -> array:
+        """The board dealt by this pool's RNG for seed."""
+        return create_shuffler(self._rng, seed)(num_pairs)
+
+    def refill(self) -> int:
+        """Top every stock up to depth once, return how many were added."""
+        added = 0
+        for num_pairs, layouts in self._layouts.items():
+            while len(layouts) < self._depth:
+                layouts.append(self.shuffle(num_pairs))
+                added += 1
+        return added
+
+    def available(self, num_pairs: int) -> int:
+        """Ready boards of this size."""
+        return len(self._layouts.get(num_pairs, ()))
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refill()
+            except Exception:
+                logger.exception("Error refilling the layout pool")
+            self._wakeup.wait(self._refill_interval)
+            self._wakeup.clear()
+
+
+def create_layout_pool() -> LayoutPool:
+    """
+    Build the layout pool from the environment.
+    - LAYOUT_POOL_SIZES: comma-separated numbers of pairs to keep boards
+      ready for, 10 (the default game) unless set.
+    - LAYOUT_POOL_DEPTH: boards kept per size, 0 disables the pool.
+    - LAYOUT_RNG: random (default) or numpy, which needs numpy installed
+      and is faster for very large boards.
+    """
+    sizes = os.getenv("LAYOUT_POOL_SIZES", "10")
+    return LayoutPool(
+        sizes=[int(size) for size in sizes.split(",") if size.strip()],
+        depth=int(os.getenv("LAYOUT_POOL_DEPTH", 32)),
+        rng=os.getenv("LAYOUT_RNG", "random"),
+    )
+
+
+layout_pool = create_layout_pool()
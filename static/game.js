@@ -85,7 +85,10 @@ document.addEventListener("DOMContentLoaded", () => {
       if (!imageResponse.ok) {
         throw new Error("Failed to fetch images");
       }
-      images = await imageResponse.json();
+      // Load the images through the server's image cache, card-sized
+      images = (await imageResponse.json()).map((image) => ({
+        url: `/image_proxy?size=card&url=${encodeURIComponent(image.url)}`,
+      }));
 
       // Create a fixed layout of 4 rows and 5 columns for the cards
       const rows = 4;
@@ -143,19 +146,21 @@ document.addEventListener("DOMContentLoaded", () => {
     }
     if (boardIsLocked) return; // Prevent flipping when game is over
 
-    // Call API to check if cards match
+    // Call API to flip the card, the response also carries the game state
+    let finished = false;
     try {
       const cardIndex = cardElement.dataset.index;
-      const response = await fetch(`/flip/${gameId}/${cardIndex}`, {
-        method: "POST",
-      });
-      const secretIndex = await response.json();
+      const url = `/flip_and_status/${gameId}/${cardIndex}`;
+      const response = await fetch(url, { method: "POST" });
+      const result = await response.json();
+      const secretIndex = result.secret_index;
+      finished = result.finished;
 
       // Flipping process failed
       if (secretIndex == -1) {
         return;
       } else {
-        moves++; // Increment the number of card flips
+        moves = result.flip_count; // The server counts the card flips
         updateMoveCounter(moves); // Update the card flip counter display
         if (currentlyRevealedSecretIndex == null) {
           currentlyRevealedSecretIndex = secretIndex;
@@ -167,7 +172,7 @@ document.addEventListener("DOMContentLoaded", () => {
           cardBack.innerHTML = `<img src="${images[secretIndex].url}" alt="card image">`;
           return;
         } else {
-          if (secretIndex == currentlyRevealedSecretIndex) {
+          if (result.matched) {
             // show for 1 sec then remove both cards without locking the board
             cardElement
               .querySelector(".flip-card-inner")
@@ -208,8 +213,8 @@ document.addEventListener("DOMContentLoaded", () => {
     } catch (error) {
       console.error("Failed to flip the card:", error);
     } finally {
-      if (gameId != null) {
-        await detectGameFinish();
+      if (finished) {
+        showGameOver();
       }
     }
   }
@@ -238,27 +243,14 @@ document.addEventListener("DOMContentLoaded", () => {
     timerStarted = false;
   }
 
-  async function detectGameFinish() {
-    try {
-      const response = await fetch(`/detect_game_finish/${gameId}`);
-      if (response.ok) {
-        const finished = await response.json();
-        console.log("Game finished status:", finished); // Log the game finish status
-        if (finished) {
-          // Stop the timer
-          console.log("Game over: stopping timer");
-          clearInterval(timerInterval);
-          timerInterval = null;
-
-          // Show the game over popup and leaderboard button
-          gameOverPopup.classList.remove("hidden");
-        }
-      } else {
-        console.error("Failed to detect if game is finished");
-      }
-    } catch (error) {
-      console.error("Error detecting game finish:", error);
-    }
+  function showGameOver() {
+    // Stop the timer
+    console.log("Game over: stopping timer");
+    clearInterval(timerInterval);
+    timerInterval = null;
+
+    // Show the game over popup and leaderboard button
+    gameOverPopup.classList.remove("hidden");
   }
 
   async function submitGame() {
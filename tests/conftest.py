@@ -1,6 +1,10 @@
-import pytest
-
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
 import os
+from time import sleep
+import threading
+
+import pytest
 
 from apis import register_apis
 from app_logic.init_app import create_app
@@ -42,3 +46,52 @@ def rollback_session(app):
 def client(app):
     """Provide a test client for the Flask application."""
     return app.test_client()
+
+
+class DuckAPIStub(BaseHTTPRequestHandler):
+    """Serves /random like the Duck API, cycling through a small catalog."""
+
+    catalog_size = 50
+    requests_served = 0
+    # seconds the very first request hangs for
+    first_request_delay = 0.0
+
+    def do_GET(self):
+        if self.path != "/random":
+            self.send_error(404)
+            return
+        cls = type(self)
+        image_id = cls.requests_served % cls.catalog_size
+        cls.requests_served += 1
+        if cls.requests_served == 1:
+            sleep(cls.first_request_delay)
+
+        body = json.dumps(
+            {"url": f"http://duck.stub/{image_id}.jpg", "message": "stub"}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    # the default backlog of 5 drops bursts of concurrent connections
+    request_queue_size = 128
+
+
+@pytest.fixture
+def duck_api_stub():
+    """Run a local stand-in for the Duck API, yields its base URL."""
+    handler = type("Handler", (DuckAPIStub,), {})
+    server = StubServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.handler = handler
+    yield server
+    server.shutdown()
+    server.server_close()
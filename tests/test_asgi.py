@@ -0,0 +1,175 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+from app_logic import asgi_app, fetch_image_routes
+from app_logic.asgi_app import AsgiApp
+from app_logic.image_cache import ImageCache, ImageProxy
+from app_logic.image_client import ImageClient
+from app_logic.image_pool import ImagePool
+from app_logic.leaderboard_cache import LeaderboardCache
+from game_logic.game_events import game_events
+
+
+async def request(asgi, method, path, query=b"", messages=None):
+    """Run one request through an ASGI app, return status and body."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": [(b"host", b"testserver")],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+    messages = [] if messages is None else messages
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # the client stays connected
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi(scope, receive, send)
+    status = messages[0]["status"]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return status, body
+
+
+def call(asgi, method, path, query=b""):
+    return asyncio.run(request(asgi, method, path, query))
+
+
+def test_images_are_awaited_natively(app, duck_api_stub):
+    """get_random_images is served without the Flask app."""
+    client = ImageClient(f"http://127.0.0.1:{duck_api_stub.server_port}")
+    pool = ImagePool(client.fetch_images, max_size=0)
+    with patch.object(
+        fetch_image_routes, "image_client", client
+    ), patch.object(fetch_image_routes, "image_pool", pool), patch.object(
+        app, "wsgi_app"
+    ) as wsgi_app:
+        asgi = AsgiApp(app)
+        status, body = call(asgi, "GET", "/get_random_images", b"count=5")
+        assert status == 200
+        assert len({image["url"] for image in json.loads(body)}) == 5
+
+        status, body = call(asgi, "GET", "/get_random_images", b"count=0")
+        assert status == 400
+        assert "error" in json.loads(body)
+    wsgi_app.assert_not_called()
+    client.close()
+
+
+def test_leaderboard_is_served_natively(app):
+    """Cache hits and the reload on a miss both bypass the Flask app."""
+    cache = LeaderboardCache()
+    asgi = AsgiApp(app)
+    with patch.object(asgi_app, "leaderboard_cache", cache), patch.object(
+        app, "wsgi_app"
+    ) as wsgi_app:
+        assert call(asgi, "GET", "/fetch_leaderboard")[0] == 200
+        assert cache.get_cached_json() is not None
+
+        entry = {
+            "id": 1,
+            "player_name": "cached",
+            "completion_time": 1.0,
+            "moves": 2,
+        }
+        cache.invalidate()
+        cache.get_json(lambda limit: [entry])
+        status, body = call(asgi, "GET", "/fetch_leaderboard")
+        assert status == 200
+        assert json.loads(body) == [entry]
+    wsgi_app.assert_not_called()
+
+
+def test_game_events_are_streamed_natively(app):
+    """An open event stream leaves the only Flask thread free for flips."""
+    asgi = AsgiApp(app, threads=1)
+    game_id = json.loads(call(asgi, "POST", "/create_game/1")[1])
+
+    async def play_while_watching():
+        messages = []
+        stream = asyncio.ensure_future(
+            request(asgi, "GET", f"/game_events/{game_id}", messages=messages)
+        )
+        while len(messages) < 2:
+            await asyncio.sleep(0.01)  # until the status event is out
+        flip = request(asgi, "POST", f"/flip_pair/{game_id}/0/1")
+        assert (await asyncio.wait_for(flip, 5))[0] == 201
+        return await asyncio.wait_for(stream, 5)
+
+    status, body = asyncio.run(play_while_watching())
+    assert status == 200
+    events = [
+        line.removeprefix("event: ")
+        for line in body.decode().splitlines()
+        if line.startswith("event: ")
+    ]
+    assert events == ["status", "flip", "flip", "finished"]
+    assert game_events.count_subscribers(game_id) == 0
+
+    assert call(asgi, "GET", "/game_events/0")[0] == 400
+    assert call(asgi, "GET", "/game_events/abc")[0] == 400
+    call(asgi, "POST", f"/delete_game/{game_id}")
+
+
+def test_image_downloads_leave_the_flask_threads_free(app, tmp_path):
+    """A slow proxy download doesn't hold the only Flask thread."""
+    released = threading.Event()
+    image = b"\xff\xd8\xff duck"
+
+    def fetch(url):
+        released.wait(5)
+        return image
+
+    proxy = ImageProxy(
+        ImageCache(str(tmp_path), 1 << 20),
+        allowed_origins={"http://duck.stub"},
+        fetch=fetch,
+    )
+    asgi = AsgiApp(app, threads=1)
+
+    async def play_while_fetching():
+        fetching = asyncio.ensure_future(
+            request(asgi, "GET", "/image_proxy", b"url=http://duck.stub/1")
+        )
+        await asyncio.sleep(0.1)  # until the download has started
+        created = request(asgi, "POST", "/create_game/1")
+        status, body = await asyncio.wait_for(created, 2)
+        released.set()
+        assert status == 201
+        return json.loads(body), await asyncio.wait_for(fetching, 5)
+
+    with patch.object(fetch_image_routes, "image_proxy", proxy):
+        game_id, (status, body) = asyncio.run(play_while_fetching())
+        call(asgi, "POST", f"/delete_game/{game_id}")
+        assert status == 200
+        assert body == image
+
+        query = b"url=http://example.com/1"
+        assert call(asgi, "GET", "/image_proxy", query)[0] == 400
+
+
+def test_blueprint_routes_still_work(app):
+    asgi = AsgiApp(app)
+    status, body = call(asgi, "POST", "/create_game/1")
+    assert status == 201
+    game_id = json.loads(body)
+    assert call(asgi, "POST", f"/flip/{game_id}/0")[0] == 201
+    assert call(asgi, "POST", f"/delete_game/{game_id}")[0] == 201
+    assert call(asgi, "GET", "/no_such_route")[0] == 404
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import exc
+
+from app_logic.database import TimedQueuePool, get_engine_options
+
+
+def test_pool_counts_waits_and_timeouts():
+    """Checkouts are timed, and ones that give up are counted."""
+    pool = TimedQueuePool(
+        lambda: sqlite3.connect(":memory:"),
+        pool_size=1,
+        max_overflow=0,
+        timeout=0.05,
+    )
+    connection = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+
+    stats = pool.get_stats()
+    assert stats["checked_out"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.05
+
+    connection.close()
+    assert pool.get_stats()["checked_out"] == 0
+
+
+def test_engine_options_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "1")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "1500")
+    options = get_engine_options()
+    assert options["pool_size"] == 20
+    assert options["pool_pre_ping"]
+    assert options["connect_args"] == {
+        "options": "-c statement_timeout=1500"
+    }
+
+
+def test_pool_stats_route(client):
+    response = client.get("/pool_stats")
+    assert response.status_code == 200
+    stats = response.get_json()
+    assert stats["checkouts"] > 0
+    assert stats["timeouts"] == 0
@@ -199,11 +199,99 @@ def test_check_player(client, app):
     assert response.get_data(as_text=True) == "False"
 
     # Test case 4: Handle database error (simulate failure)
-    with patch("app_logic.models.PlayerScore.query") as mock_query:
-        mock_query.filter_by.side_effect = Exception(
-            "Database connection failed"
-        )
+    with patch("app_logic.database_routes.db.session.scalar") as mock_scalar:
+        mock_scalar.side_effect = Exception("Database connection failed")
 
         response = client.get("/check_player?player_name=TestPlayer")
         assert response.status_code == 500
         assert response.get_data(as_text=True) == "False"
+
+
+def test_fetch_leaderboard_page(client, app):
+    """Walking the pages returns every score once, in leaderboard order."""
+    with app.app_context():
+        db.session.add_all(
+            [
+                PlayerScore(
+                    player_name="Paged Player",
+                    completion_time=50.0,
+                    moves=20 + i % 3,
+                    created_at=datetime.now(timezone.utc),
+                )
+                for i in range(12)
+            ]
+        )
+        db.session.commit()
+        total = PlayerScore.query.count()
+
+    entries = []
+    query = "limit=5"
+    while True:
+        response = client.get(f"/fetch_leaderboard_page?{query}")
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data["scores"]) <= 5
+        entries += data["scores"]
+        if data["next"] is None:
+            break
+        query = "limit=5&" + "&".join(
+            f"{key}={value}" for key, value in data["next"].items()
+        )
+
+    keys = [
+        (entry["completion_time"], entry["moves"], entry["id"])
+        for entry in entries
+    ]
+    assert len(entries) == total
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+    response = client.get("/fetch_leaderboard_page?after_time=1")
+    assert response.status_code == 400
+    response = client.get("/fetch_leaderboard_page?limit=0")
+    assert response.status_code == 400
+
+    with app.app_context():
+        PlayerScore.query.filter_by(player_name="Paged Player").delete()
+        db.session.commit()
+
+
+def test_player_rank(client, app):
+    """A player's rank is the position of their best score."""
+    with app.app_context():
+        best = min(
+            [score.completion_time for score in PlayerScore.query.all()],
+            default=1.0,
+        )
+        db.session.add_all(
+            [
+                PlayerScore(
+                    player_name=name,
+                    completion_time=best - offset,
+                    moves=20,
+                    created_at=datetime.now(timezone.utc),
+                )
+                for name, offset in (
+                    ("Rank One", 0.2),
+                    ("Rank Two", 0.1),
+                    ("Rank Two", 0.0),
+                )
+            ]
+        )
+        db.session.commit()
+
+    data = client.get("/player_rank?player_name=Rank One").get_json()
+    assert data["rank"] == 1
+    data = client.get("/player_rank?player_name=Rank Two").get_json()
+    assert data["rank"] == 2
+    assert data["score"]["completion_time"] == best - 0.1
+
+    response = client.get("/player_rank?player_name=NonExistentPlayer")
+    assert response.status_code == 404
+    assert client.get("/player_rank").status_code == 400
+
+    with app.app_context():
+        PlayerScore.query.filter(
+            PlayerScore.player_name.in_(["Rank One", "Rank Two"])
+        ).delete()
+        db.session.commit()
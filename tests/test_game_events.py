@@ -0,0 +1,110 @@
+import json
+from unittest.mock import patch
+
+from app_logic import game_routes
+from game_logic.game_events import GameEvents
+from game_logic.game_store import game_store
+
+
+def read_event(chunks):
+    lines = next(chunks).decode().strip().split("\n")
+    event = lines[0].removeprefix("event: ")
+    data = json.loads(lines[1].removeprefix("data: "))
+    return event, data
+
+
+def test_publish_to_subscribers():
+    """Events reach every subscriber of the game and no one else."""
+    events = GameEvents()
+    first = events.subscribe(1)
+    second = events.subscribe(1)
+    other = events.subscribe(2)
+
+    events.publish(1, "flip", {"secret_index": 3})
+    assert first.get_nowait() == ("flip", {"secret_index": 3})
+    assert second.get_nowait() == ("flip", {"secret_index": 3})
+    assert other.empty()
+
+    events.unsubscribe(1, first)
+    events.unsubscribe(1, second)
+    assert events.count_subscribers(1) == 0
+
+
+def test_slow_subscriber_drops_oldest():
+    """A full queue loses its oldest events instead of blocking."""
+    events = GameEvents(max_queued=2)
+    subscriber = events.subscribe(1)
+    for i in range(5):
+        events.publish(1, "flip", i)
+    assert subscriber.get_nowait() == ("flip", 3)
+    assert subscriber.get_nowait() == ("flip", 4)
+
+
+def test_event_stream(client):
+    """A spectator sees the status, every flip and the end of the game."""
+    game_id = client.post("/create_game/1").get_json()
+
+    response = client.get(f"/game_events/{game_id}")
+    assert response.mimetype == "text/event-stream"
+    chunks = response.iter_encoded()
+    assert read_event(chunks) == (
+        "status",
+        {
+            "flip_count": 0,
+            "time": 0.0,
+            "finished": False,
+            "remaining_pairs": 1,
+            "matches": 0,
+            "progress": 0.0,
+            "accuracy": None,
+        },
+    )
+
+    client.post(f"/flip/{game_id}/0")
+    event, data = read_event(chunks)
+    assert event == "flip"
+    assert data["secret_index"] == 0
+
+    client.post(f"/flip_and_status/{game_id}/1")
+    assert read_event(chunks)[1]["matched"] is True
+    assert read_event(chunks)[0] == "finished"
+    assert list(chunks) == []
+
+    client.post(f"/delete_game/{game_id}")
+
+
+def test_event_stream_ticks_and_closes(client):
+    """Quiet streams get timer events and end when the game goes away."""
+    game_id = client.post("/create_game/1").get_json()
+
+    with patch.object(game_routes, "EVENT_TICK_INTERVAL", 0.01):
+        chunks = client.get(f"/game_events/{game_id}").iter_encoded()
+        read_event(chunks)
+        assert read_event(chunks)[0] == "time"
+
+        client.post(f"/delete_game/{game_id}")
+        while read_event(chunks)[0] == "time":
+            pass
+        assert list(chunks) == []
+
+    assert client.get(f"/game_events/{game_id}").status_code == 400
+
+
+def test_tick_ends_the_stream_of_a_game_finished_elsewhere(client):
+    """A game finished in another process ends the stream on a tick."""
+    game_id = client.post("/create_game/1").get_json()
+
+    with patch.object(game_routes, "EVENT_TICK_INTERVAL", 0.01):
+        chunks = client.get(f"/game_events/{game_id}").iter_encoded()
+        read_event(chunks)
+        # played without publishing, as by another worker
+        with game_store.checkout(game_id) as game:
+            game.flip(0)
+            game.flip(1)
+        while (event := read_event(chunks))[0] == "time":
+            pass
+        assert event[0] == "finished"
+        assert event[1]["finished"] is True
+        assert list(chunks) == []
+
+    client.post(f"/delete_game/{game_id}")
@@ -1,3 +1,5 @@
+import pickle
+import random
 import unittest
 
 from game_logic.game_state import Game
@@ -44,3 +46,94 @@ class TestGame(unittest.TestCase):
         print(test_game)
         print(answer_game)
         assert str(test_game) == str(answer_game)
+
+    def test_card_views(self):
+        test_game = Game(num_pairs=2, test_cards=[Card(0), Card(1)] * 2)
+        test_game.flip(0)
+        assert test_game.get_card(0).is_revealed()
+        assert not test_game.get_card(1).is_revealed()
+        test_game.flip(2)
+        assert test_game.get_card(0) is None
+        assert test_game.get_card(2) is None
+        assert test_game.get_card(3).get_secret_index() == 1
+        assert not test_game.detect_finished()
+        test_game.flip(1)
+        test_game.flip(3)
+        assert test_game.detect_finished()
+
+    def test_large_board(self):
+        test_game = Game(num_pairs=300)
+        secrets = [
+            card.get_secret_index() for card in test_game.get_cards()
+        ]
+        assert sorted(secrets) == sorted(list(range(300)) * 2)
+
+    def test_counters_match_board_scan(self):
+        """The incremental counters agree with a scan of the board."""
+        rng = random.Random(20)
+        for num_pairs in (1, 2, 7, 30):
+            test_game = Game(num_pairs)
+            matches = misses = 0
+            while not all(card is None for card in test_game.get_cards()):
+                assert not test_game.detect_finished()
+                _, matched = test_game.flip_card(
+                    rng.randrange(2 * num_pairs)
+                )
+                matches += matched is True
+                misses += matched is False
+
+                cards = test_game.get_cards()
+                left = sum(card is not None for card in cards)
+                status = test_game.get_status()
+                assert status["remaining_pairs"] == left // 2
+                assert status["matches"] == matches
+                assert status["progress"] == round(
+                    100 * (len(cards) - left) / len(cards), 1
+                )
+                if matches + misses:
+                    assert status["accuracy"] == matches / (matches + misses)
+                else:
+                    assert status["accuracy"] is None
+            assert test_game.detect_finished()
+
+    def test_counters_follow_board_edits(self):
+        test_game = Game(num_pairs=2, test_cards=[Card(0), Card(1)] * 2)
+        test_game.clear_card(0)
+        test_game.clear_card(0)
+        assert test_game.get_remaining_pairs() == 2
+        test_game.clear_card(2)
+        assert test_game.get_remaining_pairs() == 1
+        test_game.set_board([None, Card(1), None, None])
+        assert not test_game.detect_finished()
+        test_game.clear_card(1)
+        assert test_game.detect_finished()
+
+        copy = pickle.loads(pickle.dumps(test_game))
+        assert copy.detect_finished()
+        assert copy.get_status() == test_game.get_status()
+
+    def test_snapshot_round_trip(self):
+        """A game restored from its snapshot plays on like the original."""
+        for num_pairs in (1, 10, 300):
+            test_game = Game(num_pairs)
+            for target in (0, 1, 2, 2):
+                test_game.flip(target % (2 * num_pairs))
+            copy = Game.from_bytes(test_game.to_bytes())
+            assert str(copy) == str(test_game)
+            assert copy.get_status() == test_game.get_status()
+            assert copy.get_last_operation_time() == (
+                test_game.get_last_operation_time()
+            )
+            assert copy.get_lock() is not test_game.get_lock()
+
+            for target in range(2 * num_pairs):
+                assert copy.flip_card(target) == test_game.flip_card(target)
+
+        fresh = Game.from_bytes(Game(2).to_bytes())
+        assert fresh.get_time() == 0.0
+
+    def test_snapshot_rejects_garbage(self):
+        snapshot = Game(5).to_bytes()
+        for data in (b"", snapshot[:-1], b"\x09" + snapshot[1:]):
+            with self.assertRaises(ValueError):
+                Game.from_bytes(data)
@@ -0,0 +1,193 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from game_logic.game_state import Game
+from game_logic.game_store import (
+    GameCheckpointer,
+    InMemoryGameStore,
+    SQLiteGameStore,
+)
+
+
+TTL = 60
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    """Run each test against every game store backend."""
+    if request.param == "memory":
+        return InMemoryGameStore(ttl=TTL)
+    return SQLiteGameStore(str(tmp_path / "games.sqlite3"), ttl=TTL)
+
+
+def flip_in_other_process(path, game_id):
+    with SQLiteGameStore(path).checkout(game_id) as game:
+        game.flip(0)
+
+
+def test_add_checkout_remove(store):
+    """Changes made during a checkout are kept by the store."""
+    game_id = store.add(Game(num_pairs=2))
+    assert len(store) == 1
+
+    with store.checkout(game_id) as game:
+        game.flip(0)
+    with store.checkout(game_id) as game:
+        assert game.get_flip_count() == 1
+
+    assert store.remove(game_id).get_flip_count() == 1
+    assert len(store) == 0
+    with pytest.raises(KeyError):
+        with store.checkout(game_id):
+            pass
+    with pytest.raises(KeyError):
+        store.remove(game_id)
+
+
+def test_evict_expired(store):
+    """Only games idle for longer than the TTL are evicted."""
+    idle_game = Game(num_pairs=1)
+    idle_game._last_operation_time -= TTL + 1
+    idle_id = store.add(idle_game)
+    active_id = store.add(Game(num_pairs=1))
+
+    # added as idle, but played since: its old deadline must not evict it
+    revived_game = Game(num_pairs=1)
+    revived_game._last_operation_time -= TTL + 1
+    revived_id = store.add(revived_game)
+    with store.checkout(revived_id) as game:
+        game.flip(0)
+
+    assert store.evict_expired() == 1
+    assert store.evict_expired() == 0
+    assert store.get_evicted_count() == 1
+    with pytest.raises(KeyError):
+        store.remove(idle_id)
+    store.remove(active_id)
+    store.remove(revived_id)
+
+
+def test_checkout_is_exclusive(store):
+    """Concurrent updates to one game are never lost."""
+    game_id = store.add(Game(num_pairs=2))
+
+    def count_flips():
+        for _ in range(25):
+            with store.checkout(game_id) as game:
+                # a read-modify-write that loses updates without exclusion
+                game._flip_count = game.get_flip_count() + 1
+
+    threads = [threading.Thread(target=count_flips) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with store.checkout(game_id) as game:
+        assert game.get_flip_count() == 100
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    """A game created in one process can be played from another."""
+    path = str(tmp_path / "games.sqlite3")
+    store = SQLiteGameStore(path)
+    game_id = store.add(Game(num_pairs=2))
+
+    process = multiprocessing.get_context("spawn").Process(
+        target=flip_in_other_process, args=(path, game_id)
+    )
+    process.start()
+    process.join(timeout=30)
+    assert process.exitcode == 0
+
+    with store.checkout(game_id) as game:
+        assert game.get_flip_count() == 1
+
+
+def test_sqlite_read_checkout_skips_the_write_lock(tmp_path):
+    """Reads neither wait on a writer nor write the game back."""
+    path = str(tmp_path / "games.sqlite3")
+    store = SQLiteGameStore(path)
+    # a second writer would wait out the timeout, a reader doesn't wait
+    reader = SQLiteGameStore(path, timeout=0.1)
+    game_id = store.add(Game(num_pairs=2))
+    writing = threading.Event()
+    done = threading.Event()
+
+    def hold_write_lock():
+        with store.checkout(game_id) as game:
+            game.flip(0)
+            writing.set()
+            done.wait(timeout=10)
+
+    writer = threading.Thread(target=hold_write_lock)
+    writer.start()
+    writing.wait(timeout=10)
+    try:
+        with reader.checkout(game_id, write=False) as game:
+            assert game.get_flip_count() == 0
+            game.flip(1)
+    finally:
+        done.set()
+        writer.join()
+
+    with store.checkout(game_id, write=False) as game:
+        assert game.get_flip_count() == 1
+
+
+def test_checkpoint_and_restore(tmp_path):
+    """Games survive a restart with their ids, played or not."""
+    store = InMemoryGameStore(ttl=TTL)
+    checkpointer = GameCheckpointer(store, str(tmp_path))
+    played_id = store.add(Game(num_pairs=2))
+    idle_id = store.add(Game(num_pairs=3))
+    removed_id = store.add(Game(num_pairs=1))
+    assert checkpointer.checkpoint() == 3
+    assert checkpointer.checkpoint() == 0
+
+    with store.checkout(played_id) as game:
+        game.flip(0)
+        game._last_operation_time += 1  # a later flip, whatever the clock
+    store.remove(removed_id)
+    assert checkpointer.checkpoint() == 1
+    assert len(list(tmp_path.iterdir())) == 2
+
+    # a half-written file and a broken snapshot are skipped
+    (tmp_path / "1.tmp").write_bytes(b"\x01")
+    (tmp_path / "2.game").write_bytes(b"\x01")
+
+    restarted = InMemoryGameStore(ttl=TTL)
+    assert GameCheckpointer(restarted, str(tmp_path)).restore() == 2
+    assert len(list(tmp_path.iterdir())) == 2
+    with restarted.checkout(played_id) as game:
+        assert game.get_flip_count() == 1
+    with restarted.checkout(idle_id) as game:
+        assert game.get_num_pairs() == 3
+    with pytest.raises(KeyError):
+        restarted.remove(removed_id)
+
+
+def test_restore_drops_expired_games(tmp_path):
+    store = InMemoryGameStore(ttl=TTL)
+    idle_game = Game(num_pairs=1)
+    idle_game._last_operation_time -= TTL + 1
+    store.add(idle_game)
+    checkpointer = GameCheckpointer(store, str(tmp_path))
+    checkpointer.checkpoint()
+
+    restarted = InMemoryGameStore(ttl=TTL)
+    checkpointer = GameCheckpointer(restarted, str(tmp_path))
+    checkpointer.restore()
+    assert len(restarted) == 0
+    checkpointer.checkpoint()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_add_skips_restored_ids():
+    store = InMemoryGameStore(ttl=TTL)
+    game = Game(num_pairs=1)
+    store.restore(id(game), Game(num_pairs=2))
+    assert store.add(game) != id(game)
+    assert len(store) == 2
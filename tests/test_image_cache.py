@@ -0,0 +1,221 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import io
+import os
+import threading
+from time import sleep
+from unittest.mock import patch
+
+import pytest
+
+from app_logic import fetch_image_routes
+from app_logic.image_cache import ImageCache, ImageProxy, download
+
+
+def fake_jpeg(name: str, size: int = 100) -> bytes:
+    return b"\xff\xd8\xff" + name.encode().ljust(size, b".")
+
+
+class ImageHostStub(BaseHTTPRequestHandler):
+    """Serves /<name>.jpg, same-*.jpg all being the same image."""
+
+    requests_served = 0
+    delay = 0.0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_served += 1
+        sleep(cls.delay)
+        if self.path == "/missing.jpg":
+            self.send_error(404)
+            return
+        if self.path == "/redirect.jpg":
+            self.send_response(302)
+            self.send_header("Location", "http://example.com/duck.jpg")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/page.html":
+            body = b"<html></html>"
+        elif self.path.startswith("/same-"):
+            body = fake_jpeg("same")
+        else:
+            body = fake_jpeg(self.path)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def image_host():
+    handler = type("Handler", (ImageHostStub,), {})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.handler = handler
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def stub_proxy(tmp_path, origin, max_bytes=1 << 20):
+    return ImageProxy(
+        ImageCache(str(tmp_path), max_bytes),
+        allowed_origins={origin},
+        fetch=lambda url: download(url, timeout=5),
+    )
+
+
+def test_proxy_route_caches_images(client, image_host, tmp_path):
+    """An image is downloaded once and served with caching headers."""
+    url = f"{image_host.url}/duck.jpg"
+    proxy = stub_proxy(tmp_path, image_host.url)
+    with patch.object(fetch_image_routes, "image_proxy", proxy):
+        response = client.get("/image_proxy", query_string={"url": url})
+        assert response.status_code == 200
+        assert response.mimetype == "image/jpeg"
+        assert response.data == fake_jpeg("/duck.jpg")
+        etag = hashlib.sha256(response.data).hexdigest()
+        assert response.headers["ETag"] == f'"{etag}"'
+        cache_control = response.headers["Cache-Control"]
+        for directive in ("public", "max-age=31536000", "immutable"):
+            assert directive in cache_control
+
+        response = client.get(
+            "/image_proxy",
+            query_string={"url": url},
+            headers={"If-None-Match": f'"{etag}"'},
+        )
+        assert response.status_code == 304
+        assert image_host.handler.requests_served == 1
+
+
+def test_proxy_route_errors(client, image_host, tmp_path):
+    proxy = stub_proxy(tmp_path, image_host.url)
+    with patch.object(fetch_image_routes, "image_proxy", proxy):
+        for query, status in (
+            ({}, 400),
+            ({"url": f"{image_host.url}/duck.jpg", "size": "huge"}, 400),
+            ({"url": "http://example.com/duck.jpg"}, 400),
+            # the allowed host on another port, scheme or with a user
+            ({"url": "http://127.0.0.1:1/duck.jpg"}, 400),
+            ({"url": image_host.url.replace("http", "ftp")}, 400),
+            ({"url": image_host.url.replace("//", "//user@")}, 400),
+            ({"url": f"{image_host.url}/page.html"}, 400),
+            ({"url": f"{image_host.url}/redirect.jpg"}, 400),
+            ({"url": f"{image_host.url}/missing.jpg"}, 502),
+        ):
+            response = client.get("/image_proxy", query_string=query)
+            assert response.status_code == status
+            assert "error" in response.get_json()
+
+
+def test_evicted_file_is_fetched_again(client, image_host, tmp_path):
+    """A file deleted after its lookup is downloaded again, not a 500."""
+    proxy = stub_proxy(tmp_path, image_host.url)
+    url = f"{image_host.url}/duck.jpg"
+    digest = proxy.get(url)
+    (tmp_path / digest).unlink()  # as if another request evicted it
+
+    assert proxy.get(url, "card") == digest
+    assert image_host.handler.requests_served == 2
+
+    (tmp_path / digest).unlink()
+    with patch.object(fetch_image_routes, "image_proxy", proxy):
+        response = client.get("/image_proxy", query_string={"url": url})
+    assert response.status_code == 200
+    assert response.data == fake_jpeg("/duck.jpg")
+    assert image_host.handler.requests_served == 3
+
+
+def test_same_image_is_stored_once(image_host, tmp_path):
+    proxy = stub_proxy(tmp_path, image_host.url)
+    first = proxy.get(f"{image_host.url}/same-1.jpg")
+    second = proxy.get(f"{image_host.url}/same-2.jpg")
+    assert first == second
+    assert len(proxy.get_cache()) == 1
+    assert [path.name for path in tmp_path.iterdir()] == [first]
+
+
+def test_concurrent_requests_download_once(image_host, tmp_path):
+    image_host.handler.delay = 0.2
+    proxy = stub_proxy(tmp_path, image_host.url)
+    url = f"{image_host.url}/duck.jpg"
+    digests = []
+    threads = [
+        threading.Thread(target=lambda: digests.append(proxy.get(url)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(digests)) == 1
+    assert image_host.handler.requests_served == 1
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    size = len(fake_jpeg("a"))
+    cache = ImageCache(str(tmp_path), max_bytes=2 * size + 50)
+    first = cache.store(("a", "full"), fake_jpeg("a"))
+    cache.store(("b", "full"), fake_jpeg("b"))
+    assert cache.lookup(("a", "full")) == first  # a is now the newest
+    cache.store(("c", "full"), fake_jpeg("c"))
+
+    assert cache.lookup(("b", "full")) is None
+    assert cache.lookup(("a", "full")) == first
+    assert cache.get_total_bytes() == 2 * size
+    assert len(list(tmp_path.iterdir())) == 2
+
+    # a restart picks the files back up, and drops unfinished writes
+    partial = tmp_path / "partial.1.tmp"
+    partial.write_bytes(b"x")
+    os.utime(partial, (0, 0))
+    restarted = ImageCache(str(tmp_path), max_bytes=2 * size + 50)
+    assert restarted.get_total_bytes() == 2 * size
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_processes_sharing_a_directory_evict_each_other(tmp_path):
+    """The size limit and the recency order hold across processes."""
+    size = len(fake_jpeg("a"))
+    first = ImageCache(str(tmp_path), max_bytes=2 * size + 50)
+    second = ImageCache(str(tmp_path), max_bytes=2 * size + 50)
+    digest = first.store(("a", "full"), fake_jpeg("a"))
+    second.store(("b", "full"), fake_jpeg("b"))
+    assert first.lookup(("a", "full")) == digest  # a is now the newest
+    second.store(("c", "full"), fake_jpeg("c"))
+
+    assert second.lookup(("b", "full")) is None
+    assert first.get_total_bytes() == 2 * size
+    second.store(("d", "full"), fake_jpeg("d"))
+    assert first.lookup(("a", "full")) is None
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_card_size_without_pillow(image_host, tmp_path):
+    """Without Pillow, or for images it can't read, cards are full size."""
+    proxy = stub_proxy(tmp_path, image_host.url)
+    url = f"{image_host.url}/duck.jpg"
+    assert proxy.get(url, "card") == proxy.get(url, "full")
+    assert image_host.handler.requests_served == 1
+
+
+def test_card_size_is_downscaled(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    original = io.BytesIO()
+    Image.new("RGB", (1024, 768), "yellow").save(original, "JPEG")
+    proxy = ImageProxy(
+        ImageCache(str(tmp_path), 1 << 20),
+        allowed_origins={"http://duck.stub"},
+        fetch=lambda url: original.getvalue(),
+        card_side=128,
+    )
+    digest = proxy.get("http://duck.stub/1.jpg", "card")
+    with Image.open(proxy.get_cache().path(digest)) as card:
+        assert max(card.size) == 128
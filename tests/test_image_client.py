@@ -0,0 +1,83 @@
+from time import monotonic
+
+import pytest
+
+from app_logic.image_client import ImageClient
+
+
+def stub_client(duck_api_stub, **kwargs):
+    return ImageClient(
+        f"http://127.0.0.1:{duck_api_stub.server_port}", **kwargs
+    )
+
+
+def test_session_is_reused(duck_api_stub):
+    """Consecutive fetches share one session and event loop."""
+    client = stub_client(duck_api_stub)
+    try:
+        assert len(client.fetch_images(5)) == 5
+        session = client._session
+        assert len(client.fetch_images(5)) == 5
+        assert client._session is session
+    finally:
+        client.close()
+
+
+def test_unique_fetch_over_fetches(duck_api_stub):
+    """Duplicates from upstream are made up for until enough are unique."""
+    duck_api_stub.handler.catalog_size = 12
+    client = stub_client(duck_api_stub)
+    try:
+        images = client.fetch_unique_images(10, exclude={"http://x/0.jpg"})
+        urls = {image["url"] for image in images}
+        assert len(urls) == 10
+    finally:
+        client.close()
+
+
+def test_unique_fetch_gives_up(duck_api_stub):
+    """A catalog smaller than the request hits the attempt cap."""
+    duck_api_stub.handler.catalog_size = 3
+    client = stub_client(duck_api_stub, max_attempts_factor=2)
+    try:
+        with pytest.raises(RuntimeError):
+            client.fetch_unique_images(5)
+        assert duck_api_stub.handler.requests_served <= 10
+    finally:
+        client.close()
+
+
+def test_slow_request_is_hedged(duck_api_stub):
+    """A hanging request is raced by a hedge instead of waited for."""
+    duck_api_stub.handler.first_request_delay = 3
+    client = stub_client(duck_api_stub, hedge_after=0.1)
+    try:
+        start = monotonic()
+        assert len(client.fetch_images(1)) == 1
+        assert monotonic() - start < 2
+    finally:
+        client.close()
+
+
+def test_request_timeout(duck_api_stub):
+    """Requests slower than the timeout are dropped, not waited for."""
+    duck_api_stub.handler.first_request_delay = 3
+    client = stub_client(duck_api_stub, request_timeout=0.2, hedge_after=5)
+    try:
+        start = monotonic()
+        assert client.fetch_images(1) == []
+        assert monotonic() - start < 2
+    finally:
+        client.close()
+
+
+def test_hedges_count_towards_the_attempt_cap(duck_api_stub):
+    """Hedging every request never sends more than the cap allows."""
+    duck_api_stub.handler.catalog_size = 3
+    client = stub_client(duck_api_stub, max_attempts_factor=2, hedge_after=0)
+    try:
+        with pytest.raises(RuntimeError):
+            client.fetch_unique_images(5)
+        assert duck_api_stub.handler.requests_served <= 10
+    finally:
+        client.close()
@@ -0,0 +1,79 @@
+from time import monotonic, sleep
+from unittest.mock import patch
+
+from app_logic import fetch_image_routes
+from app_logic.image_client import ImageClient
+from app_logic.image_pool import ImagePool
+
+
+def stub_client(duck_api_stub):
+    return ImageClient(f"http://127.0.0.1:{duck_api_stub.server_port}")
+
+
+def stub_pool(duck_api_stub, **kwargs):
+    return ImagePool(stub_client(duck_api_stub).fetch_images, **kwargs)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            return False
+        sleep(0.01)
+    return True
+
+
+def test_refill_and_take(duck_api_stub):
+    """The pool fills up with unique URLs and take() consumes them."""
+    pool = stub_pool(duck_api_stub, max_size=20, low_watermark=5)
+    assert pool.refill() == 20
+    assert pool.refill() == 0
+
+    images = pool.take(8)
+    urls = [image["url"] for image in images]
+    assert len(set(urls)) == 8
+    assert len(pool) == 12
+
+    # running dry hands back what is left
+    assert len(pool.take(100)) == 12
+    assert pool.take(1) == []
+
+
+def test_expired_urls_are_dropped(duck_api_stub):
+    """URLs older than the TTL are never served."""
+    pool = stub_pool(duck_api_stub, max_size=10, ttl=0)
+    pool.refill()
+    assert pool.take(5) == []
+
+
+def test_background_refill(duck_api_stub):
+    """Dropping below the low watermark wakes the refill thread."""
+    pool = stub_pool(
+        duck_api_stub, max_size=10, low_watermark=5, refill_interval=60
+    )
+    pool.start()
+    assert wait_for(lambda: len(pool) == 10)
+
+    pool.take(4)
+    assert len(pool) == 6  # still above the watermark, no refill
+    pool.take(2)
+    assert wait_for(lambda: len(pool) == 10)
+
+
+def test_get_random_images_uses_pool(client, duck_api_stub):
+    """The endpoint serves from the pool and tops up from upstream."""
+    pool = stub_pool(duck_api_stub, max_size=3, low_watermark=0)
+    pool.refill()
+    served_by_pool = duck_api_stub.handler.requests_served
+
+    with patch.object(fetch_image_routes, "image_pool", pool), patch.object(
+        fetch_image_routes, "image_client", stub_client(duck_api_stub)
+    ):
+        response = client.get("/get_random_images?count=5")
+
+    assert response.status_code == 200
+    urls = [image["url"] for image in response.get_json()]
+    assert len(urls) == 5
+    assert len(set(urls)) == 5
+    # three came from the pool, only the rest hit the Duck API
+    assert duck_api_stub.handler.requests_served - served_by_pool == 2
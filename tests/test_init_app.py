@@ -0,0 +1,25 @@
+from unittest.mock import patch
+
+from app_logic import fetch_image_routes, init_app
+from app_logic.database import db
+
+
+def test_schema_is_current(app, monkeypatch):
+    """The bootstrap is skipped only while all of its objects exist."""
+    assert init_app.schema_is_current(db.engine)
+
+    monkeypatch.setitem(
+        init_app.SCHEMA_OBJECTS, "create_missing_index", "ix_missing"
+    )
+    assert not init_app.schema_is_current(db.engine)
+
+
+def test_image_pool_is_started_with_the_app(monkeypatch):
+    """The pool is warming before the first request, unless turned off."""
+    with patch.object(fetch_image_routes, "image_pool") as image_pool:
+        init_app.create_app(__name__, isTest=True)
+        image_pool.start.assert_not_called()
+
+        monkeypatch.setenv("IMAGE_POOL_PREWARM", "1")
+        init_app.create_app(__name__, isTest=True)
+        image_pool.start.assert_called_once()
@@ -0,0 +1,67 @@
+import pytest
+
+from game_logic.game_state import Game
+from game_logic.game_store import game_store
+from game_logic.layout_pool import LayoutPool, create_shuffler
+
+
+def test_take_from_stock():
+    """Pooled sizes come from the stock, other sizes are shuffled."""
+    pool = LayoutPool(sizes=[10], depth=4)
+    assert pool.refill() == 4
+    assert pool.refill() == 0
+
+    layout = pool.take(10)
+    assert sorted(layout) == sorted(list(range(10)) * 2)
+    assert pool.available(10) == 3
+
+    assert sorted(pool.take(3)) == [0, 0, 1, 1, 2, 2]
+    assert pool.available(3) == 0
+
+    for _ in range(3):
+        pool.take(10)
+    # running dry still deals boards
+    assert len(pool.take(10)) == 20
+
+
+def test_seeded_layouts_repeat():
+    pool = LayoutPool(sizes=[10], depth=4)
+    assert pool.seeded(10, 7) == pool.seeded(10, 7)
+    assert pool.seeded(50, 7) != pool.seeded(50, 8)
+    assert pool.available(10) == 0
+
+
+def test_unknown_rng():
+    with pytest.raises(ValueError):
+        create_shuffler("dice")
+
+
+def test_numpy_shuffler():
+    pytest.importorskip("numpy")
+    shuffle = create_shuffler("numpy", seed=3)
+    layout = shuffle(300)
+    assert layout.typecode == "H"
+    assert sorted(layout) == sorted(list(range(300)) * 2)
+    assert create_shuffler("numpy", seed=3)(300) == layout
+
+
+def test_create_game_with_seed(client):
+    """The same seed deals the same board, a bad seed is rejected."""
+    boards = []
+    for _ in range(2):
+        game_id = client.post("/create_game/20?seed=42").get_json()
+        with game_store.checkout(game_id) as game:
+            cards = game.get_cards()
+        boards.append([card.get_secret_index() for card in cards])
+        client.post(f"/delete_game/{game_id}")
+    assert boards[0] == boards[1]
+
+    assert client.post("/create_game/20?seed=abc").status_code == 400
+
+
+def test_create_game_rejects_bad_sizes(client):
+    """Boards without pairs or beyond MAX_PAIRS are a client error."""
+    for num_pairs in (-1, 0, Game.MAX_PAIRS + 1, "ten"):
+        response = client.post(f"/create_game/{num_pairs}")
+        assert response.status_code == 400
+    assert client.post("/create_game/-1?seed=1").status_code == 400
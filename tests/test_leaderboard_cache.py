@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+import json
+
+import pytest
+
+from app_logic.leaderboard_cache import LeaderboardCache
+from app_logic.models import PlayerScore, db
+
+
+@pytest.fixture
+def remove_scores(app):
+    """Delete the scores of the given players once the test is over."""
+    names = []
+    yield names.append
+    with app.app_context():
+        PlayerScore.query.filter(PlayerScore.player_name.in_(names)).delete()
+        db.session.commit()
+
+
+def entry(entry_id, completion_time, moves=20):
+    return {
+        "id": entry_id,
+        "player_name": f"Player {entry_id}",
+        "completion_time": completion_time,
+        "moves": moves,
+        "created_at": "2024-01-01T00:00:00",
+    }
+
+
+def test_add_keeps_order_and_size():
+    """New scores are merged in order and the tail is trimmed."""
+    cache = LeaderboardCache(size=3, ttl=60)
+    loads = []
+
+    def load(limit):
+        loads.append(limit)
+        return [entry(1, 10.0), entry(2, 20.0), entry(3, 30.0)]
+
+    cache.get_json(load)
+    cache.add(entry(4, 15.0))
+    cache.add(entry(5, 20.0, moves=10))
+    cache.add(entry(6, 99.0))  # too slow to make the cut
+
+    data = json.loads(cache.get_json(load))
+    assert [row["id"] for row in data] == [1, 4, 5]
+    assert loads == [3]  # never reloaded
+
+
+def test_invalidate_reloads():
+    """After invalidation the next read goes back to the database."""
+    cache = LeaderboardCache(size=3, ttl=60)
+    cache.get_json(lambda limit: [entry(1, 10.0)])
+    cache.invalidate()
+    data = json.loads(cache.get_json(lambda limit: [entry(2, 5.0)]))
+    assert [row["id"] for row in data] == [2]
+
+
+def test_leaderboard_reads_skip_database(client, remove_scores):
+    """Repeated reads and our own submissions don't query the database."""
+    remove_scores("Cached")
+    client.get("/fetch_leaderboard")
+    client.post(
+        "/submit_score",
+        json={"player_name": "Cached", "completion_time": 0.01, "moves": 2},
+    )
+
+    with patch("app_logic.models.PlayerScore.query") as mock_query:
+        mock_query.order_by.side_effect = Exception("Database read")
+        response = client.get("/fetch_leaderboard")
+
+    assert response.status_code == 200
+    assert response.get_json()[0]["player_name"] == "Cached"
+
+
+def test_external_writes_invalidate(client, app, remove_scores):
+    """Writes that bypass submit_score still show up on the leaderboard."""
+    remove_scores("External")
+    client.get("/fetch_leaderboard")
+    with app.app_context():
+        db.session.add(
+            PlayerScore(
+                player_name="External",
+                completion_time=0.001,
+                moves=2,
+                created_at=datetime.now(timezone.utc),
+            )
+        )
+        db.session.commit()
+
+    data = client.get("/fetch_leaderboard").get_json()
+    assert data[0]["player_name"] == "External"
@@ -0,0 +1,54 @@
+import json
+import logging
+
+from app_logic.logging_config import JsonFormatter
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_json_formatter_keeps_extra_fields():
+    record = logging.makeLogRecord(
+        {
+            "name": "app_logic.test",
+            "levelname": "INFO",
+            "msg": "Flipped %s",
+            "args": (3,),
+            "game_id": 42,
+        }
+    )
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Flipped 3"
+    assert entry["logger"] == "app_logic.test"
+    assert entry["game_id"] == 42
+
+
+def test_lock_tracing_only_at_debug(client):
+    """Lock tracing is logged at DEBUG and silent at INFO."""
+    logger = logging.getLogger("app_logic.game_routes")
+    handler = ListHandler()
+    logger.addHandler(handler)
+    game_id = client.post("/create_game/2").get_json()
+    try:
+        client.post(f"/flip/{game_id}/0")
+        assert handler.records == []
+
+        logger.setLevel(logging.DEBUG)
+        client.post(f"/flip/{game_id}/1")
+        messages = [record.getMessage() for record in handler.records]
+        assert messages == [
+            f"Trying to acquire flip lock of game {game_id}",
+            f"Acquired flip lock of game {game_id}",
+            f"Releasing flip lock of game {game_id}",
+            f"Released flip lock of game {game_id}",
+        ]
+    finally:
+        logger.setLevel(logging.NOTSET)
+        logger.removeHandler(handler)
+        client.post(f"/delete_game/{game_id}")
@@ -0,0 +1,62 @@
+from app_logic.metrics import Histogram
+
+
+def test_histogram_render():
+    """Buckets are cumulative and end with +Inf, per label value."""
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), (0.1, 1))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    histogram.observe(0.5, '/"b"')
+
+    lines = histogram.render()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    assert 'latency_seconds_count{route="/\\"b\\""} 1' in lines
+
+
+def test_metrics_endpoint(client):
+    """A flip shows up in the route, lock and database metrics."""
+    game_id = client.post("/create_game/2").get_json()
+    client.post(f"/flip/{game_id}/0")
+    client.get("/check_player?player_name=Metrics Player")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert (
+        'http_request_duration_seconds_count{method="POST",'
+        'route="/flip/<game_id>/<card_index>",status="201"}'
+    ) in text
+    assert 'game_lock_wait_seconds_count{operation="flip"}' in text
+    assert 'game_lock_hold_seconds_count{operation="flip"}' in text
+    assert 'db_query_duration_seconds_count{statement="SELECT"}' in text
+    assert "\nactive_games " in text
+    assert "\ngames_evicted_total " in text
+    assert "\ndb_pool_checkouts_total " in text
+
+    client.post(f"/delete_game/{game_id}")
+
+
+def test_lock_hold_of_a_rejected_flip(client):
+    """A flip that raises still records how long it held the lock."""
+
+    def flip_holds():
+        text = client.get("/metrics").get_data(as_text=True)
+        prefix = 'game_lock_hold_seconds_count{operation="flip"} '
+        for line in text.splitlines():
+            if line.startswith(prefix):
+                return int(line.removeprefix(prefix))
+        return 0
+
+    game_id = client.post("/create_game/1").get_json()
+    before = flip_holds()
+    assert client.post(f"/flip/{game_id}/99").status_code == 400
+    assert flip_holds() == before + 1
+
+    client.post(f"/delete_game/{game_id}")
@@ -0,0 +1,131 @@
+from time import monotonic, sleep
+from unittest.mock import patch
+import threading
+
+from app_logic.player_names import BloomFilter, PlayerNameIndex
+
+
+def wait_for_reload(names, timeout=5):
+    deadline = monotonic() + timeout
+    while names._reloading and monotonic() < deadline:
+        sleep(0.01)
+
+
+def test_loads_once_and_tracks_adds():
+    """The filter answers once loaded and is kept current by add()."""
+    loads = []
+
+    def load():
+        loads.append(1)
+        return ["Alice", "Bob"]
+
+    names = PlayerNameIndex()
+    # nothing loaded yet: a hint for the caller's query, and a reload
+    assert names.might_exist("Carol", load)
+    wait_for_reload(names)
+    assert names.might_exist("Alice", load)
+    assert not names.might_exist("Carol", load)
+    names.add("Carol")
+    assert names.might_exist("Carol", load)
+    assert len(loads) == 1
+
+    names.invalidate()
+    assert names.might_exist("Dave", load)
+    wait_for_reload(names)
+    assert not names.might_exist("Dave", load)
+    assert len(loads) == 2
+
+
+def test_stale_filter_reloads_once():
+    """Concurrent checks on a stale filter share one background reload."""
+    loads = []
+    release = threading.Event()
+
+    def load():
+        loads.append(1)
+        release.wait(timeout=5)
+        return ["Alice"]
+
+    names = PlayerNameIndex(ttl=0)
+    answers = []
+    threads = [
+        threading.Thread(
+            target=lambda: answers.append(names.might_exist("Bob", load))
+        )
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+    wait_for_reload(names)
+
+    assert answers == [True] * 10
+    assert len(loads) == 1
+
+
+def test_bloom_filter():
+    """No false negatives, and few false positives within capacity."""
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"Player {i}")
+    assert all(f"Player {i}" in bloom for i in range(1000))
+    false_positives = sum(f"Other {i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+    assert len(bloom._bits) < 1300
+
+
+def test_add_during_reload_is_kept():
+    """A name saved while the set reloads isn't lost by the reload."""
+    names = PlayerNameIndex()
+
+    def load():
+        names.add("Late Player")
+        return ["Alice"]
+
+    names.refresh(load)
+    assert names.might_exist("Late Player", lambda: [])
+    assert len(names) == 2
+
+
+def test_overlapping_refreshes_keep_added_names():
+    """A refresh starting mid-load doesn't lose the names added meanwhile."""
+    names = PlayerNameIndex()
+    database = ["Alice"]
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        saved = list(database)
+        loading.set()
+        release.wait(timeout=10)
+        return saved
+
+    warm_up = threading.Thread(target=names.refresh, args=(slow_load,))
+    warm_up.start()
+    loading.wait(timeout=10)
+    database.append("Bob")
+    names.add("Bob")
+    reload = threading.Thread(target=names.refresh, args=(lambda: database,))
+    reload.start()
+    sleep(0.1)
+    release.set()
+    warm_up.join()
+    reload.join()
+
+    assert names.might_exist("Bob", lambda: [])
+    assert names.might_exist("Alice", lambda: [])
+
+
+def test_free_name_needs_no_query(client, app):
+    """Names missing from a warm set are answered without the database."""
+    from app_logic.database_routes import load_player_names
+    from app_logic.player_names import player_names
+
+    with app.app_context():
+        player_names.refresh(load_player_names)
+    with patch("app_logic.database_routes.db.session.scalar") as mock_scalar:
+        response = client.get("/check_player?player_name=Nobody Yet")
+        assert response.get_data(as_text=True) == "False"
+        mock_scalar.assert_not_called()
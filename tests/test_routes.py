@@ -17,3 +17,78 @@ def test_player_score_model(app):
         assert (
             queried_score.player_name == "TestPlayer"
         ), f"Expected 'TestPlayer', got '{queried_score.player_name}'"
+
+
+def test_game_routes(client):
+    """Play a game through the routes and submit the result."""
+    response = client.post("/create_game/1")
+    assert response.status_code == 201
+    game_id = response.get_json()
+
+    assert client.post(f"/flip/{game_id}/0").get_json() == 0
+    assert client.post(f"/flip/{game_id}/1").get_json() == 0
+    assert client.get(f"/detect_game_finish/{game_id}").get_json() is True
+    assert client.get(f"/get_flip_count/{game_id}").get_json() == 2
+
+    response = client.post(f"/submit_game/{game_id}/RoutePlayer")
+    assert response.status_code == 201
+    assert response.get_json()["moves"] == 2
+
+    assert client.post(f"/delete_game/{game_id}").status_code == 201
+    assert client.post(f"/flip/{game_id}/0").status_code == 400
+
+
+def test_flip_and_status(client):
+    """A flip response carries the match result and the game state."""
+    game_id = client.post("/create_game/1").get_json()
+
+    # a rejected flip doesn't start the clock
+    assert client.post(f"/flip/{game_id}/-1").status_code == 400
+    assert client.get(f"/get_time/{game_id}").get_json() == 0
+
+    data = client.post(f"/flip_and_status/{game_id}/0").get_json()
+    assert data["secret_index"] == 0
+    assert data["matched"] is None
+    assert data["flip_count"] == 1
+    assert data["finished"] is False
+    assert data["remaining_pairs"] == 1
+    assert data["accuracy"] is None
+
+    data = client.post(f"/flip_and_status/{game_id}/1").get_json()
+    assert data["matched"] is True
+    assert data["flip_count"] == 2
+    assert data["finished"] is True
+    assert data["remaining_pairs"] == 0
+    assert data["matches"] == 1
+    assert data["progress"] == 100.0
+    assert data["accuracy"] == 1.0
+
+    data = client.post(f"/flip_and_status/{game_id}/1").get_json()
+    assert data["secret_index"] == -1
+    assert data["flip_count"] == 2
+
+    for card_index in (-1, 99):
+        response = client.post(f"/flip_and_status/{game_id}/{card_index}")
+        assert response.status_code == 400
+
+    client.post(f"/delete_game/{game_id}")
+
+
+def test_flip_pair(client):
+    """Both cards of a move can be flipped in one request."""
+    game_id = client.post("/create_game/1").get_json()
+
+    # an invalid second card leaves the first one untouched
+    assert client.post(f"/flip_pair/{game_id}/0/99").status_code == 400
+    assert client.get(f"/get_flip_count/{game_id}").get_json() == 0
+    assert client.get(f"/get_time/{game_id}").get_json() == 0
+
+    response = client.post(f"/flip_pair/{game_id}/0/1")
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data["secret_indices"] == [0, 0]
+    assert data["matched"] is True
+    assert data["finished"] is True
+
+    assert client.post("/flip_pair/0/0/1").status_code == 400
+    client.post(f"/delete_game/{game_id}")
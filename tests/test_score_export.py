@@ -0,0 +1,58 @@
+from datetime import datetime
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app_logic.models import PlayerScore, db
+
+
+@pytest.fixture
+def export_scores(app):
+    """Three scores, a day apart, removed after the test."""
+    with app.app_context():
+        db.session.add_all(
+            PlayerScore(
+                player_name="Export Player",
+                completion_time=30.0 + day,
+                moves=20,
+                created_at=datetime(2001, 1, 1 + day),
+            )
+            for day in range(3)
+        )
+        db.session.commit()
+    yield
+    with app.app_context():
+        PlayerScore.query.filter_by(player_name="Export Player").delete()
+        db.session.commit()
+
+
+def test_export_arrow(client, export_scores):
+    """The Arrow stream holds exactly the scores in the time range."""
+    response = client.get(
+        "/export_scores?since=2001-01-02T00:00:00&until=2001-01-04"
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+
+    table = pa.ipc.open_stream(response.data).read_all()
+    assert table.column("completion_time").to_pylist() == [31.0, 32.0]
+    assert table.column("player_name").to_pylist() == ["Export Player"] * 2
+
+
+def test_export_parquet(client, export_scores):
+    """Parquet exports read back as a table, time zones respected."""
+    response = client.get(
+        "/export_scores?format=parquet&since=2001-01-01T01:00:00%2B02:00"
+        "&until=2001-01-02"
+    )
+    assert response.status_code == 200
+
+    table = pq.read_table(io.BytesIO(response.data))
+    assert table.column("completion_time").to_pylist() == [30.0]
+
+
+def test_export_rejects_bad_arguments(client):
+    assert client.get("/export_scores?format=csv").status_code == 400
+    assert client.get("/export_scores?since=yesterday").status_code == 400
@@ -0,0 +1,245 @@
+from time import sleep
+from unittest.mock import patch
+import json
+import multiprocessing
+import os
+import sys
+import threading
+
+from app_logic.init_app import init_score_ingest
+from app_logic.models import PlayerScore, db
+from app_logic.score_ingest import ScoreIngestQueue
+
+
+def score(name, completion_time=42.0):
+    return {
+        "player_name": name,
+        "completion_time": completion_time,
+        "moves": 20,
+        "created_at": "2024-01-01T00:00:00+00:00",
+    }
+
+
+def test_flushes_in_batches(tmp_path):
+    """Queued scores are written in batches of at most batch_size."""
+    batches = []
+    score_queue = ScoreIngestQueue(
+        batches.append, str(tmp_path / "spool.jsonl"), batch_size=3
+    )
+    for i in range(7):
+        assert score_queue.submit(score(f"Player {i}"))
+
+    assert score_queue.flush_now() == 7
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert len(score_queue) == 0
+
+
+def test_full_queue_pushes_back(tmp_path):
+    """Submissions beyond max_queued are refused."""
+    score_queue = ScoreIngestQueue(
+        lambda batch: None, str(tmp_path / "spool.jsonl"), max_queued=2
+    )
+    assert score_queue.submit(score("A"))
+    assert score_queue.submit(score("B"))
+    assert not score_queue.submit(score("C"))
+    score_queue.flush_now()
+    assert score_queue.submit(score("C"))
+
+
+def test_spool_survives_restart(tmp_path):
+    """Scores not flushed before a crash are replayed from the spool."""
+    spool_path = str(tmp_path / "spool.jsonl")
+
+    def fail(batch):
+        raise RuntimeError("Database is down")
+
+    crashed = ScoreIngestQueue(fail, spool_path, batch_size=1)
+    crashed.submit(score("A"))
+    crashed.submit(score("B"))
+    try:
+        crashed.flush_now()
+    except RuntimeError:
+        pass
+    crashed.close()
+
+    batches = []
+    restarted = ScoreIngestQueue(batches.append, spool_path)
+    assert restarted.flush_now() == 2
+    assert [entry["player_name"] for entry in batches[0]] == ["A", "B"]
+    restarted.close()
+
+    # flushed scores are gone from the spool
+    assert ScoreIngestQueue(batches.append, spool_path).flush_now() == 0
+
+
+def test_flushed_scores_are_skipped_on_replay(tmp_path):
+    """A flush appends a marker to the spool instead of rewriting it."""
+    spool_path = str(tmp_path / "spool.jsonl")
+
+    def fail_on_c(batch):
+        if any(entry["player_name"] == "C" for entry in batch):
+            raise RuntimeError("Database is down")
+
+    crashed = ScoreIngestQueue(fail_on_c, spool_path, batch_size=2)
+    for name in "ABC":
+        crashed.submit(score(name))
+    own_spool = tmp_path / f"spool.{os.getpid()}.jsonl"
+    inode = own_spool.stat().st_ino
+    try:
+        crashed.flush_now()
+    except RuntimeError:
+        pass
+    crashed.close()
+    assert own_spool.stat().st_ino == inode
+    assert own_spool.read_text().splitlines()[-1] == "2"
+
+    batches = []
+    restarted = ScoreIngestQueue(batches.append, spool_path)
+    assert restarted.flush_now() == 1
+    assert [entry["player_name"] for entry in batches[0]] == ["C"]
+    assert own_spool.read_text() == ""
+
+
+def test_concurrent_submissions_share_an_fsync(tmp_path):
+    """Submissions queue up while a sync runs, then share the next one."""
+    score_queue = ScoreIngestQueue(
+        lambda batch: None, str(tmp_path / "spool.jsonl")
+    )
+    syncing = threading.Event()
+    release = threading.Event()
+    fsyncs = []
+
+    def slow_fsync(fd):
+        fsyncs.append(fd)
+        syncing.set()
+        release.wait(timeout=10)
+
+    with patch("app_logic.score_ingest.os.fsync", slow_fsync):
+        threads = [
+            threading.Thread(target=score_queue.submit, args=(score(i),))
+            for i in range(8)
+        ]
+        threads[0].start()
+        syncing.wait(timeout=10)
+        for thread in threads[1:]:
+            thread.start()
+        # the other seven are appended while the first one syncs
+        for _ in range(100):
+            if len(score_queue) == 8:
+                break
+            sleep(0.01)
+        assert len(score_queue) == 8
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert len(fsyncs) == 2
+
+
+def spool_and_exit(spool_path, name):
+    """A worker that dies with a score in its spool."""
+    score_queue = ScoreIngestQueue(lambda batch: None, spool_path)
+    if name is not None:
+        score_queue.submit(score(name))
+    # how many scores it took over from other workers
+    sys.exit(len(score_queue) - (name is not None))
+
+
+def run_worker(spool_path, name=None):
+    process = multiprocessing.get_context("spawn").Process(
+        target=spool_and_exit, args=(spool_path, name)
+    )
+    process.start()
+    process.join(timeout=30)
+    return process.exitcode
+
+
+def test_workers_only_take_over_orphaned_spools(tmp_path):
+    """A live worker's spool is never replayed by another one."""
+    spool_path = str(tmp_path / "spool.jsonl")
+    assert run_worker(spool_path, "Dead") == 0
+
+    batches = []
+    alive = ScoreIngestQueue(batches.append, spool_path)
+    alive.submit(score("Alive"))
+    assert run_worker(spool_path) == 0
+
+    assert alive.flush_now() == 2
+    assert [entry["player_name"] for entry in batches[0]] == ["Dead", "Alive"]
+    # the dead worker's spool is gone, the second one's is empty
+    spools = {path.name: path.read_text() for path in tmp_path.iterdir()}
+    assert len(spools) == 2
+    assert spools.pop(f"spool.{os.getpid()}.jsonl") == ""
+    assert list(spools.values()) == [""]
+
+
+def test_submit_game_is_queued(client, app, tmp_path, monkeypatch):
+    """With write-behind on, submissions answer 202 and land later."""
+    monkeypatch.setenv("SCORE_SPOOL_PATH", str(tmp_path / "spool.jsonl"))
+    monkeypatch.setenv("SCORE_FLUSH_INTERVAL", "3600")
+    score_queue = init_score_ingest(app)
+    try:
+        game_id = client.post("/create_game/1").get_json()
+        client.post(f"/flip_pair/{game_id}/0/1")
+        response = client.post(f"/submit_game/{game_id}/Queued Player")
+        assert response.status_code == 202
+        assert response.get_json()["moves"] == 2
+
+        assert score_queue.flush_now() == 1
+        with app.app_context():
+            persisted = PlayerScore.query.filter_by(
+                player_name="Queued Player"
+            ).all()
+            assert len(persisted) == 1
+            assert persisted[0].moves == 2
+    finally:
+        del app.extensions["score_ingest"]
+        client.post(f"/delete_game/{game_id}")
+        with app.app_context():
+            PlayerScore.query.filter_by(player_name="Queued Player").delete()
+            db.session.commit()
+
+
+def test_refused_score_is_dead_lettered(tmp_path):
+    """A score the database refuses doesn't hold up the ones behind it."""
+    batches = []
+
+    def refuse_long_names(batch):
+        if any(len(entry["player_name"]) > 5 for entry in batch):
+            raise ValueError("value too long")
+        batches.append(batch)
+
+    score_queue = ScoreIngestQueue(
+        refuse_long_names,
+        str(tmp_path / "spool.jsonl"),
+        is_retryable=lambda error: not isinstance(error, ValueError),
+    )
+    for name in ("A", "L" * 60, "B"):
+        score_queue.submit(score(name))
+
+    assert score_queue.flush_now() == 3
+    assert len(score_queue) == 0
+    written = [entry["player_name"] for batch in batches for entry in batch]
+    assert written == ["A", "B"]
+    dead = (tmp_path / "spool.dead.jsonl").read_text().splitlines()
+    assert [json.loads(line)["player_name"] for line in dead] == ["L" * 60]
+
+
+def test_invalid_score_is_rejected(client, app, tmp_path, monkeypatch):
+    """Scores the database would refuse are never queued."""
+    monkeypatch.setenv("SCORE_SPOOL_PATH", str(tmp_path / "spool.jsonl"))
+    monkeypatch.setenv("SCORE_FLUSH_INTERVAL", "3600")
+    score_queue = init_score_ingest(app)
+    try:
+        game_id = client.post("/create_game/1").get_json()
+        response = client.post(f"/submit_game/{game_id}/{'L' * 60}")
+        assert response.status_code == 400
+
+        response = client.post(
+            "/submit_score",
+            json={"player_name": "A", "completion_time": 1.0, "moves": 2**31},
+        )
+        assert response.status_code == 400
+        assert len(score_queue) == 0
+    finally:
+        del app.extensions["score_ingest"]
+        client.post(f"/delete_game/{game_id}")
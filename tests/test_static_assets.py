@@ -0,0 +1,83 @@
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+from flask import render_template
+
+from app_logic import static_assets
+from app_logic.static_assets import build, init_static_assets
+
+
+CSS = 'body { background: url("../img/bg.jpg?v=1") } a { b: url(data:x) }'
+JS = "console.log('" + "duck " * 200 + "');"
+
+
+@pytest.fixture
+def built(tmp_path):
+    """A small static tree built into tmp_path / dist."""
+    source = tmp_path / "static"
+    (source / "img").mkdir(parents=True)
+    (source / "styles").mkdir()
+    (source / "img" / "bg.jpg").write_bytes(b"\xff\xd8\xff" + bytes(500))
+    (source / "styles" / "site.css").write_text(CSS)
+    (source / "game.js").write_text(JS)
+    output = tmp_path / "dist"
+    return output, build(source, output)
+
+
+def test_build_fingerprints_and_compresses(built):
+    output, manifest = built
+    assert json.loads((output / "manifest.json").read_text()) == manifest
+    assert set(manifest) == {"img/bg.jpg", "styles/site.css", "game.js"}
+
+    image = manifest["img/bg.jpg"]
+    assert image.startswith("img/bg.") and image.endswith(".jpg")
+    css = (output / manifest["styles/site.css"]).read_text()
+    assert f'url("../{image}?v=1")' in css
+    assert "url(data:x)" in css
+
+    script = output / manifest["game.js"]
+    compressed = script.with_name(script.name + ".gz")
+    assert gzip.decompress(compressed.read_bytes()) == JS.encode()
+    # images are compressed already
+    assert not (output / (image + ".gz")).exists()
+
+
+def test_serve_asset_by_accept_encoding(client, built):
+    output, manifest = built
+    url = "/assets/" + manifest["game.js"]
+    with patch.object(static_assets, "DIST_DIR", output):
+        response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+        assert response.status_code == 200
+        assert response.content_encoding == "gzip"
+        assert gzip.decompress(response.data) == JS.encode()
+        assert response.mimetype == "text/javascript"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        cache_control = response.headers["Cache-Control"]
+        for directive in ("public", "max-age=31536000", "immutable"):
+            assert directive in cache_control
+
+        response = client.get(url, headers={"Accept-Encoding": "identity"})
+        assert response.content_encoding is None
+        assert response.data == JS.encode()
+
+        assert client.get("/assets/missing.js").status_code == 404
+        assert client.get("/assets/../manifest.json").status_code == 404
+
+
+def test_templates_link_fingerprinted_assets(app, built):
+    output, manifest = built
+    with patch.object(static_assets, "DIST_DIR", output):
+        init_static_assets(app)
+    try:
+        with app.test_request_context():
+            page = render_template("game.html")
+        assert f'src="/assets/{manifest["game.js"]}"' in page
+    finally:
+        with patch.object(static_assets, "DIST_DIR", output / "none"):
+            init_static_assets(app)
+
+    with app.test_request_context():
+        page = render_template("index.html")
+    assert "/static/styles/index_style.css" in page